@@ -5,9 +5,10 @@ Monitor all users' progress, scores, and live statistics
 
 import streamlit as st
 import json
+import os
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 # Try to import plotly, but handle the case where it's not available
 try:
@@ -32,7 +33,10 @@ except ImportError:
     px = MockPx()
     go = MockGo()
 
-from auth_manager import JSONAuthManager
+from auth_manager import ARCHIVE_INACTIVE_DAYS, LOGIN_STALENESS_MS
+from auth_metrics import DEFAULT_METRICS_FILE, METRICS_ENV, load_prometheus
+from auth_schema import PROGRESS_DEFAULTS
+from auth_server import open_auth_store
 import time
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -45,8 +49,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize Auth Manager
-auth_manager = JSONAuthManager("users.json")
+@st.cache_resource
+def get_auth_manager():
+    """One auth store per server process, so its cache and search index outlive reruns"""
+    # Auth Manager (or the store daemon, with AUTH_STORE_SOCKET set). Its metrics
+    # stay off: the metrics file is the game's (or the daemon's) to write.
+    return open_auth_store("users.json", journal=True, split_progress=True, metrics=None)
+
+auth_manager = get_auth_manager()
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # PROFESSIONAL STYLING
@@ -378,18 +388,17 @@ def check_admin_access():
 # ═══════════════════════════════════════════════════════════════════════════════
 # DATA LOADING FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
-def load_user_data() -> List[Dict]:
-    """Load all user data from JSON"""
-    return auth_manager.get_all_users()
-
 def get_user_statistics() -> Dict:
     """Calculate overall statistics"""
-    users = load_user_data()
-    
-    total_users = len(users)
-    active_users = sum(1 for u in users if u.get('saved_progress'))
-    total_games = sum(u.get('total_games', 0) for u in users)
-    avg_score = sum(u.get('high_score', 0) for u in users) / max(total_users, 1)
+    # One streamed pass, so memory doesn't grow with the number of users
+    total_users = active_users = total_games = score_sum = 0
+    for u in auth_manager.iter_all_users():
+        total_users += 1
+        if u.get('saved_progress'):
+            active_users += 1
+        total_games += u.get('total_games', 0)
+        score_sum += u.get('high_score', 0)
+    avg_score = score_sum / max(total_users, 1)
     
     return {
         "total_users": total_users,
@@ -410,30 +419,85 @@ def get_level_progress_data() -> List[Dict]:
         pass
     return []
 
+def user_progress_row(user: Dict) -> Dict:
+    """One User List table row for a user (the store hands out records upgraded to its current schema)"""
+    # Users who never saved progress show the values a new game starts with
+    progress = user.get('saved_progress') or PROGRESS_DEFAULTS
+    return {
+        'Username': user['username'],
+        'Email': user['email'],
+        'Level': progress['level'] + 1,
+        'Score': progress['score'],
+        'High Score': user['high_score'],
+        'Streak': progress['streak'],
+        'Max Streak': progress['max_streak'],
+        'Combo': f"{progress['combo_multiplier']:.1f}x",
+        'Perfect Levels': progress['perfect_levels'],
+        'Hints Used': progress['hints_used'],
+        'Total Games': user['total_games'],
+        'Last Login': user['last_login'] or 'Never',
+        'Created': user.get('created_at', 'N/A')
+    }
+
 def create_users_dataframe() -> pd.DataFrame:
-    """Create DataFrame from user data"""
-    users = load_user_data()
-    
-    data = []
-    for user in users:
-        progress = user.get('saved_progress', {})
-        data.append({
-            'Username': user.get('username', 'N/A'),
-            'Email': user.get('email', 'N/A'),
-            'Level': progress.get('level', 0) + 1 if progress else 1,
-            'Score': progress.get('score', 0),
-            'High Score': user.get('high_score', 0),
-            'Streak': progress.get('streak', 0),
-            'Max Streak': progress.get('max_streak', 0),
-            'Combo': f"{progress.get('combo_multiplier', 1.0):.1f}x",
-            'Perfect Levels': progress.get('perfect_levels', 0),
-            'Hints Used': progress.get('hints_used', 0),
-            'Total Games': user.get('total_games', 0),
-            'Last Login': user.get('last_login', 'Never'),
-            'Created': user.get('created_at', 'N/A')
-        })
-    
-    return pd.DataFrame(data)
+    """Create DataFrame from user data (every user: only for charts and exports)"""
+    return pd.DataFrame([user_progress_row(user) for user in auth_manager.iter_all_users()])
+
+def find_users_at_level(level: int, limit: int) -> List[Dict]:
+    """User List rows of the first users at a level, from one streamed pass"""
+    rows = []
+    for user in auth_manager.iter_all_users():
+        row = user_progress_row(user)
+        if row['Level'] == level:
+            rows.append(row)
+            if len(rows) >= limit:
+                break
+    return rows
+
+# Sort choices for paged tables: label -> (sort field, descending)
+USER_SORT_OPTIONS = {
+    "Username (A-Z)": ("username", False),
+    "High Score": ("high_score", True),
+    "Last Login": ("last_login", True),
+    "Newest First": ("created_at", True),
+    "Oldest First": ("created_at", False),
+    "Email (A-Z)": ("email", False),
+}
+
+# Most matches a username/email search shows (or an account picker lists)
+SEARCH_LIMIT = 200
+
+def load_users_page(key: str, sort_by: str, descending: bool, page_size: int,
+                    status: Optional[str] = None) -> List[Dict]:
+    """Fetch the current page of a paged user table (page cursors live in session state)"""
+    view = (sort_by, descending, page_size, status)
+    pager = st.session_state.get(f"{key}_pager")
+    if not pager or pager["view"] != view:
+        # Sorting or page size changed: back to the first page
+        pager = {"view": view, "cursors": [None]}
+        st.session_state[f"{key}_pager"] = pager
+    
+    return list(auth_manager.iter_users(sort_by, descending, after=pager["cursors"][-1],
+                                        limit=page_size, status=status))
+
+def render_pager(key: str, users: List[Dict], total: int):
+    """Previous/next buttons under a paged user table"""
+    pager = st.session_state[f"{key}_pager"]
+    sort_by, _, page_size, _ = pager["view"]
+    page = len(pager["cursors"])
+    total_pages = max(1, -(-total // page_size))
+    
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀ Previous", use_container_width=True, disabled=page == 1, key=f"{key}_prev"):
+            pager["cursors"].pop()
+            st.rerun()
+    with info_col:
+        st.markdown(f'<p style="color: rgba(255,255,255,0.6); text-align: center; margin-top: 8px;">Page {page} of {total_pages} · {total} users</p>', unsafe_allow_html=True)
+    with next_col:
+        if st.button("Next ▶", use_container_width=True, disabled=page >= total_pages or not users, key=f"{key}_next"):
+            pager["cursors"].append(auth_manager.cursor_for(users[-1], sort_by))
+            st.rerun()
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # VISUALIZATION FUNCTIONS
@@ -580,6 +644,52 @@ def create_engagement_chart(df: pd.DataFrame):
     )
     return fig
 
+def create_latency_chart(ops_df: pd.DataFrame):
+    """Create p50/p95/p99 latency per store operation chart with dark theme"""
+    # Check if plotly is available
+    if not PLOTLY_AVAILABLE:
+        st.warning("⏱️ Chart visualization requires plotly library. Please install plotly to enable charts.")
+        return None
+    
+    if ops_df.empty:
+        st.warning("⏱️ No store operations recorded yet.")
+        return None
+    
+    fig = go.Figure(data=[
+        go.Bar(name='p50', x=ops_df['Operation'], y=ops_df['p50 (ms)'], marker_color='#43e97b'),
+        go.Bar(name='p95', x=ops_df['Operation'], y=ops_df['p95 (ms)'], marker_color='#667eea'),
+        go.Bar(name='p99', x=ops_df['Operation'], y=ops_df['p99 (ms)'], marker_color='#f093fb')
+    ])
+    
+    fig.update_layout(
+        title='⏱️ Store Operation Latency',
+        xaxis_title='Operation',
+        yaxis_title='Milliseconds (log scale)',
+        yaxis_type='log',
+        barmode='group',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=14, family='Inter'),
+        title_font=dict(size=20, color='#667eea'),
+        xaxis=dict(gridcolor='rgba(102, 126, 234, 0.1)', showgrid=True),
+        yaxis=dict(gridcolor='rgba(102, 126, 234, 0.1)', showgrid=True),
+        legend=dict(bgcolor='rgba(255,255,255,0.05)', bordercolor='rgba(102, 126, 234, 0.3)', borderwidth=2),
+        margin=dict(l=20, r=20, t=60, b=20)
+    )
+    return fig
+
+def latency_rows(series: Dict) -> List[Dict]:
+    """Table rows for one histogram family of a metrics snapshot, slowest p99 first"""
+    rows = [{
+        'Operation': label,
+        'Calls': int(summary['count']),
+        'p50 (ms)': round(summary['p50'] * 1000, 3),
+        'p95 (ms)': round(summary['p95'] * 1000, 3),
+        'p99 (ms)': round(summary['p99'] * 1000, 3),
+        'Mean (ms)': round(summary['mean'] * 1000, 3)
+    } for label, summary in series.items()]
+    return sorted(rows, key=lambda row: row['p99 (ms)'], reverse=True)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MAIN DASHBOARD
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -622,7 +732,6 @@ st.markdown('<div style="height: 30px;"></div>', unsafe_allow_html=True)
 
 # Load Data
 stats = get_user_statistics()
-df = create_users_dataframe()
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # OVERVIEW METRICS - PREMIUM CARDS
@@ -672,29 +781,45 @@ st.markdown('<div style="height: 40px;"></div>', unsafe_allow_html=True)
 # ═══════════════════════════════════════════════════════════════════════════════
 # TABS FOR DIFFERENT VIEWS
 # ═══════════════════════════════════════════════════════════════════════════════
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["📋 User List", "📊 Analytics", "🏆 Leaderboard", "🔍 User Details", "⚙️ Account Management", "❓ Question Management", "📈 Level Progress"])
+tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(["📋 User List", "📊 Analytics", "🏆 Leaderboard", "🔍 User Details", "⚙️ Account Management", "❓ Question Management", "📈 Level Progress", "⏱️ Store Metrics"])
 
 # TAB 1: User List
 with tab1:
     st.markdown('<h2 class="section-header"><span>📋</span> All Users Progress</h2>', unsafe_allow_html=True)
     
     # Search and filter
-    col1, col2 = st.columns([2, 1])
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
     with col1:
         search = st.text_input("🔍 Search by username or email", "", placeholder="Type to search...")
     with col2:
         level_filter = st.selectbox("📍 Filter by Level", ["All"] + [f"Level {i}" for i in range(1, 7)])
-    
-    # Apply filters
-    filtered_df = df.copy()
-    if search:
-        filtered_df = filtered_df[
-            filtered_df['Username'].str.contains(search, case=False) | 
-            filtered_df['Email'].str.contains(search, case=False)
-        ]
-    if level_filter != "All":
-        level_num = int(level_filter.split()[1])
-        filtered_df = filtered_df[filtered_df['Level'] == level_num]
+    with col3:
+        list_sort = st.selectbox("↕️ Sort by", list(USER_SORT_OPTIONS), key="user_list_sort")
+    with col4:
+        list_page_size = st.selectbox("📄 Per page", [25, 50, 100, 250], key="user_list_page_size")
+    
+    if search or level_filter != "All":
+        # Apply filters
+        level_num = int(level_filter.split()[1]) if level_filter != "All" else None
+        if search:
+            # The store's search index, instead of scanning the whole table
+            matches = auth_manager.search_users(search, SEARCH_LIMIT)
+            rows = [user_progress_row(user) for user in matches]
+            if level_num is not None:
+                rows = [row for row in rows if row['Level'] == level_num]
+            truncated = len(matches) >= SEARCH_LIMIT
+        else:
+            rows = find_users_at_level(level_num, SEARCH_LIMIT)
+            truncated = len(rows) >= SEARCH_LIMIT
+        if truncated:
+            st.caption(f"Showing the first {SEARCH_LIMIT} matches; narrow the search to find the others")
+        filtered_df = pd.DataFrame(rows)
+        page_users = None
+    else:
+        # Unfiltered: page through the store's sort order instead of the full table
+        sort_by, descending = USER_SORT_OPTIONS[list_sort]
+        page_users = load_users_page("user_list", sort_by, descending, list_page_size)
+        filtered_df = pd.DataFrame([user_progress_row(user) for user in page_users])
     
     # Display table
     st.dataframe(
@@ -710,36 +835,50 @@ with tab1:
         }
     )
     
-    # Download button
-    csv = filtered_df.to_csv(index=False)
-    st.download_button(
-        label="📥 Download User Data (CSV)",
-        data=csv,
-        file_name=f"user_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv"
-    )
+    if page_users is not None:
+        render_pager("user_list", page_users, auth_manager.count_users())
+    
+    # Download button: the CSV is only built on request, not on every rerun
+    export_view = (search, level_filter)
+    if st.button("📦 Prepare CSV Download", key="user_list_export"):
+        # Unfiltered, download everything, not just the page on screen
+        export_df = create_users_dataframe() if page_users is not None else filtered_df
+        st.session_state.user_list_csv = (export_view, export_df.to_csv(index=False))
+    prepared = st.session_state.get("user_list_csv")
+    if prepared and prepared[0] == export_view:
+        st.download_button(
+            label="📥 Download User Data (CSV)",
+            data=prepared[1],
+            file_name=f"user_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
 
 # TAB 2: Analytics
 with tab2:
     st.markdown('<h2 class="section-header"><span>📊</span> Analytics Dashboard</h2>', unsafe_allow_html=True)
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        level_chart = create_level_distribution_chart(df)
-        if level_chart is not None:
-            st.plotly_chart(level_chart, use_container_width=True)
-        streak_chart = create_streak_chart(df)
-        if streak_chart is not None:
-            st.plotly_chart(streak_chart, use_container_width=True)
-    
-    with col2:
-        score_chart = create_score_distribution_chart(df)
-        if score_chart is not None:
-            st.plotly_chart(score_chart, use_container_width=True)
-        engagement_chart = create_engagement_chart(df)
-        if engagement_chart is not None:
-            st.plotly_chart(engagement_chart, use_container_width=True)
+    # The charts need every user, so the table behind them is only built when asked for
+    if st.checkbox("📊 Build charts from every user", key="analytics_enabled"):
+        df = create_users_dataframe()
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            level_chart = create_level_distribution_chart(df)
+            if level_chart is not None:
+                st.plotly_chart(level_chart, use_container_width=True)
+            streak_chart = create_streak_chart(df)
+            if streak_chart is not None:
+                st.plotly_chart(streak_chart, use_container_width=True)
+        
+        with col2:
+            score_chart = create_score_distribution_chart(df)
+            if score_chart is not None:
+                st.plotly_chart(score_chart, use_container_width=True)
+            engagement_chart = create_engagement_chart(df)
+            if engagement_chart is not None:
+                st.plotly_chart(engagement_chart, use_container_width=True)
+    else:
+        st.info("💡 Charts read the whole user store; tick the box above to build them")
 
 # TAB 3: Leaderboard
 with tab3:
@@ -749,19 +888,18 @@ with tab3:
     
     with col1:
         st.markdown('<h3 style="color: #667eea; font-size: 1.5rem; margin-bottom: 20px;">🥇 Highest Scores</h3>', unsafe_allow_html=True)
-        # Check if required columns exist
-        if not df.empty and 'High Score' in df.columns and 'Username' in df.columns:
-            top_scores = df.nlargest(5, 'High Score')[['Username', 'High Score']]
-            for idx, row in top_scores.iterrows():
-                rank = top_scores.index.get_loc(idx)
+        # Maintained by the auth store, so no scan over all users
+        top_scores = auth_manager.get_leaderboard("high_score", 5)
+        if top_scores:
+            for rank, row in enumerate(top_scores):
                 medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
                 colors = ["#FFD700", "#C0C0C0", "#CD7F32", "rgba(102, 126, 234, 0.5)", "rgba(118, 75, 162, 0.5)"]
                 st.markdown(f"""
                 <div class="leaderboard-item" style="border-left-color: {colors[rank]};">
                     <span class="rank-medal">{medals[rank]}</span>
                     <div style="flex: 1;">
-                        <strong style="font-size: 1.1rem; color: white;">{row['Username']}</strong>
-                        <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">{row['High Score']} points</div>
+                        <strong style="font-size: 1.1rem; color: white;">{row['username']}</strong>
+                        <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">{row['value']} points</div>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -770,19 +908,17 @@ with tab3:
     
     with col2:
         st.markdown('<h3 style="color: #f093fb; font-size: 1.5rem; margin-bottom: 20px;">🔥 Best Streaks</h3>', unsafe_allow_html=True)
-        # Check if required columns exist
-        if not df.empty and 'Max Streak' in df.columns and 'Username' in df.columns:
-            top_streaks = df.nlargest(5, 'Max Streak')[['Username', 'Max Streak']]
-            for idx, row in top_streaks.iterrows():
-                rank = top_streaks.index.get_loc(idx)
+        top_streaks = auth_manager.get_leaderboard("max_streak", 5)
+        if top_streaks:
+            for rank, row in enumerate(top_streaks):
                 medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
                 colors = ["#FFD700", "#C0C0C0", "#CD7F32", "rgba(240, 147, 251, 0.5)", "rgba(245, 87, 108, 0.5)"]
                 st.markdown(f"""
                 <div class="leaderboard-item" style="border-left-color: {colors[rank]};">
                     <span class="rank-medal">{medals[rank]}</span>
                     <div style="flex: 1;">
-                        <strong style="font-size: 1.1rem; color: white;">{row['Username']}</strong>
-                        <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">{row['Max Streak']}x streak</div>
+                        <strong style="font-size: 1.1rem; color: white;">{row['username']}</strong>
+                        <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">{row['value']}x streak</div>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -791,19 +927,17 @@ with tab3:
     
     with col3:
         st.markdown('<h3 style="color: #43e97b; font-size: 1.5rem; margin-bottom: 20px;">⭐ Most Perfect Levels</h3>', unsafe_allow_html=True)
-        # Check if required columns exist
-        if not df.empty and 'Perfect Levels' in df.columns and 'Username' in df.columns:
-            top_perfect = df.nlargest(5, 'Perfect Levels')[['Username', 'Perfect Levels']]
-            for idx, row in top_perfect.iterrows():
-                rank = top_perfect.index.get_loc(idx)
+        top_perfect = auth_manager.get_leaderboard("perfect_levels", 5)
+        if top_perfect:
+            for rank, row in enumerate(top_perfect):
                 medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
                 colors = ["#FFD700", "#C0C0C0", "#CD7F32", "rgba(67, 233, 123, 0.5)", "rgba(56, 249, 215, 0.5)"]
                 st.markdown(f"""
                 <div class="leaderboard-item" style="border-left-color: {colors[rank]};">
                     <span class="rank-medal">{medals[rank]}</span>
                     <div style="flex: 1;">
-                        <strong style="font-size: 1.1rem; color: white;">{row['Username']}</strong>
-                        <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">{row['Perfect Levels']} perfect levels</div>
+                        <strong style="font-size: 1.1rem; color: white;">{row['username']}</strong>
+                        <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">{row['value']} perfect levels</div>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -814,11 +948,24 @@ with tab3:
 with tab4:
     st.markdown('<h2 class="section-header"><span>🔍</span> Detailed User Information</h2>', unsafe_allow_html=True)
     
-    if not df.empty:
-        selected_user = st.selectbox("👤 Select User to View Details", df['Username'].tolist(), key="user_detail_select")
+    if auth_manager.count_users():
+        detail_search = st.text_input("🔍 Find user by username or email", "", placeholder="Type to search...", key="user_detail_search")
+        if detail_search.strip():
+            detail_options = [u['username'] for u in auth_manager.search_users(detail_search, SEARCH_LIMIT)]
+            if len(detail_options) >= SEARCH_LIMIT:
+                st.caption(f"Showing the first {SEARCH_LIMIT} matches; narrow the search to find the others")
+        else:
+            detail_options = [u['username'] for u in auth_manager.iter_users(limit=SEARCH_LIMIT)]
+            if auth_manager.count_users() > SEARCH_LIMIT:
+                st.caption(f"Showing the first {SEARCH_LIMIT} users by username; search to find the others")
+        selected_user = st.selectbox("👤 Select User to View Details", detail_options, key="user_detail_select")
         
-        if selected_user:
-            user_row = df[df['Username'] == selected_user].iloc[0]
+        # Just the selected user, looked up in the store
+        selected_details = auth_manager.get_user_details(selected_user) if selected_user else None
+        if selected_user and selected_details is None:
+            st.warning(f"User '{selected_user}' no longer exists")
+        if selected_details is not None:
+            user_row = user_progress_row(selected_details)
             
             col1, col2, col3 = st.columns(3)
             
@@ -898,9 +1045,19 @@ with tab4:
 with tab5:
     st.markdown('<h2 class="section-header"><span>⚙️</span> Account Management</h2>', unsafe_allow_html=True)
     
-    # Get all users for the entire tab
-    all_users = auth_manager.get_all_users()
+    # Users for the account pickers of the entire tab: search matches, or the first page by name
+    account_search = st.text_input("🔍 Find accounts by username or email", "", placeholder="Type to search...", key="account_search")
+    if account_search.strip():
+        all_users = auth_manager.search_users(account_search, SEARCH_LIMIT)
+        if len(all_users) >= SEARCH_LIMIT:
+            st.caption(f"Showing the first {SEARCH_LIMIT} matches; narrow the search to find the others")
+    else:
+        all_users = list(auth_manager.iter_users(limit=SEARCH_LIMIT))
+        if auth_manager.count_users() > SEARCH_LIMIT:
+            st.caption(f"Showing the first {SEARCH_LIMIT} accounts by username; search to find the others")
     user_options = [u['username'] for u in all_users] if all_users else []
+    # Archived accounts are not in the store's lists; bulk actions and restore bring them back
+    archived_options = auth_manager.search_archived(account_search, SEARCH_LIMIT)
     
     # Create four columns for different actions
     action_col1, action_col2, action_col3, action_col4 = st.columns(4)
@@ -941,13 +1098,13 @@ with tab5:
         
         # Check if users are available
         if all_users and user_options:
-            
+        
             with st.form("toggle_user_form"):
                 selected_toggle_user = st.selectbox("👤 Select User", user_options, key="toggle_user_select")
                 
                 # Get user status
                 user_status = auth_manager.get_user_status(selected_toggle_user)
-                is_active = user_status.get('is_active', True) if user_status else True
+                is_active = user_status['is_active'] if user_status else True
                 
                 if is_active:
                     st.info(f"✅ Account '{selected_toggle_user}' is currently **ACTIVE**")
@@ -1086,14 +1243,152 @@ with tab5:
         else:
             st.info("📭 No users available for editing")
     
+    # Bulk actions: one store write per action, however many accounts are selected
+    st.markdown('<div style="height: 40px;"></div>', unsafe_allow_html=True)
+    st.markdown('<h3 style="color: #667eea; font-size: 1.5rem; margin-bottom: 20px;">📦 Bulk Actions</h3>', unsafe_allow_html=True)
+    
+    bulk_col1, bulk_col2 = st.columns(2)
+    
+    with bulk_col1:
+        # The last action's outcome, kept across the rerun that refreshed the lists
+        bulk_result = st.session_state.pop("bulk_action_result", None)
+        if bulk_result:
+            applied_action, results = bulk_result
+            succeeded = sum(1 for success, _ in results if success)
+            st.success(f"✅ {applied_action} applied to {succeeded} of {len(results)} accounts")
+            for success, message in results:
+                if not success:
+                    st.error(f"❌ {message}")
+        
+        if user_options or archived_options:
+            with st.form("bulk_action_form"):
+                selected_bulk_users = st.multiselect("👥 Select Users", user_options + archived_options, key="bulk_user_select")
+                if archived_options:
+                    st.caption(f"🧊 Includes {len(archived_options)} archived accounts; acting on one restores it first")
+                bulk_action = st.selectbox("⚙️ Action", ["✅ Activate", "⛔ Disable", "🗑️ Delete"], key="bulk_action_select")
+                confirm_bulk_delete = st.checkbox("✅ I understand deleting is permanent", key="confirm_bulk_delete_checkbox")
+                
+                submit_bulk = st.form_submit_button("⚡ Apply to Selected", use_container_width=True, type="primary")
+                
+                if submit_bulk:
+                    if not selected_bulk_users:
+                        st.warning("⚠️ Please select at least one user")
+                    elif bulk_action == "🗑️ Delete" and not confirm_bulk_delete:
+                        st.error("❌ Please check the confirmation box to delete these accounts")
+                    else:
+                        if bulk_action == "✅ Activate":
+                            results = auth_manager.bulk_activate(selected_bulk_users)
+                        elif bulk_action == "⛔ Disable":
+                            results = auth_manager.bulk_disable(selected_bulk_users)
+                        else:
+                            results = auth_manager.bulk_delete(selected_bulk_users)
+                        
+                        # Shown above after the rerun, errors included
+                        st.session_state.bulk_action_result = (bulk_action, results)
+                        st.rerun()
+        else:
+            st.info("📭 No users available for bulk actions")
+    
+    with bulk_col2:
+        with st.form("bulk_create_form"):
+            roster_text = st.text_area(
+                "📋 Accounts to Create",
+                placeholder="One account per line: username,password,email",
+                height=150
+            )
+            
+            submit_bulk_create = st.form_submit_button("➕ Create All", use_container_width=True, type="primary")
+            
+            if submit_bulk_create:
+                accounts = []
+                for line in roster_text.splitlines():
+                    if line.strip():
+                        parts = [part.strip() for part in line.split(",")]
+                        accounts.append({
+                            "username": parts[0],
+                            "password": parts[1] if len(parts) > 1 else "",
+                            "email": parts[2] if len(parts) > 2 else ""
+                        })
+                
+                if accounts:
+                    results = auth_manager.bulk_create(accounts)
+                    succeeded = sum(1 for success, _ in results if success)
+                    st.success(f"✅ Created {succeeded} of {len(results)} accounts")
+                    for account, (success, message) in zip(accounts, results):
+                        if not success:
+                            st.error(f"❌ {account['username'] or '(blank)'}: {message}")
+                else:
+                    st.warning("⚠️ Please enter at least one account")
+        
+        roster_file = st.file_uploader("📤 Upload Roster (CSV or JSON)", type=["csv", "json"], key="roster_upload")
+        if roster_file is not None and st.button("📥 Import Roster", use_container_width=True, key="import_roster_button"):
+            try:
+                with st.spinner("Importing roster..."):
+                    report = auth_manager.import_roster(roster_file)
+            except (ValueError, KeyError, AttributeError) as e:
+                st.error(f"❌ Could not read roster: {e}")
+            else:
+                st.success(f"✅ Created {report['created']} of {report['total']} accounts "
+                           f"({report['users_per_sec']:,.0f} users/sec)")
+                for username, message in report["failed"]:
+                    st.error(f"❌ {username or '(blank)'}: {message}")
+    
+    # Cold storage: dormant accounts leave the files every load and write goes through
+    st.markdown('<div style="height: 40px;"></div>', unsafe_allow_html=True)
+    st.markdown('<h3 style="color: #667eea; font-size: 1.5rem; margin-bottom: 20px;">🧊 Cold Storage</h3>', unsafe_allow_html=True)
+    st.caption("Disabled accounts and accounts without a recent login move to a compressed archive. "
+               "They come back automatically when the player logs in or an admin opens or activates them.")
+    
+    archive_col1, archive_col2 = st.columns([1, 2])
+    
+    with archive_col1:
+        with st.form("archive_form"):
+            inactive_days = st.number_input("📅 Archive after days without login", min_value=1,
+                                            value=ARCHIVE_INACTIVE_DAYS, step=1)
+            submit_archive = st.form_submit_button("🧊 Archive Dormant Accounts", use_container_width=True, type="primary")
+    
+    with archive_col2:
+        if submit_archive:
+            with st.spinner("Archiving accounts..."):
+                report = auth_manager.archive_accounts(int(inactive_days))
+            st.success(f"✅ Archived {report['archived']:,} accounts in {report['seconds']:.2f}s")
+            shrink_col1, shrink_col2, shrink_col3 = st.columns(3)
+            shrink_col1.metric("Hot Files Before", f"{report['hot_bytes_before'] / 1024:,.1f} KB")
+            shrink_col2.metric("Hot Files After", f"{report['hot_bytes_after'] / 1024:,.1f} KB",
+                               delta=f"{(report['hot_bytes_after'] - report['hot_bytes_before']) / 1024:,.1f} KB",
+                               delta_color="inverse")
+            shrink_col3.metric("Archive Size", f"{report['archive_bytes'] / 1024:,.1f} KB")
+        
+        status = auth_manager.archive_status()
+        status_col1, status_col2, status_col3 = st.columns(3)
+        status_col1.metric("Archived Accounts", f"{status['archived']:,}")
+        status_col2.metric("Hot Files", f"{status['hot_bytes'] / 1024:,.1f} KB")
+        status_col3.metric("Archive", f"{status['archive_bytes'] / 1024:,.1f} KB")
+        
+        if archived_options:
+            with st.form("restore_form"):
+                selected_restore = st.multiselect("🧊 Archived Accounts", archived_options, key="restore_select")
+                if len(archived_options) >= SEARCH_LIMIT:
+                    st.caption(f"Showing the first {SEARCH_LIMIT} archived accounts; search above to find the others")
+                submit_restore = st.form_submit_button("♻️ Restore Selected", use_container_width=True)
+                
+                if submit_restore:
+                    for success, message in auth_manager.restore_users(selected_restore):
+                        if success:
+                            st.success(f"✅ {message}")
+                        else:
+                            st.error(f"❌ {message}")
+        elif account_search.strip():
+            st.caption("No archived accounts match the search")
+    
     # Account Management Statistics
     st.markdown('<div style="height: 40px;"></div>', unsafe_allow_html=True)
     st.markdown('<h3 style="color: #667eea; font-size: 1.5rem; margin-bottom: 20px;">📊 Account Status Overview</h3>', unsafe_allow_html=True)
     
-    if all_users:
+    if auth_manager.count_users():
         # Calculate statistics
-        total_accounts = len(all_users)
-        active_accounts = sum(1 for u in all_users if u.get('is_active', True))
+        total_accounts = auth_manager.count_users()
+        active_accounts = auth_manager.count_users("active")
         disabled_accounts = total_accounts - active_accounts
         
         stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
@@ -1135,18 +1430,32 @@ with tab5:
             </div>
             """, unsafe_allow_html=True)
         
+        if status["archived"]:
+            st.caption(f"🧊 Not counted: {status['archived']:,} archived accounts (see Cold Storage above)")
+        
         # Detailed account list
         st.markdown('<div style="height: 30px;"></div>', unsafe_allow_html=True)
         st.markdown('<h3 style="color: #667eea; font-size: 1.5rem; margin-bottom: 20px;">📝 Account Details</h3>', unsafe_allow_html=True)
         
+        details_col1, details_col2, details_col3 = st.columns(3)
+        with details_col1:
+            details_sort = st.selectbox("↕️ Sort by", list(USER_SORT_OPTIONS), key="account_details_sort")
+        with details_col2:
+            details_status = st.selectbox("🟢 Status", ["All", "Active", "Disabled"], key="account_details_status")
+        with details_col3:
+            details_page_size = st.selectbox("📄 Per page", [25, 50, 100, 250], key="account_details_page_size")
+        
+        sort_by, descending = USER_SORT_OPTIONS[details_sort]
+        status_filter = None if details_status == "All" else details_status.lower()
+        page_users = load_users_page("account_details", sort_by, descending, details_page_size, status_filter)
+        
         # Create DataFrame for account status
         account_data = []
-        for user in all_users:
-            status = auth_manager.get_user_status(user['username'])
+        for user in page_users:
             account_data.append({
                 'Username': user['username'],
                 'Email': user.get('email', 'N/A'),
-                'Status': '✅ Active' if status.get('is_active', True) else '⛔ Disabled',
+                'Status': '✅ Active' if user['is_active'] else '⛔ Disabled',
                 'Created': user.get('created_at', 'N/A')[:10] if user.get('created_at') and user.get('created_at') != 'N/A' else 'N/A',
                 'Last Login': user.get('last_login', 'Never')[:10] if user.get('last_login') and user.get('last_login') != 'Never' else 'Never',
                 'Total Games': user.get('total_games', 0),
@@ -1163,11 +1472,15 @@ with tab5:
                 "Email": st.column_config.TextColumn("📧 Email", width="medium"),
                 "Status": st.column_config.TextColumn("🟢 Status", width="small"),
                 "Created": st.column_config.TextColumn("📅 Created", width="small"),
-                "Last Login": st.column_config.TextColumn("🕐 Last Login", width="small"),
+                "Last Login": st.column_config.TextColumn(
+                    "🕐 Last Login", width="small",
+                    help=f"The game records logins in batches, up to {LOGIN_STALENESS_MS // 1000} s late"
+                ),
                 "Total Games": st.column_config.NumberColumn("🎮 Games", format="%d"),
                 "High Score": st.column_config.NumberColumn("🏆 High Score", format="%d")
             }
         )
+        render_pager("account_details", page_users, auth_manager.count_users(status_filter))
     else:
         st.info("📭 No accounts to display")
 
@@ -1185,7 +1498,7 @@ with tab6:
         
         if "django_token" not in st.session_state:
             st.session_state.django_token = None
-            
+        
         with st.form("django_admin_login_questions"):
             django_username = st.text_input("👤 Django Username", placeholder="Enter Django superuser username")
             django_password = st.text_input("🔑 Django Password", type="password", placeholder="Enter Django superuser password")
@@ -1526,7 +1839,7 @@ with tab7:
         
         if "django_token" not in st.session_state:
             st.session_state.django_token = None
-            
+        
         with st.form("django_admin_login"):
             django_username = st.text_input("👤 Django Username", placeholder="Enter Django superuser username")
             django_password = st.text_input("🔑 Django Password", type="password", placeholder="Enter Django superuser password")
@@ -1690,6 +2003,51 @@ with tab7:
     </div>
     """, unsafe_allow_html=True)
 
+with tab8:
+    st.markdown('<h2 class="section-header"><span>⏱️</span> Store Metrics</h2>', unsafe_allow_html=True)
+    
+    metrics_file = st.text_input("📄 Metrics file", os.environ.get(METRICS_ENV) or DEFAULT_METRICS_FILE,
+                                 help=f"Prometheus text dumped by the game or the store daemon when started with {METRICS_ENV} set")
+    
+    if not os.path.exists(metrics_file):
+        st.info(f"📭 No metrics yet. Start the game (or auth_server.py) with {METRICS_ENV}={metrics_file} "
+                "and the auth store will dump its metrics there every few seconds.")
+    else:
+        metrics = load_prometheus(metrics_file)
+        age = time.time() - os.path.getmtime(metrics_file)
+        st.caption(f"Dumped {age:.0f}s ago by the process that owns the store")
+        
+        ops_df = pd.DataFrame(latency_rows(metrics.get('auth_store_operation_seconds', {})))
+        latency_chart = create_latency_chart(ops_df)
+        if latency_chart:
+            st.plotly_chart(latency_chart, use_container_width=True)
+        if not ops_df.empty:
+            st.dataframe(ops_df, use_container_width=True, hide_index=True)
+        
+        # File I/O per store file
+        parse = metrics.get('auth_store_parse_seconds', {})
+        serialize = metrics.get('auth_store_serialize_seconds', {})
+        files = sorted(set(parse) | set(serialize) | set(metrics.get('auth_store_bytes_read_total', {}))
+                       | set(metrics.get('auth_store_bytes_written_total', {})))
+        if files:
+            st.markdown("### 💾 File I/O")
+            st.dataframe(pd.DataFrame([{
+                'File': name,
+                'Records': int(metrics.get('auth_store_records', {}).get(name, 0)),
+                'Read (MB)': round(metrics.get('auth_store_bytes_read_total', {}).get(name, 0) / 1e6, 2),
+                'Written (MB)': round(metrics.get('auth_store_bytes_written_total', {}).get(name, 0) / 1e6, 2),
+                'Records Read': int(metrics.get('auth_store_records_read_total', {}).get(name, 0)),
+                'Records Written': int(metrics.get('auth_store_records_written_total', {}).get(name, 0)),
+                'Parse p99 (ms)': round(parse[name]['p99'] * 1000, 3) if name in parse else None,
+                'Serialize p99 (ms)': round(serialize[name]['p99'] * 1000, 3) if name in serialize else None
+            } for name in files]), use_container_width=True, hide_index=True)
+        
+        lock_wait = metrics.get('auth_store_lock_wait_seconds', {})
+        if lock_wait:
+            st.markdown("### 🔒 File Lock Wait")
+            lock_df = pd.DataFrame(latency_rows(lock_wait)).rename(columns={'Operation': 'Mode', 'Calls': 'Acquisitions'})
+            st.dataframe(lock_df, use_container_width=True, hide_index=True)
+
 # Footer
 st.markdown('<div style="height: 50px;"></div>', unsafe_allow_html=True)
 st.markdown("""
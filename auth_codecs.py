@@ -0,0 +1,314 @@
+"""
+Snapshot codecs for the auth store
+Turns the {"users": [...]} document into file bytes and back
+
+JSON codecs write plain JSON, which any reader (and the `{` it starts with)
+recognises. Binary codecs start with a one-line header naming the codec,
+so a reader picks the right decoder without being told.
+"""
+
+import codecs
+import gzip
+import json
+from typing import Dict, Iterator, Tuple
+
+# Optional fast codecs; without them the store falls back to stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+HEADER_PREFIX = b"%AUTHSTORE codec="
+
+# Bytes read at a time by the streaming reader
+STREAM_CHUNK_SIZE = 1 << 16
+
+# First bytes of a gzip stream, for telling compressed exports apart
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class CodecUnavailableError(RuntimeError):
+    """A store file needs a codec library that is not installed"""
+
+
+class JSONCodec:
+    """Stdlib JSON, indented (the original users.json format) or compact"""
+    
+    binary = False
+    
+    def __init__(self, name: str, indent: int = None):
+        self.name = name
+        self.indent = indent
+        self.separators = None if indent else (",", ":")
+    
+    def encode(self, data: Dict) -> bytes:
+        """Serialize the store document"""
+        return json.dumps(data, indent=self.indent, separators=self.separators).encode()
+    
+    def decode(self, raw: bytes) -> Dict:
+        """Parse the store document"""
+        return _loads_json(raw)
+
+
+class OrjsonCodec:
+    """orjson: compact JSON, serialized and parsed in C"""
+    
+    name = "orjson"
+    binary = False
+    
+    def encode(self, data: Dict) -> bytes:
+        """Serialize the store document"""
+        return orjson.dumps(data)
+    
+    def decode(self, raw: bytes) -> Dict:
+        """Parse the store document"""
+        return orjson.loads(raw)
+
+
+class MsgpackCodec:
+    """MessagePack: binary, behind a codec header"""
+    
+    name = "msgpack"
+    binary = True
+    
+    def encode(self, data: Dict) -> bytes:
+        """Serialize the store document"""
+        return msgpack.packb(data, use_bin_type=True)
+    
+    def decode(self, raw: bytes) -> Dict:
+        """Parse the store document"""
+        return msgpack.unpackb(raw, raw=False)
+
+
+def _loads_json(raw: bytes) -> Dict:
+    """Parse JSON with orjson when installed (same result, a lot faster)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+CODECS = {
+    "json": JSONCodec("json", indent=2),
+    "json-compact": JSONCodec("json-compact"),
+    "orjson": OrjsonCodec(),
+    "msgpack": MsgpackCodec(),
+}
+
+# What each optional codec degrades to when its library is missing
+FALLBACKS = {"orjson": "json-compact", "msgpack": "orjson"}
+
+
+def available(name: str) -> bool:
+    """Whether a codec's library is installed"""
+    if name == "orjson":
+        return ORJSON_AVAILABLE
+    if name == "msgpack":
+        return MSGPACK_AVAILABLE
+    return name in CODECS
+
+
+def get_codec(name: str = "json"):
+    """
+    Look up a codec by name, falling back to an installed one
+    
+    Raises:
+        ValueError: For a name not in CODECS
+    """
+    if name not in CODECS:
+        raise ValueError(f"codec must be one of {tuple(CODECS)}, not {name!r}")
+    while not available(name):
+        name = FALLBACKS[name]
+    return CODECS[name]
+
+
+def encode_store(data: Dict, codec) -> bytes:
+    """File contents for a store document, with a header for binary codecs"""
+    payload = codec.encode(data)
+    if codec.binary:
+        return HEADER_PREFIX + codec.name.encode() + b"\n" + payload
+    return payload
+
+
+def decode_store(raw: bytes) -> Dict:
+    """
+    Parse store file contents written by any codec
+    
+    Raises:
+        ValueError: If the contents are corrupt
+        CodecUnavailableError: If the codec's library is not installed
+    """
+    if not raw.startswith(HEADER_PREFIX):
+        return _loads_json(raw)
+    
+    header_end = raw.find(b"\n")
+    name = raw[len(HEADER_PREFIX):header_end].decode() if header_end > 0 else ""
+    if name not in CODECS or not CODECS[name].binary:
+        raise ValueError(f"Unknown store codec header {raw[:header_end]!r}")
+    if not available(name):
+        # Not a ValueError: the store must not mistake this for an empty file
+        raise CodecUnavailableError(f"Store file was written with {name}, which is not installed")
+    return CODECS[name].decode(raw[header_end + 1:])
+
+
+def load_store_file(path: str) -> Dict:
+    """Read and parse a store file written by any codec"""
+    with open(path, 'rb') as f:
+        return decode_store(f.read())
+
+
+class _JSONStream:
+    """Incremental JSON tokenizer over a binary file, holding one value at a time"""
+    
+    _decoder = json.JSONDecoder()
+    
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self) -> bool:
+        """Read another chunk; False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        # Drop what has been consumed so the buffer stays about one chunk long
+        self.buf = self.buf[self.pos:] + self.utf8.decode(chunk, final=self.eof)
+        self.pos = 0
+        return not self.eof
+    
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+    
+    def expect(self, char: str):
+        """Consume one structural character"""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in store file, found {self.peek()!r}")
+        self.pos += 1
+    
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely cut off at the end of the buffer: read on and retry
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buf) and not self.eof and not isinstance(value, (dict, list, str)):
+                # A number at the very end of the buffer may continue in the next chunk
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json_users(f) -> Iterator[Dict]:
+    """Yield the records of the top-level "users" array of a JSON store file"""
+    stream = _JSONStream(f)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "users":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == "]":
+                        stream.pos += 1
+                        break
+                    stream.expect(",")
+        else:
+            stream.value()
+        
+        if stream.peek() == "}":
+            return
+        stream.expect(",")
+
+
+def _iter_msgpack_users(f) -> Iterator[Dict]:
+    """Yield the records of the "users" array of a msgpack store file"""
+    unpacker = msgpack.Unpacker(f, raw=False)
+    for _ in range(unpacker.read_map_header()):
+        if unpacker.unpack() == "users":
+            for _ in range(unpacker.read_array_header()):
+                yield unpacker.unpack()
+        else:
+            unpacker.skip()
+
+
+def iter_store_users(f) -> Iterator[Dict]:
+    """
+    Yield user records one at a time from an open (binary) store file
+    
+    Memory stays bounded by one record plus a read buffer, however large
+    the file is.
+    
+    Raises:
+        ValueError: If the contents are corrupt
+        CodecUnavailableError: If the codec's library is not installed
+    """
+    head = f.read(len(HEADER_PREFIX))
+    if head != HEADER_PREFIX:
+        f.seek(-len(head), 1)
+        yield from _iter_json_users(f)
+        return
+    
+    name = f.readline().rstrip(b"\n").decode()
+    if name not in CODECS or not CODECS[name].binary:
+        raise ValueError(f"Unknown store codec {name!r}")
+    if not available(name):
+        raise CodecUnavailableError(f"Store file was written with {name}, which is not installed")
+    yield from _iter_msgpack_users(f)
+
+
+def encode_record_line(record: Dict) -> bytes:
+    """One NDJSON line (compact JSON plus a newline) for a plain record"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(record) + b"\n"
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+def open_ndjson(path: str):
+    """Open an NDJSON file for binary line reading, gzipped or not"""
+    with open(path, 'rb') as f:
+        compressed = f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    return gzip.open(path, 'rb') if compressed else open(path, 'rb')
+
+
+def iter_ndjson_records(f) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (line number, parsed value) for the lines of an NDJSON file
+    
+    Blank lines are skipped. A line that does not parse yields its
+    ValueError in place of the value, so one bad line does not end the read.
+    """
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, _loads_json(line)
+        except ValueError as e:
+            yield number, e
@@ -3,408 +3,2927 @@ JSON-based Authentication Manager
 Handles user registration and login with local JSON storage
 """
 
+import atexit
+import bisect
+import csv
+import gzip
+import heapq
+import io
 import json
 import hashlib
 import os
-from typing import Tuple, Optional, Dict
-from datetime import datetime
+import threading
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Tuple, Optional, Dict, List
+from datetime import datetime, timedelta
+
+from auth_metrics import MetricsRegistry, instrument
+from auth_codecs import (CODECS, decode_store, encode_record_line, encode_store, get_codec, iter_ndjson_records,
+                         iter_store_users, load_store_file, open_ndjson)
+from auth_records import RecordView, UserRecord, to_plain
+from auth_schema import SCHEMA_VERSION, upgrade_progress_record, upgrade_user
+
+# fcntl is POSIX-only; on Windows the store falls back to in-process locking
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+FSYNC_POLICIES = ("always", "batched", "never")
+
+# Fields never shown outside the store: the password, and the record's
+# version and schema, which are bookkeeping for writes and upgrades
+HIDDEN_FIELDS = frozenset({"password", "version", "schema"})
+
+# Below this many passwords a process pool costs more than it saves
+PARALLEL_HASH_MIN = 5000
+
+# Orders kept sorted for iter_users() (and prefix search), and the filters
+# count_users() knows
+SORT_FIELDS = ("username", "high_score", "last_login", "created_at", "email")
+USER_STATUSES = ("active", "disabled")
+
+# Users handed out per lock acquisition while iterating
+ITER_BATCH_SIZE = 256
+
+# Substring search indexes every run of this many characters
+NGRAM = 3
+
+# Records per write when import_snapshot loads a backup
+IMPORT_CHUNK_SIZE = 5000
+
+# gzip level of compressed exports: most of the size win of 9, far faster
+EXPORT_GZIP_LEVEL = 6
+
+# Metrics with a maintained top-K board; the last two come from saved_progress
+LEADERBOARD_METRICS = ("high_score", "max_streak", "perfect_levels")
+
+# How late a login may reach the disk in the game (login_staleness_ms)
+LOGIN_STALENESS_MS = 30_000
+
+# archive_accounts() moves accounts with no login for this many days to cold storage
+ARCHIVE_INACTIVE_DAYS = 90
+
+# Archived records per compressed block; rehydrating an account inflates one block
+ARCHIVE_BLOCK_SIZE = 256
+
+# Optimistic compare-and-swap attempts before a write falls back to holding
+# the write lock from read to write
+CAS_ATTEMPTS = 5
+
+# Change value that removes a field from a record
+_UNSET = object()
+
+
+def _hash_password_value(password: str) -> str:
+    """Hash password using SHA-256 (module-level so worker processes can run it)"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _write_ndjson(path: str, records, compress: Optional[bool] = None) -> Dict:
+    """
+    Stream plain records to an NDJSON file, replacing it atomically once complete
+    
+    Returns:
+        Dict with users, bytes (NDJSON before compression), file_bytes,
+        seconds and mb_per_sec (NDJSON bytes per second)
+    """
+    start = time.perf_counter()
+    if compress is None:
+        compress = path.endswith(".gz")
+    count = size = 0
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as f:
+            out = gzip.GzipFile(os.path.basename(path), 'wb', EXPORT_GZIP_LEVEL, f) if compress else f
+            batch = []
+            for record in records:
+                batch.append(encode_record_line(record))
+                if len(batch) == ITER_BATCH_SIZE:
+                    chunk = b"".join(batch)
+                    out.write(chunk)
+                    size += len(chunk)
+                    count += len(batch)
+                    batch = []
+            chunk = b"".join(batch)
+            out.write(chunk)
+            size += len(chunk)
+            count += len(batch)
+            if compress:
+                # Writes the gzip trailer; the file itself stays open
+                out.close()
+            f.flush()
+            os.fsync(f.fileno())
+            file_size = f.tell()
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    
+    seconds = time.perf_counter() - start
+    return {
+        "users": count,
+        "bytes": size,
+        "file_bytes": file_size,
+        "seconds": seconds,
+        "mb_per_sec": size / seconds / 1e6 if seconds > 0 else 0.0
+    }
+
+
+def _iter_backup_chunks(path: str, chunk_size: int, failed: List[Tuple[int, str]]):
+    """Yield lists of user records from an NDJSON backup, noting bad lines in failed"""
+    chunk = []
+    with open_ndjson(path) as f:
+        for number, record in iter_ndjson_records(f):
+            if isinstance(record, ValueError):
+                failed.append((number, f"Invalid JSON: {record}"))
+            elif (not isinstance(record, dict) or not isinstance(record.get("username"), str)
+                  or not record["username"].strip() or not isinstance(record.get("password"), str)):
+                failed.append((number, "Not a user record (needs a username and a password)"))
+            else:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def _import_report(start: float, counts: List[int], failed: List[Tuple[int, str]]) -> Dict:
+    """import_snapshot's report from [added, replaced, skipped] and the failed lines"""
+    seconds = time.perf_counter() - start
+    added, replaced, skipped = counts
+    return {
+        "total": added + replaced + skipped + len(failed),
+        "added": added,
+        "replaced": replaced,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": seconds,
+        "users_per_sec": (added + replaced) / seconds if seconds > 0 else 0.0
+    }
 
 
 class JSONAuthManager:
     """Manages user authentication with JSON file storage"""
     
-    def __init__(self, json_file: str = "users.json"):
-        self.json_file = json_file
-        self._initialize_file()
+    def __init__(self, json_file: str = "users.json", journal: bool = False,
+                 compact_threshold: int = 1024 * 1024,
+                 flush_interval_ms: Optional[int] = None, flush_max_records: int = 100,
+                 fsync: str = "batched", split_progress: bool = False,
+                 leaderboard_size: int = 100, codec: str = "json",
+                 login_staleness_ms: Optional[int] = None, single_writer: bool = False,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            json_file: Path of the users.json snapshot
+            journal: Append changes to "<json_file>.log" instead of rewriting
+                the snapshot on every write
+            compact_threshold: Minimum log size in bytes before it is folded
+                back into the snapshot (the log may also grow to the size of
+                the snapshot itself, keeping compaction cost amortized)
+            flush_interval_ms: Enable write-behind: buffer changes and write
+                them together at most this many milliseconds later
+            flush_max_records: Flush early once this many users are dirty
+            fsync: "always" syncs every write, "batched" syncs snapshots but
+                log appends at most once per second, "never" leaves it to the OS
+            split_progress: Keep saved_progress in a separate journaled store
+                ("<name>_progress.json") so progress saves never rewrite profiles
+            leaderboard_size: Entries kept per LEADERBOARD_METRICS board in
+                "<name>_leaderboard.json"; 0 disables the boards
+            codec: Snapshot format written, one of auth_codecs.CODECS: "json"
+                (indented), "json-compact", "orjson" or "msgpack". The last two
+                fall back to an installed codec; any format is read back.
+            login_staleness_ms: Keep the last_login set by login_user in memory
+                and persist it with the next write, or at most this many
+                milliseconds later (and at exit), so logins do not write to disk
+            single_writer: Promise that no other process writes the store (as
+                for the store daemon): the cache is never re-checked against
+                the files, and with flush_interval_ms every change is buffered
+            metrics: Registry to report method latencies, file parse/serialize
+                times, bytes, lock waits and record counts into (None: off)
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {tuple(CODECS)}, not {codec!r}")
+        
+        self.json_file = json_file
+        self.log_file = json_file + ".log"
+        self.journal = journal
+        self.compact_threshold = compact_threshold
+        self.flush_interval_ms = flush_interval_ms
+        self.flush_max_records = flush_max_records
+        self.fsync = fsync
+        self.codec = get_codec(codec)
+        self.single_writer = single_writer
+        self.metrics = metrics
+        
+        # Parsed copy of the JSON file plus a case-folded username index.
+        # Re-parsed only when the file's (mtime, size, inode) signature changes.
+        self._lock = threading.RLock()
+        self._data: Dict = {"users": []}
+        self._index: Dict[str, Dict] = {}
+        self._file_signature = None
+        # Insertion number of each indexed user: the users list is in this order
+        self._sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+        
+        # Sorted (value, key) lists per SORT_FIELDS entry, built on first use
+        # and then kept up to date by every applied or committed change
+        self._orders: Optional[Dict[str, list]] = None
+        self._order_values: Dict[str, Tuple] = {}
+        self._disabled_count = 0
+        
+        # Substring search: n-gram -> ids of the users whose "username\nemail"
+        # contains it. A changed or deleted user leaves its old id behind as
+        # a tombstone (None in _gram_keys) until the index is rebuilt.
+        self._grams: Optional[Dict[str, array]] = None
+        self._gram_keys: List[Optional[str]] = []
+        self._gram_ids: Dict[str, int] = {}
+        self._gram_texts: Dict[str, str] = {}
+        
+        # Top-K boards: metric -> sorted [(-value, key, username)] plus
+        # metric -> {key: value}, cached until the board file changes
+        self.leaderboard_size = leaderboard_size
+        self.leaderboard_file = os.path.splitext(json_file)[0] + "_leaderboard.json" if leaderboard_size else None
+        self._boards: Optional[Dict[str, list]] = None
+        self._board_members: Dict[str, Dict[str, int]] = {}
+        self._board_signature = None
+        
+        # Cold storage: dormant accounts as zlib-compressed NDJSON blocks
+        # appended to "<name>_archive.dat", found through "<name>_archive.json"
+        # (case-folded username -> [username, block offset, block length]),
+        # cached until the index file changes. Entries of accounts rehydrated
+        # since are left for the next archive_accounts() to drop: a hot
+        # record always wins over its archived copy
+        self.archive_file = os.path.splitext(json_file)[0] + "_archive.dat"
+        self.archive_index_file = os.path.splitext(json_file)[0] + "_archive.json"
+        self._archive_index: Dict[str, list] = {}
+        self._archive_signature = None
+        
+        # How far into the mutation log the cache has been replayed
+        self._log_inode = None
+        self._log_offset = 0
+        self._compacting = False
+        self._compaction_thread = None
+        
+        # Compare-and-swap writes that lost to a newer version and were retried
+        self.version_conflicts = 0
+        
+        # Schema upgrades: records below SCHEMA_VERSION are upgraded in the
+        # cache when first handed out, and the fields that filled in go out
+        # with the next write (case-folded username -> fields). Skipped
+        # entirely once the snapshot says every record is current.
+        self._upgrade = upgrade_user
+        self._schema_current = False
+        self._upgrades: Dict[str, set] = {}
+        
+        # Write-behind buffer: case-folded username -> [username, changed
+        # fields], where None means the whole record (added or deleted)
+        self._dirty: Dict[str, list] = {}
+        self._flush_timer = None
+        
+        # Login buffer: case-folded username -> [username, last_login] not yet
+        # on disk. Laid back over the cache whenever it is reloaded.
+        self.login_staleness_ms = login_staleness_ms
+        self._logins: Dict[str, list] = {}
+        self._login_timer = None
+        
+        # Cross-process lock: shared while reading, exclusive while writing.
+        # Held on a sidecar file because the snapshot itself gets replaced.
+        self.lock_file = json_file + ".lock"
+        self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644) if FCNTL_AVAILABLE else None
+        self._lock_mode = None
+        self._last_fsync = 0.0
+        
+        self._initialize_file()
+        
+        # Kept to unregister it by: instrument() below replaces self.flush
+        self._atexit_flush = None
+        if self.flush_interval_ms is not None or self.login_staleness_ms is not None:
+            self._atexit_flush = self.flush
+            atexit.register(self._atexit_flush)
+        
+        # Hot/cold split: progress changes on every answer, profiles rarely
+        self.progress_file = None
+        self._progress_store = None
+        if split_progress:
+            self.progress_file = os.path.splitext(json_file)[0] + "_progress.json"
+            self._progress_store = JSONAuthManager(
+                self.progress_file, journal=True, compact_threshold=compact_threshold,
+                flush_interval_ms=flush_interval_ms, flush_max_records=flush_max_records,
+                fsync=fsync, leaderboard_size=0, codec=codec, single_writer=single_writer
+            )
+            # Its file work counts; its methods only run on behalf of ours
+            self._progress_store.metrics = metrics
+            self._progress_store._upgrade = upgrade_progress_record
+        
+        if metrics is not None:
+            instrument(self, metrics)
+    
+    def _initialize_file(self):
+        """Initialize the JSON file if it doesn't exist"""
+        with self._file_lock(exclusive=True):
+            if not os.path.exists(self.json_file):
+                with open(self.json_file, 'wb') as f:
+                    f.write(encode_store({"schema": SCHEMA_VERSION, "users": []}, self.codec))
+    
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Hold the store lock, shared for readers or exclusive for writers"""
+        with self._lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            
+            if self._lock_fd is None:
+                raise ValueError(f"Auth store {self.json_file} is closed")
+            wanted = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            previous = self._lock_mode
+            if previous == wanted or previous == fcntl.LOCK_EX:
+                # Already held strongly enough further up this thread's stack
+                yield
+                return
+            
+            if self.metrics is not None:
+                start = time.perf_counter()
+                fcntl.flock(self._lock_fd, wanted)
+                self.metrics.observe("auth_store_lock_wait_seconds", "exclusive" if exclusive else "shared",
+                                     time.perf_counter() - start)
+            else:
+                fcntl.flock(self._lock_fd, wanted)
+            self._lock_mode = wanted
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, previous if previous is not None else fcntl.LOCK_UN)
+                self._lock_mode = previous
+    
+    def _write_lock(self, buffered: bool = True):
+        """Lock held by mutating methods across their read-modify-write cycle"""
+        if (buffered or self.single_writer) and self.flush_interval_ms is not None:
+            # Buffered changes only touch the cache; flush() takes the file lock
+            return self._lock
+        return self._file_lock(exclusive=True)
+    
+    def _sync(self, f, snapshot: bool = False):
+        """fsync a just-written file according to the fsync policy"""
+        if self.fsync == "never":
+            return
+        now = time.monotonic()
+        if self.fsync == "always" or snapshot or now - self._last_fsync >= 1.0:
+            os.fsync(f.fileno())
+            self._last_fsync = now
+    
+    def _sync_directory(self):
+        """fsync the store's directory so a rename survives a crash"""
+        if self.fsync != "always" or not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.json_file)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _hash_password(self, password: str) -> str:
+        """Hash password using SHA-256"""
+        return _hash_password_value(password)
+    
+    @staticmethod
+    def _key(username: str) -> str:
+        """Index key for a username (usernames are case-insensitive)"""
+        return username.casefold()
+    
+    @staticmethod
+    def _stat_signature(st: os.stat_result) -> Tuple[int, int, int]:
+        """Signature used to detect changes made to the file by other processes"""
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _rebuild_index(self):
+        """Rebuild the username index from the loaded data"""
+        index = {}
+        sequence = {}
+        users = self._data.get("users", [])
+        for number, user in enumerate(users):
+            # First match wins, same as the old linear scan
+            key = self._key(user["username"])
+            if key not in index:
+                index[key] = user
+                sequence[key] = number
+        self._index = index
+        self._sequence = sequence
+        self._next_sequence = len(users)
+        self._orders = None
+        self._grams = None
+    
+    def _sort_values(self, key: str, user: Dict) -> Tuple:
+        """Sort value of a user for each of SORT_FIELDS, then whether it is disabled"""
+        return (
+            key,
+            user.get("high_score") or 0,
+            user.get("last_login") or "",
+            user.get("created_at") or "",
+            (user.get("email") or "").casefold(),
+            not user.get("is_active", True)
+        )
+    
+    def _sort_orders(self) -> Dict[str, list]:
+        """The maintained sort orders, building them if the cache was reloaded"""
+        if self._orders is None:
+            values = {key: self._sort_values(key, user) for key, user in self._index.items()}
+            self._orders = {
+                field: sorted((v[position], key) for key, v in values.items())
+                for position, field in enumerate(SORT_FIELDS)
+            }
+            self._order_values = values
+            self._disabled_count = sum(1 for v in values.values() if v[-1])
+        return self._orders
+    
+    def _resort(self, key: str):
+        """Move one user to its current place in the sort orders (idempotent)"""
+        if self._orders is None:
+            return
+        
+        old = self._order_values.pop(key, None)
+        if old is not None:
+            for position, field in enumerate(SORT_FIELDS):
+                order = self._orders[field]
+                del order[bisect.bisect_left(order, (old[position], key))]
+            self._disabled_count -= old[-1]
+        
+        user = self._index.get(key)
+        if user is not None:
+            new = self._sort_values(key, user)
+            for position, field in enumerate(SORT_FIELDS):
+                bisect.insort(self._orders[field], (new[position], key))
+            self._order_values[key] = new
+            self._disabled_count += new[-1]
+        
+        if self._grams is not None and (user is None or self._search_text(user) != self._gram_texts.get(key)):
+            self._index_search_text(key, user)
+    
+    @staticmethod
+    def _search_text(user: Dict) -> str:
+        """What substring search looks in: case-folded username and email"""
+        return f"{user['username']}\n{user.get('email') or ''}".casefold()
+    
+    def _index_search_text(self, key: str, user: Optional[Dict]):
+        """(Re)index one user for substring search under a fresh id"""
+        old = self._gram_ids.pop(key, None)
+        if old is not None:
+            self._gram_keys[old] = None
+        self._gram_texts.pop(key, None)
+        if user is None:
+            return
+        
+        text = self._search_text(user)
+        number = len(self._gram_keys)
+        self._gram_keys.append(key)
+        self._gram_ids[key] = number
+        self._gram_texts[key] = text
+        for gram in {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}:
+            postings = self._grams.get(gram)
+            if postings is None:
+                postings = self._grams[gram] = array("I")
+            postings.append(number)
+    
+    def _search_grams(self) -> Dict[str, array]:
+        """The n-gram index, (re)building it when missing or mostly tombstones"""
+        if self._grams is None or len(self._gram_keys) > 2 * len(self._gram_ids) + 1024:
+            self._grams = {}
+            self._gram_keys = []
+            self._gram_ids = {}
+            self._gram_texts = {}
+            for key, user in self._index.items():
+                self._index_search_text(key, user)
+        return self._grams
+    
+    def _entry_key(self, entry: Dict) -> str:
+        """Case-folded username a mutation entry is about"""
+        return self._key(entry["user"]["username"] if entry.get("op") == "add" else entry["username"])
+    
+    def _load_users(self) -> Dict:
+        """Load users from JSON file, re-parsing only if it changed on disk"""
+        with self._lock:
+            if self.single_writer and self._file_signature is not None:
+                # Nobody else writes, so the files hold nothing the cache lacks
+                return self._data
+            try:
+                current = self._stat_signature(os.stat(self.json_file))
+            except FileNotFoundError:
+                current = None
+            try:
+                st = os.stat(self.log_file)
+                log_position = (st.st_ino, st.st_size)
+            except FileNotFoundError:
+                log_position = None
+            
+            snapshot_changed = current is None or current != self._file_signature
+            replayed_position = (self._log_inode, self._log_offset) if self._log_inode is not None else None
+            if not snapshot_changed and log_position == replayed_position:
+                return self._data
+            
+            # Buffered changes not yet on disk must survive the reload
+            pending = self._pending_entries() if self._dirty else []
+            
+            with self._file_lock(exclusive=False):
+                if snapshot_changed:
+                    try:
+                        with open(self.json_file, 'rb') as f:
+                            # Signature of the file we actually read, not of whatever
+                            # may have replaced it since the stat above
+                            signature = self._stat_signature(os.fstat(f.fileno()))
+                            raw = f.read()
+                            start = time.perf_counter()
+                            data = decode_store(raw)
+                            if self.metrics is not None:
+                                self._count_read(self.json_file, len(raw), len(data.get("users", [])), start)
+                    except (FileNotFoundError, ValueError):
+                        data, signature = {"users": []}, None
+                    
+                    # Records from here on; plain dicts again only when saving
+                    data["users"] = [UserRecord(user) for user in data.get("users", [])]
+                    self._data = data
+                    self._file_signature = signature
+                    # Log entries are written by current code, so the snapshot decides
+                    self._schema_current = data.get("schema", 1) >= SCHEMA_VERSION
+                    self._rebuild_index()
+                    
+                    # A new snapshot means the whole log has to be replayed over it
+                    self._log_inode = None
+                    self._log_offset = 0
+                
+                self._replay_log()
+            
+            for entry in pending:
+                # Versions of buffered changes are settled by flush() against
+                # the file's, so the reloaded version stays visible until then
+                entry.get("set", {}).pop("version", None)
+                self._apply_entry(entry)
+            if self._logins:
+                self._apply_logins()
+            if self.metrics is not None:
+                self.metrics.set("auth_store_records", os.path.basename(self.json_file), len(self._index))
+            return self._data
+    
+    def _count_read(self, path: str, size: int, records: int, parse_start: float):
+        """Report a parsed file read (parse_start: perf_counter() before parsing)"""
+        name = os.path.basename(path)
+        self.metrics.observe("auth_store_parse_seconds", name, time.perf_counter() - parse_start)
+        self.metrics.inc("auth_store_bytes_read_total", name, size)
+        self.metrics.inc("auth_store_records_read_total", name, records)
+    
+    def _count_written(self, path: str, size: int, records: int, serialize_start: float):
+        """Report a serialized file write (serialize_start: perf_counter() before serializing)"""
+        name = os.path.basename(path)
+        self.metrics.observe("auth_store_serialize_seconds", name, time.perf_counter() - serialize_start)
+        self.metrics.inc("auth_store_bytes_written_total", name, size)
+        self.metrics.inc("auth_store_records_written_total", name, records)
+    
+    def _replay_log(self):
+        """Apply mutation log entries appended since the last load"""
+        try:
+            f = open(self.log_file, 'rb')
+        except FileNotFoundError:
+            self._log_inode = None
+            self._log_offset = 0
+            return
+        
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._log_inode or st.st_size < self._log_offset:
+                # The log was folded into the snapshot and started over
+                self._log_inode = st.st_ino
+                self._log_offset = 0
+            if st.st_size == self._log_offset:
+                return
+            
+            f.seek(self._log_offset)
+            chunk = f.read(st.st_size - self._log_offset)
+        
+        # Leave a partially written last line for the next load
+        end = chunk.rfind(b"\n") + 1
+        start = time.perf_counter()
+        entries = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+        if self.metrics is not None:
+            self._count_read(self.log_file, end, len(entries), start)
+        for entry in entries:
+            self._apply_entry(entry)
+        self._log_offset += end
+    
+    def _apply_entry(self, entry: Dict):
+        """Apply one mutation entry to the cached data (idempotent)"""
+        op = entry.get("op")
+        users = self._data.setdefault("users", [])
+        
+        if op == "add":
+            new_user = UserRecord(entry["user"])
+            key = self._key(new_user["username"])
+            existing = self._index.get(key)
+            if existing is not None:
+                existing.clear()
+                existing.update(new_user)
+            else:
+                users.append(new_user)
+                self._index[key] = new_user
+                self._sequence[key] = self._next_sequence
+                self._next_sequence += 1
+        
+        elif op == "update":
+            user = self._index.get(self._key(entry["username"]))
+            if user is not None:
+                user.update(entry.get("set", {}))
+                for field in entry.get("unset", []):
+                    user.pop(field, None)
+        
+        elif op == "delete":
+            key = self._key(entry["username"])
+            if self._index.pop(key, None) is not None:
+                if len(users) == len(self._index) + 1:
+                    # Find the record by its insertion number, as appends place it
+                    position = bisect.bisect_left(users, self._sequence[key],
+                                                  key=lambda u: self._sequence[self._key(u["username"])])
+                    del users[position]
+                else:
+                    # Duplicate usernames from an old file: drop every copy
+                    self._data["users"] = [u for u in users if self._key(u["username"]) != key]
+                self._sequence.pop(key, None)
+        
+        if self._orders is not None:
+            self._resort(self._entry_key(entry))
+    
+    def _save_users(self, data: Dict):
+        """Save users to JSON file (atomically) and fold away the mutation log"""
+        with self._file_lock(exclusive=True):
+            tmp_file = f"{self.json_file}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_file, 'wb') as f:
+                    start = time.perf_counter()
+                    if not self._schema_current:
+                        # A full rewrite anyway: every record goes out upgraded
+                        for user in data.get("users", []):
+                            self._upgrade(user)
+                    document = dict(data, schema=SCHEMA_VERSION,
+                                    users=[to_plain(user) for user in data.get("users", [])])
+                    payload = encode_store(document, self.codec)
+                    if self.metrics is not None:
+                        self._count_written(self.json_file, len(payload), len(document["users"]), start)
+                    f.write(payload)
+                    f.flush()
+                    self._sync(f, snapshot=True)
+                    signature = self._stat_signature(os.fstat(f.fileno()))
+                os.replace(tmp_file, self.json_file)
+                self._sync_directory()
+                
+                # Everything in the log is part of the new snapshot now
+                try:
+                    os.remove(self.log_file)
+                except FileNotFoundError:
+                    pass
+            except BaseException:
+                # The cache may now hold changes that never reached the disk
+                self._file_signature = None
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+            
+            self._file_signature = signature
+            self._log_inode = None
+            self._log_offset = 0
+            self._schema_current = True
+            
+            # The snapshot holds every buffered change, login and upgrade as well
+            self._dirty = {}
+            self._logins = {}
+            self._upgrades = {}
+    
+    def _append_log(self, entries: List[Dict]):
+        """Append mutation entries to the log, one JSON object per line"""
+        start = time.perf_counter()
+        payload = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries).encode()
+        if self.metrics is not None:
+            self._count_written(self.log_file, len(payload), len(entries), start)
+        with self._file_lock(exclusive=True):
+            try:
+                with open(self.log_file, 'ab') as f:
+                    start = f.tell()
+                    f.write(payload)
+                    f.flush()
+                    self._sync(f)
+                    st = os.fstat(f.fileno())
+            except BaseException:
+                self._file_signature = None
+                raise
+            
+            # Only advance past our own lines if nobody else appended in between;
+            # otherwise the next load replays theirs (and harmlessly, ours again)
+            if start == self._log_offset and self._log_inode in (None, st.st_ino):
+                self._log_inode = st.st_ino
+                self._log_offset = st.st_size
+            
+            snapshot_size = self._file_signature[1] if self._file_signature else 0
+            if st.st_size >= max(self.compact_threshold, snapshot_size):
+                self._schedule_compaction()
+    
+    def _schedule_compaction(self):
+        """Fold the log into the snapshot on a background thread"""
+        if self._compacting:
+            return
+        self._compacting = True
+        self._compaction_thread = threading.Thread(target=self.compact, name="users-log-compaction", daemon=True)
+        self._compaction_thread.start()
+    
+    def compact(self):
+        """Fold the mutation log into a fresh users.json snapshot"""
+        with self._file_lock(exclusive=True):
+            try:
+                # The new snapshot includes any buffered changes too
+                self._save_users(self._load_users())
+            finally:
+                self._compacting = False
+    
+    def _hot_bytes(self) -> int:
+        """Size of the files every load reads: snapshot and log, progress store's too"""
+        size = 0
+        for path in (self.json_file, self.log_file):
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        if self._progress_store is not None:
+            size += self._progress_store._hot_bytes()
+        return size
+    
+    def _load_archive_index(self) -> Dict[str, list]:
+        """The archive index, re-read if another process replaced it"""
+        try:
+            signature = self._stat_signature(os.stat(self.archive_index_file))
+        except FileNotFoundError:
+            self._archive_index, self._archive_signature = {}, None
+            return self._archive_index
+        
+        if signature != self._archive_signature:
+            # Replaced atomically, so no lock is needed to read it
+            with open(self.archive_index_file, 'r') as f:
+                self._archive_index = json.load(f).get("users", {})
+            self._archive_signature = signature
+        return self._archive_index
+    
+    def _save_archive_index(self, index: Dict[str, list]):
+        """Write the archive index atomically (caller holds the exclusive file lock)"""
+        tmp_file = f"{self.archive_index_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps({"version": 1, "users": index}, separators=(",", ":")))
+            f.flush()
+            self._sync(f, snapshot=True)
+        os.replace(tmp_file, self.archive_index_file)
+        self._archive_index = index
+        self._archive_signature = self._stat_signature(os.stat(self.archive_index_file))
+    
+    def _is_archived(self, username: str) -> bool:
+        """Whether an account has an archived copy (it still owns its username)"""
+        return self._key(username) in self._load_archive_index()
+    
+    def _append_archive(self, records: List[Dict]) -> Dict[str, list]:
+        """Append records to the archive in compressed blocks; their index entries"""
+        locations = {}
+        with open(self.archive_file, 'ab') as f:
+            for i in range(0, len(records), ARCHIVE_BLOCK_SIZE):
+                block = records[i:i + ARCHIVE_BLOCK_SIZE]
+                payload = zlib.compress(b"".join(encode_record_line(record) for record in block))
+                offset = f.tell()
+                f.write(payload)
+                for record in block:
+                    locations[self._key(record["username"])] = [record["username"], offset, len(payload)]
+            f.flush()
+            self._sync(f, snapshot=True)
+        return locations
+    
+    def _read_archive_block(self, offset: int, length: int) -> List[Dict]:
+        """The records of one archive block"""
+        with open(self.archive_file, 'rb') as f:
+            f.seek(offset)
+            block = zlib.decompress(f.read(length))
+        return [json.loads(line) for line in block.splitlines()]
+    
+    def _iter_archived(self):
+        """Every archived record (with saved progress), one block at a time"""
+        index = self._load_archive_index()
+        blocks: Dict[Tuple[int, int], set] = {}
+        for key, (_, offset, length) in index.items():
+            blocks.setdefault((offset, length), set()).add(key)
+        for (offset, length), keys in sorted(blocks.items()):
+            for record in self._read_archive_block(offset, length):
+                # A block also holds accounts rehydrated (or archived again) since
+                if self._key(record["username"]) in keys:
+                    self._upgrade(record)
+                    yield record
+    
+    def _rehydrate(self, username: str) -> bool:
+        """
+        Move an archived account back into the hot store
+        
+        Cheap when the account is not archived: one stat of the index file.
+        Its index entry stays; being hot is what counts, and that is only
+        decided on users reloaded under the file lock, since another
+        process may have archived the account since this one last loaded.
+        Returns True if the account was brought back.
+        """
+        key = self._key(username or "")
+        if key not in self._load_archive_index():
+            return False
+        
+        # Already back (the usual case for a stale entry): a shared lock will do
+        with self._file_lock(exclusive=False):
+            self._load_users()
+            if key in self._index:
+                return False
+        
+        with self._file_lock(exclusive=True):
+            index = self._load_archive_index()
+            self._load_users()
+            if key not in index or key in self._index:
+                # Another process got there first
+                return False
+            
+            _, offset, length = index[key]
+            record = next(record for record in self._read_archive_block(offset, length)
+                          if self._key(record["username"]) == key)
+            self._upgrade(record)
+            values = self._board_values(record)
+            progress = record.pop("saved_progress", None) if self._progress_store is not None else None
+            entry = {"op": "add", "user": record}
+            self._apply_entry(entry)
+            self._commit([entry], buffered=False)
+            if progress:
+                self._progress_store._restore_progress({record["username"]: progress})
+        # Back on the boards, which only rank hot accounts
+        self._update_leaderboards(record["username"], values)
+        return True
+    
+    def _forget_archived(self, usernames: List[str]) -> List[Optional[str]]:
+        """Drop accounts from the archive index; the archived username of each dropped, else None"""
+        if not any(self._key(username or "") in self._load_archive_index() for username in usernames):
+            return [None] * len(usernames)
+        with self._file_lock(exclusive=True):
+            index = dict(self._load_archive_index())
+            dropped = [index.pop(self._key(username or ""), [None])[0] for username in usernames]
+            self._save_archive_index(index)
+        return dropped
+    
+    def archive_accounts(self, inactive_days: int = ARCHIVE_INACTIVE_DAYS) -> Dict:
+        """
+        Move disabled and long-inactive accounts to the compressed archive
+        
+        An account is archived when it is disabled or its last login (its
+        creation, if it never logged in) is more than inactive_days old. The
+        hot snapshot is then rewritten without them, so ordinary loads and
+        writes stop paying for dormant accounts. Archived accounts keep their
+        username and come back on login, get_user_details, activate_user or
+        any other change to them. The archive is append-only: blocks of
+        rehydrated accounts stay behind as dead space.
+        
+        Args:
+            inactive_days: Days without a login before an account is archived
+        
+        Returns:
+            Dict with archived, hot_bytes_before, hot_bytes_after,
+            archive_bytes and seconds
+        """
+        start = time.perf_counter()
+        cutoff = (datetime.now() - timedelta(days=inactive_days)).isoformat()
+        # Buffered changes and logins count toward activity, so write them first
+        self.flush()
+        
+        with self._file_lock(exclusive=True):
+            hot_before = self._hot_bytes()
+            data = self._load_users()
+            dormant = [user for user in data.get("users", [])
+                       if user.get("disabled_at") or not user.get("is_active", True)
+                       or (user.get("last_login") or user.get("created_at") or "") < cutoff]
+            
+            # Entries of accounts rehydrated since the last run go
+            index = {key: location for key, location in self._load_archive_index().items()
+                     if key not in self._index}
+            if dormant:
+                if self._progress_store is not None:
+                    with self._progress_store._lock:
+                        self._progress_store._load_users()
+                records = []
+                for user in dormant:
+                    record = self._merge_progress(user.to_dict())
+                    self._upgrade(record)
+                    records.append(record)
+                # Archive first: a crash before the rewrite below leaves the
+                # accounts in both places, where the hot copy wins
+                index.update(self._append_archive(records))
+            if index != self._archive_index:
+                self._save_archive_index(index)
+            
+            if dormant:
+                archived = {self._key(user["username"]) for user in dormant}
+                data["users"] = [user for user in data["users"] if self._key(user["username"]) not in archived]
+                self._rebuild_index()
+                self._save_users(data)
+                if self._progress_store is not None:
+                    self._progress_store._delete_records([user["username"] for user in dormant], buffered=False)
+            
+            hot_after = self._hot_bytes()
+        
+        if dormant:
+            # The boards only rank hot accounts, as a rebuild would
+            self._forget_leaderboards([user["username"] for user in dormant])
+        
+        return {
+            "archived": len(dormant),
+            "hot_bytes_before": hot_before,
+            "hot_bytes_after": hot_after,
+            "archive_bytes": os.path.getsize(self.archive_file) if os.path.exists(self.archive_file) else 0,
+            "seconds": time.perf_counter() - start
+        }
+    
+    def archive_status(self) -> Dict:
+        """Archived account count and the sizes of the hot files and the archive"""
+        with self._lock:
+            index = self._load_archive_index()
+            self._load_users()
+            archived = sum(1 for key in index if key not in self._index)
+        return {
+            "archived": archived,
+            "hot_bytes": self._hot_bytes(),
+            "archive_bytes": os.path.getsize(self.archive_file) if os.path.exists(self.archive_file) else 0
+        }
+    
+    def search_archived(self, query: str = "", limit: int = 50) -> List[str]:
+        """
+        Usernames of archived accounts containing a case-insensitive query
+        
+        These are left out of search_users and count_users, which only see
+        the hot store. Sorted; an empty query lists them all (up to limit).
+        """
+        query = (query or "").strip().casefold()
+        with self._lock:
+            index = self._load_archive_index()
+            self._load_users()
+            names = [name for key, (name, _, _) in index.items() if key not in self._index and query in key]
+        return sorted(names, key=str.casefold)[:limit]
+    
+    def restore_users(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Bring archived accounts back into the hot store; one (success, message) per username"""
+        results = []
+        for username in usernames:
+            if self._rehydrate(username):
+                results.append((True, f"Account '{username}' has been restored from the archive"))
+            elif self.user_exists(username):
+                results.append((False, f"Account '{username}' is not archived"))
+            else:
+                results.append((False, f"User '{username}' not found"))
+        return results
+    
+    def upgrade_schema(self) -> Dict:
+        """
+        Upgrade every record to SCHEMA_VERSION and rewrite the snapshot
+        
+        The offline counterpart of the upgrades records get when first
+        touched: afterwards the store is marked current and readers skip
+        the per-record checks.
+        
+        Returns:
+            Dict with users, upgraded, progress_upgraded and seconds
+        """
+        start = time.perf_counter()
+        progress_upgraded = 0
+        if self._progress_store is not None:
+            progress_upgraded = self._progress_store.upgrade_schema()["upgraded"]
+        
+        with self._file_lock(exclusive=True):
+            data = self._load_users()
+            users = data.get("users", [])
+            upgraded = sum(1 for user in users if self._upgrade(user))
+            self._save_users(data)
+        
+        return {
+            "users": len(users),
+            "upgraded": upgraded,
+            "progress_upgraded": progress_upgraded,
+            "seconds": time.perf_counter() - start
+        }
+    
+    def _write_entries(self, entries: List[Dict]):
+        """Write mutation entries to disk: one log append or one snapshot rewrite"""
+        if self.journal:
+            self._append_log(entries)
+        else:
+            self._save_users(self._data)
+    
+    def _commit(self, entries: List[Dict], buffered: bool = True):
+        """Persist mutation entries already applied to the cached data"""
+        if not entries:
+            return
+        with self._lock:
+            # Every committed change moves its record to a new version
+            for entry in entries:
+                if entry["op"] == "update":
+                    user = self._index.get(self._key(entry["username"]))
+                    if user is not None:
+                        user["version"] = user.get("version", 0) + 1
+                        entry.setdefault("set", {})["version"] = user["version"]
+        if self._orders is not None:
+            with self._lock:
+                for entry in entries:
+                    self._resort(self._entry_key(entry))
+        # Buffered logins and upgrades go out with this write instead of on their own
+        entries = entries + self._take_logins() + self._take_upgrades()
+        if not (buffered or self.single_writer) or self.flush_interval_ms is None:
+            self._write_entries(entries)
+            return
+        
+        with self._lock:
+            for entry in entries:
+                self._mark_dirty(entry)
+            
+            if len(self._dirty) >= self.flush_max_records:
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval_ms / 1000, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _mark_dirty(self, entry: Dict):
+        """Record which user (and which of its fields) an entry changed"""
+        if entry["op"] == "add":
+            username = entry["user"]["username"]
+        else:
+            username = entry["username"]
+        key = self._key(username)
+        
+        if entry["op"] != "update":
+            self._dirty[key] = [username, None]
+            return
+        
+        fields = set(entry.get("set", {})) | set(entry.get("unset", []))
+        if key not in self._dirty:
+            self._dirty[key] = [username, fields]
+        elif self._dirty[key][1] is not None:
+            self._dirty[key][1] |= fields
+    
+    def _record_login(self, user: Dict):
+        """Set last_login in the cache only; it reaches the disk later"""
+        key = self._key(user["username"])
+        user["last_login"] = datetime.now().isoformat()
+        self._logins[key] = [user["username"], user["last_login"]]
+        if self._orders is not None:
+            self._resort(key)
+        if self._login_timer is None:
+            self._login_timer = threading.Timer(self.login_staleness_ms / 1000, self.flush)
+            self._login_timer.daemon = True
+            self._login_timer.start()
+    
+    def _apply_logins(self):
+        """Lay the buffered login times over freshly loaded records"""
+        for key, (username, last_login) in list(self._logins.items()):
+            user = self._index.get(key)
+            if user is None:
+                # Deleted meanwhile: nothing left to record the login on
+                del self._logins[key]
+            elif (user.get("last_login") or "") < last_login:
+                user["last_login"] = last_login
+                if self._orders is not None:
+                    self._resort(key)
+    
+    def _login_entries(self) -> List[Dict]:
+        """Log entries for the buffered login times"""
+        return [{"op": "update", "username": username, "set": {"last_login": last_login}}
+                for username, last_login in self._logins.values()]
+    
+    def _take_logins(self) -> List[Dict]:
+        """Entries for the buffered logins, which are then no longer buffered"""
+        with self._lock:
+            if not self._logins:
+                return []
+            # Written from the cache, which holds the newest of ours and the file's
+            entries = [self._update_entry(self._index[key], "last_login")
+                       for key in self._logins if key in self._index]
+            self._logins = {}
+            if self._login_timer is not None:
+                self._login_timer.cancel()
+                self._login_timer = None
+            return entries
+    
+    def _current(self, user: Optional[UserRecord]) -> Optional[UserRecord]:
+        """A cached record, upgraded to SCHEMA_VERSION the first time it is handed out"""
+        if user is not None and not self._schema_current:
+            fields = self._upgrade(user)
+            if fields:
+                with self._lock:
+                    self._upgrades.setdefault(self._key(user["username"]), set()).update(fields)
+        return user
+    
+    def _take_upgrades(self) -> List[Dict]:
+        """Entries for the fields upgraded in the cache, which are then no longer pending"""
+        with self._lock:
+            if not self._upgrades:
+                return []
+            entries = []
+            for key, fields in self._upgrades.items():
+                user = self._index.get(key)
+                if user is not None:
+                    # A reload since may have brought the record back un-upgraded
+                    self._upgrade(user)
+                    entries.append(self._update_entry(user, *sorted(fields)))
+            self._upgrades = {}
+            return entries
+    
+    def _pending_entries(self) -> List[Dict]:
+        """Coalesced entries for the buffered changes, built from the cached records"""
+        entries = []
+        for key, (username, fields) in self._dirty.items():
+            user = self._index.get(key)
+            if user is None:
+                entries.append({"op": "delete", "username": username})
+            elif fields is None:
+                entries.append({"op": "add", "user": user.to_dict()})
+            else:
+                entries.append(self._update_entry(user, *sorted(fields)))
+        return entries
+    
+    def flush(self):
+        """Write all buffered changes to disk now"""
+        if self._progress_store is not None:
+            self._progress_store.flush()
+        
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty and not self._logins and not self._upgrades:
+                return
+        
+        with self._file_lock(exclusive=True):
+            # Merge in whatever other processes wrote since our last load
+            self._load_users()
+            # Buffered logins and upgrades become ordinary dirty fields from here on
+            for entry in self._take_logins() + self._take_upgrades():
+                self._mark_dirty(entry)
+            if not self._dirty:
+                return
+            
+            # Changed records go out one version past what the file has now
+            for key, (username, fields) in self._dirty.items():
+                user = self._index.get(key)
+                if user is not None and fields is not None and "version" in fields:
+                    user["version"] = user.get("version", 0) + 1
+            
+            entries = self._pending_entries()
+            dirty, self._dirty = self._dirty, {}
+            try:
+                self._write_entries(entries)
+            except BaseException:
+                # Keep the changes buffered so a later flush can retry
+                dirty.update(self._dirty)
+                self._dirty = dirty
+                raise
+    
+    def close(self):
+        """
+        Write buffered changes and release the lock file descriptor
+        
+        The manager is unusable afterwards; closing it again does nothing.
+        Also available as a context manager (with JSONAuthManager(...) as auth).
+        """
+        if self._lock_fd is None and FCNTL_AVAILABLE:
+            return
+        self.flush()
+        if self._progress_store is not None:
+            self._progress_store.close()
+        # A compaction the last write started still needs the lock file
+        compaction = self._compaction_thread
+        if compaction is not None:
+            compaction.join()
+        
+        with self._lock:
+            if self._login_timer is not None:
+                self._login_timer.cancel()
+                self._login_timer = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+        if self._atexit_flush is not None:
+            atexit.unregister(self._atexit_flush)
+            self._atexit_flush = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @staticmethod
+    def _update_entry(user: Dict, *fields: str) -> Dict:
+        """Log entry recording the current value of some fields of a user"""
+        entry = {"op": "update", "username": user["username"]}
+        set_fields = {f: to_plain(user[f]) for f in fields if f in user}
+        unset_fields = [f for f in fields if f not in user]
+        if set_fields:
+            entry["set"] = set_fields
+        if unset_fields:
+            entry["unset"] = unset_fields
+        return entry
+    
+    def _find_user(self, username: str) -> Optional[Dict]:
+        """Look up a user record by username (case-insensitive)"""
+        self._load_users()
+        return self._current(self._index.get(self._key(username)))
+    
+    def _write_changes(self, user: Dict, changes: Dict, buffered: bool = True):
+        """Apply {field: value} changes (_UNSET removes a field) and commit them"""
+        for field, value in changes.items():
+            if value is _UNSET:
+                user.pop(field, None)
+            else:
+                user[field] = value
+        self._commit([self._update_entry(user, *changes)], buffered)
+    
+    def _cas_update(self, username: str, change, buffered: bool = True) -> Optional[Dict]:
+        """
+        Change one record with compare-and-swap on its version
+        
+        change(user) computes {field: value} changes from the record as read
+        (empty for none) without touching it. The changes are only written if
+        the record still has the version that was read; otherwise it is read
+        again and change() rerun. Other records are never waited on for the
+        computation, only for the short compare-and-write.
+        
+        Returns:
+            The updated record, or None if there is no such user
+        """
+        self._rehydrate(username)
+        for _ in range(CAS_ATTEMPTS):
+            with self._lock:
+                # Read from the cache without going to disk: a stale record
+                # fails the version check, and the retry reads it refreshed
+                user = self._current(self._index.get(self._key(username)))
+                if user is None:
+                    user = self._find_user(username)
+                if user is None:
+                    return None
+                version = user.get("version", 0)
+                changes = change(user)
+            if not changes:
+                return user
+            
+            with self._write_lock(buffered):
+                # Reloading only replays what was appended since the read
+                user = self._find_user(username)
+                if user is None:
+                    return None
+                if user.get("version", 0) == version:
+                    self._write_changes(user, changes, buffered)
+                    return user
+                self.version_conflicts += 1
+        
+        # Still losing the race: hold the lock from read to write this time
+        with self._write_lock(buffered):
+            user = self._find_user(username)
+            if user is None:
+                return None
+            changes = change(user)
+            if changes:
+                self._write_changes(user, changes, buffered)
+            return user
+    
+    def _put_progress(self, username: str, progress: Optional[Dict]):
+        """Store (or with None, drop) a user's record in a progress store"""
+        if progress is None:
+            self._delete_records([username])
+            return
+        
+        while self._cas_update(username, lambda record: {"saved_progress": progress}) is None:
+            with self._write_lock():
+                # Nothing to swap yet: add the record, unless someone just did
+                if self._find_user(username) is None:
+                    entry = {"op": "add", "user": {"username": username, "saved_progress": progress,
+                                                   "version": 1, "schema": SCHEMA_VERSION}}
+                    self._apply_entry(entry)
+                    self._commit([entry])
+                    return
+    
+    def _delete_records(self, usernames: List[str], buffered: bool = True) -> List[Optional[str]]:
+        """
+        Delete several records with one write
+        
+        Returns the stored username for each deleted record, None where
+        there was no such record.
+        """
+        with self._write_lock(buffered):
+            self._load_users()
+            deleted = []
+            entries = []
+            for username in usernames:
+                user = self._index.pop(self._key(username or ""), None)
+                self._sequence.pop(self._key(username or ""), None)
+                deleted.append(user["username"] if user else None)
+                if user is not None:
+                    entries.append({"op": "delete", "username": user["username"]})
+            
+            if entries:
+                # One pass over the list instead of one per deleted user
+                self._data["users"] = [u for u in self._data.get("users", [])
+                                       if self._key(u["username"]) in self._index]
+                self._commit(entries, buffered)
+            return deleted
+    
+    def _set_boards(self, boards: Dict[str, list]):
+        """Load saved [[username, value], ...] lists into the sorted boards"""
+        self._boards = {
+            metric: sorted((-value, self._key(name), name) for name, value in boards.get(metric, []))
+            for metric in LEADERBOARD_METRICS
+        }
+        self._board_members = {
+            metric: {key: -negated for negated, key, _ in board}
+            for metric, board in self._boards.items()
+        }
+    
+    def _save_leaderboards(self):
+        """Write the boards atomically (caller holds the exclusive file lock)"""
+        data = {
+            "version": 1,
+            "size": self.leaderboard_size,
+            "boards": {metric: [[name, -negated] for negated, _, name in board]
+                       for metric, board in self._boards.items()}
+        }
+        tmp_file = f"{self.leaderboard_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            self._sync(f, snapshot=True)
+        os.replace(tmp_file, self.leaderboard_file)
+        self._board_signature = self._stat_signature(os.stat(self.leaderboard_file))
+    
+    @staticmethod
+    def _board_values(user: Dict) -> Dict[str, int]:
+        """A user's current value for each of LEADERBOARD_METRICS, which is what the boards rank"""
+        progress = user.get("saved_progress") or {}
+        return {
+            "high_score": user.get("high_score") or 0,
+            "max_streak": progress.get("max_streak") or 0,
+            "perfect_levels": progress.get("perfect_levels") or 0
+        }
+    
+    def _rebuild_leaderboards(self):
+        """Refill the boards from a full scan (store upgrade, or a board member removed or lowered)"""
+        candidates = {metric: [] for metric in LEADERBOARD_METRICS}
+        for user in self.get_all_users():
+            for metric, value in self._board_values(user).items():
+                if value > 0:
+                    candidates[metric].append((-value, self._key(user["username"]), user["username"]))
+        
+        self._set_boards({
+            metric: [[name, -negated] for negated, _, name in heapq.nsmallest(self.leaderboard_size, entries)]
+            for metric, entries in candidates.items()
+        })
+        self._save_leaderboards()
+    
+    def _load_leaderboards(self) -> Dict[str, list]:
+        """The boards, re-read if another process replaced the file"""
+        try:
+            signature = self._stat_signature(os.stat(self.leaderboard_file))
+        except FileNotFoundError:
+            # Stores from before the boards existed: one scan, then incremental
+            with self._file_lock(exclusive=True):
+                if not os.path.exists(self.leaderboard_file):
+                    self._rebuild_leaderboards()
+                    return self._boards
+            signature = self._stat_signature(os.stat(self.leaderboard_file))
+        
+        if self._boards is None or signature != self._board_signature:
+            # Replaced atomically, so no lock is needed to read it
+            with open(self.leaderboard_file, 'r') as f:
+                self._set_boards(json.load(f).get("boards", {}))
+            self._board_signature = signature
+        return self._boards
+    
+    def _board_qualifies(self, metric: str, key: str, value: int) -> bool:
+        """Whether value would change the metric's board"""
+        current = self._board_members[metric].get(key)
+        if current is not None:
+            return value != current
+        if value <= 0:
+            return False
+        board = self._boards[metric]
+        return len(board) < self.leaderboard_size or (-value, key) < board[-1][:2]
+    
+    def _board_needs_scan(self, metric: str, key: str, value: int) -> bool:
+        """
+        Whether a member's lower value could let someone off the board in
+        
+        A board that is not full holds every user with a value, and players
+        off a full board rank behind its last entry, so only a member
+        dropping to (or past) the last place needs a scan to refill it.
+        """
+        current = self._board_members[metric].get(key)
+        board = self._boards[metric]
+        if current is None or value >= current or len(board) < self.leaderboard_size:
+            return False
+        return board[-1][1] == key or (-value, key) > board[-1][:2]
+    
+    def _board_offer(self, metric: str, username: str, value: int) -> bool:
+        """Move a user to their current value's place on a board in O(log K); True if it changed"""
+        key = self._key(username)
+        if not self._board_qualifies(metric, key, value):
+            return False
+        
+        board = self._boards[metric]
+        members = self._board_members[metric]
+        if key in members:
+            del board[bisect.bisect_left(board, (-members.pop(key), key))]
+        if value > 0:
+            bisect.insort(board, (-value, key, username))
+            members[key] = value
+            if len(board) > self.leaderboard_size:
+                _, dropped, _ = board.pop()
+                del members[dropped]
+        return True
+    
+    def _update_leaderboards(self, username: str, values: Dict[str, int]):
+        """Offer a user's current values to the boards, ranked as a rebuild would rank them"""
+        if not self.leaderboard_size:
+            return
+        
+        with self._lock:
+            key = self._key(username)
+            self._load_leaderboards()
+            if not any(self._board_qualifies(metric, key, value) for metric, value in values.items()):
+                # The common case: no board changes, so no lock and no write
+                return
+            
+            with self._file_lock(exclusive=True):
+                self._load_leaderboards()
+                if any(self._board_needs_scan(metric, key, value) for metric, value in values.items()):
+                    self._rebuild_leaderboards()
+                    return
+                changed = [self._board_offer(metric, username, value) for metric, value in values.items()]
+                if any(changed):
+                    self._save_leaderboards()
+    
+    def _forget_leaderboards(self, usernames: List[str]):
+        """Drop deleted or archived users from the boards, refilling them from a scan if needed"""
+        if not self.leaderboard_size:
+            return
+        
+        with self._lock:
+            keys = {self._key(name) for name in usernames}
+            self._load_leaderboards()
+            if any(keys & members.keys() for members in self._board_members.values()):
+                with self._file_lock(exclusive=True):
+                    self._rebuild_leaderboards()
+    
+    def _drop_profile_progress(self, username: str):
+        """Remove progress saved in a profile record before the split"""
+        self._cas_update(username, lambda user: {"saved_progress": _UNSET} if "saved_progress" in user else {})
+    
+    def _merge_progress(self, user_data: Dict) -> Dict:
+        """Fill in saved_progress from the progress store, if split"""
+        if self._progress_store is not None:
+            record = self._progress_store._index.get(self._key(user_data["username"]))
+            if record is not None:
+                user_data["saved_progress"] = record["saved_progress"].to_dict()
+        return user_data
+    
+    def _public_user(self, user: UserRecord) -> RecordView:
+        """Read-only view of a user without the password, split-off progress included"""
+        self._current(user)
+        overrides = None
+        if self._progress_store is not None:
+            record = self._progress_store._current(self._progress_store._index.get(self._key(user["username"])))
+            if record is not None:
+                overrides = {"saved_progress": record["saved_progress"]}
+        # No copy per call: a caller that needs a dict of its own asks for to_dict()
+        return user.view(HIDDEN_FIELDS, overrides)
+    
+    @staticmethod
+    def _validate_username(username: str) -> Optional[str]:
+        """Error message for a username registration would reject, or None"""
+        if not username or len(username.strip()) < 3:
+            return "Username must be at least 3 characters long"
+        return None
+    
+    @staticmethod
+    def _validate_new_account(username: str, password: str) -> Optional[str]:
+        """Error message for an invalid username/password, or None"""
+        error = JSONAuthManager._validate_username(username)
+        if error:
+            return error
+        
+        if not password or len(password) < 6:
+            return "Password must be at least 6 characters long"
+        
+        return None
+    
+    @staticmethod
+    def _new_user_record(username: str, hashed_password: str, email: str = "") -> Dict:
+        """A fresh user record as stored in users.json"""
+        return {
+            "username": username,
+            "password": hashed_password,
+            "email": email,
+            "created_at": datetime.now().isoformat(),
+            "last_login": None,
+            "total_games": 0,
+            "high_score": 0,
+            "is_active": True,  # Active by default
+            "game_completed_permanently": False,
+            "version": 1,
+            "schema": SCHEMA_VERSION
+        }
+    
+    def register_user(self, username: str, password: str, email: str = "") -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Register a new user
+        
+        Args:
+            username: User's chosen username
+            password: User's password (will be hashed)
+            email: User's email (optional)
+        
+        Returns:
+            Tuple of (success: bool, message: str, user_data: dict or None)
+        """
+        # Validation
+        error = self._validate_new_account(username, password)
+        if error:
+            return False, error, None
+        
+        username = username.strip()
+        
+        # Never buffered: the uniqueness check must run against the file
+        # under the exclusive lock, or two processes could add the same name
+        with self._write_lock(buffered=False):
+            # Check if username already exists (archived accounts keep theirs)
+            if self._find_user(username) is not None or self._is_archived(username):
+                return False, "Username already exists", None
+            
+            # Create new user
+            new_user = self._new_user_record(username, self._hash_password(password), email)
+            
+            entry = {"op": "add", "user": new_user}
+            self._apply_entry(entry)
+            self._commit([entry], buffered=False)
+            
+            # Return user data without password
+            user_data = self._index[self._key(username)].view(HIDDEN_FIELDS)
+        
+        return True, f"Account created successfully for {username}!", user_data
+    
+    def login_user(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Authenticate user login
+        
+        Args:
+            username: User's username
+            password: User's password
+        
+        Returns:
+            Tuple of (success: bool, message: str, user_data: dict or None)
+        """
+        if not username or not password:
+            return False, "Username and password are required", None
+        
+        username = username.strip()
+        self._rehydrate(username)
+        
+        # With buffered logins a successful login only reads the store
+        lock = self._lock if self.login_staleness_ms is not None else self._write_lock()
+        with lock:
+            # Find user
+            user = self._find_user(username)
+            
+            if not user:
+                return False, "Invalid username or password", None
+            
+            # Check if account is active
+            if not user["is_active"]:
+                return False, "Account has been disabled. Please contact the administrator.", None
+            
+            # Verify password
+            hashed_password = self._hash_password(password)
+            if user["password"] != hashed_password:
+                return False, "Invalid username or password", None
+            
+            # Update last login
+            if self.login_staleness_ms is not None:
+                self._record_login(user)
+            else:
+                user["last_login"] = datetime.now().isoformat()
+                self._commit([self._update_entry(user, "last_login")])
+            
+            # Return user data without password
+            user_data = user.view(HIDDEN_FIELDS)
+        
+        return True, f"Welcome back, {username}!", user_data
+    
+    def update_user_stats(self, username: str, score: int):
+        """Update user statistics after game completion"""
+        # Counters are read-modify-write, so never buffer them: the increment
+        # has to be checked against the latest file contents
+        user = self._cas_update(username, lambda user: {
+            "total_games": user["total_games"] + 1,
+            "high_score": max(score, user["high_score"])
+        }, buffered=False)
+        if user:
+            self._update_leaderboards(user["username"], {"high_score": user["high_score"]})
+    
+    def save_progress(self, username: str, level: int, score: int, hints_used: int = 0,
+                     achievements: list = None, streak: int = 0, max_streak: int = 0,
+                     combo_multiplier: float = 1.0, perfect_levels: int = 0,
+                     wrong_attempts: int = 0) -> bool:
+        """Save user's game progress with all stats"""
+        self._rehydrate(username)
+        progress = {
+            "level": level,
+            "score": score,
+            "hints_used": hints_used,
+            # Copy so later changes to the caller's list don't leak into the cache
+            "achievements": list(achievements or []),
+            "streak": streak,
+            "max_streak": max_streak,
+            "combo_multiplier": combo_multiplier,
+            "perfect_levels": perfect_levels,
+            "wrong_attempts": wrong_attempts,
+            "saved_at": datetime.now().isoformat()
+        }
+        
+        if self._progress_store is not None:
+            with self._lock:
+                user = self._find_user(username)
+            if not user:
+                return False
+            self._progress_store._put_progress(user["username"], progress)
+            if "saved_progress" in user:
+                self._drop_profile_progress(username)
+        else:
+            user = self._cas_update(username, lambda user: {"saved_progress": progress})
+            if not user:
+                return False
+        
+        self._update_leaderboards(user["username"], {"max_streak": max_streak, "perfect_levels": perfect_levels})
+        return True
+    
+    def load_progress(self, username: str) -> Optional[Dict]:
+        """Load user's saved game progress"""
+        self._rehydrate(username)
+        if self._progress_store is not None:
+            with self._progress_store._lock:
+                record = self._progress_store._find_user(username)
+            if record is not None:
+                # A copy: the game keeps and changes what it loads
+                return record["saved_progress"].to_dict()
+            # Fall back to progress saved in the profile before the split
+        
+        with self._lock:
+            user = self._find_user(username)
+            return to_plain(user.get("saved_progress")) if user else None
+    
+    def clear_progress(self, username: str) -> bool:
+        """Clear user's saved game progress"""
+        self._rehydrate(username)
+        if self._progress_store is not None:
+            with self._lock:
+                user = self._find_user(username)
+            if not user:
+                return False
+            self._progress_store._put_progress(user["username"], None)
+            if "saved_progress" in user:
+                self._drop_profile_progress(username)
+        else:
+            user = self._cas_update(username, lambda user: {"saved_progress": _UNSET} if "saved_progress" in user else {})
+            if not user:
+                return False
+        
+        self._update_leaderboards(user["username"], {"max_streak": 0, "perfect_levels": 0})
+        return True
+    
+    def _read_log_entries(self) -> List[Dict]:
+        """All complete entries of the mutation log (caller holds the file lock)"""
+        try:
+            with open(self.log_file, 'rb') as f:
+                chunk = f.read()
+        except FileNotFoundError:
+            return []
+        end = chunk.rfind(b"\n") + 1
+        return [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+    
+    @staticmethod
+    def _replay_onto(user: Optional[Dict], entries: List[Dict]) -> Optional[Dict]:
+        """A record after some mutation entries (None if it ends up deleted)"""
+        for entry in entries:
+            op = entry.get("op")
+            if op == "add":
+                user = dict(entry["user"])
+            elif op == "update" and user is not None:
+                user.update(entry.get("set", {}))
+                for field in entry.get("unset", []):
+                    user.pop(field, None)
+            elif op == "delete":
+                user = None
+        return user
+    
+    def _iter_snapshot(self):
+        """
+        Yield every stored record as a plain dict, as of the first next()
+        
+        The snapshot is never parsed as a whole, and only the (small)
+        mutation log and this process' unflushed changes are kept aside to
+        be laid over it. Locks are held only while those are gathered, so
+        writers carry on while the records stream. Records come out
+        upgraded to SCHEMA_VERSION.
+        """
+        with self._lock:
+            pending = self._pending_entries() if self._dirty else []
+            pending += self._login_entries()
+            with self._file_lock(exclusive=False):
+                # The open file keeps this snapshot readable even if a writer
+                # replaces it before we are done; its log belongs to it
+                snapshot = open(self.json_file, 'rb')
+                entries = self._read_log_entries()
+        
+        overlay: Dict[str, List[Dict]] = {}
+        for entry in entries + pending:
+            overlay.setdefault(self._entry_key(entry), []).append(entry)
+        
+        with snapshot:
+            for user in iter_store_users(snapshot):
+                changes = overlay.pop(self._key(user["username"]), None)
+                if changes:
+                    user = self._replay_onto(user, changes)
+                    if user is None:
+                        continue
+                self._upgrade(user)
+                yield user
+        
+        # Users added since the snapshot was written
+        for changes in overlay.values():
+            user = self._replay_onto(None, changes)
+            if user is not None:
+                self._upgrade(user)
+                yield user
+    
+    def iter_all_users(self):
+        """
+        Yield all users (without passwords) streamed from disk, one at a time
+        
+        For read-only scans of stores too big to hold in memory.
+        """
+        if self._progress_store is not None:
+            with self._progress_store._lock:
+                self._progress_store._load_users()
+        
+        for user in self._iter_snapshot():
+            for field in HIDDEN_FIELDS:
+                user.pop(field, None)
+            yield self._merge_progress(user)
+    
+    def get_all_users(self) -> list:
+        """Get all users (without passwords)"""
+        if self._progress_store is not None:
+            with self._progress_store._lock:
+                self._progress_store._load_users()
+        
+        with self._lock:
+            users = self._load_users().get("users", [])
+            return [self._public_user(user) for user in users]
+    
+    def cursor_for(self, user: Dict, sort_by: str = "username") -> Tuple:
+        """Cursor to pass as iter_users(after=...) to continue after this user"""
+        key = self._key(user["username"])
+        return self._sort_values(key, user)[SORT_FIELDS.index(sort_by)], key
+    
+    def iter_users(self, sort_by: str = "username", descending: bool = False,
+                   after: Optional[Tuple] = None, limit: Optional[int] = None,
+                   status: Optional[str] = None):
+        """
+        Yield users (without passwords) in a maintained sort order
+        
+        Only the users actually yielded are read, so a page costs the same
+        however many users there are.
+        
+        Args:
+            sort_by: One of SORT_FIELDS; ties are broken by username
+            descending: Highest values first
+            after: Cursor of the last user of the previous page (cursor_for)
+            limit: Stop after this many users
+            status: Only "active" or only "disabled" users
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of {SORT_FIELDS}, not {sort_by!r}")
+        if status is not None and status not in USER_STATUSES:
+            raise ValueError(f"status must be one of {USER_STATUSES}, not {status!r}")
+        
+        remaining = limit
+        cursor = tuple(after) if after is not None else None
+        while remaining is None or remaining > 0:
+            # Re-locate the cursor for every batch, so writes in between are fine
+            if self._progress_store is not None:
+                with self._progress_store._lock:
+                    self._progress_store._load_users()
+            with self._lock:
+                self._load_users()
+                order = self._sort_orders()[sort_by]
+                if descending:
+                    end = bisect.bisect_left(order, cursor) if cursor is not None else len(order)
+                    batch = order[max(0, end - ITER_BATCH_SIZE):end][::-1]
+                else:
+                    start = bisect.bisect_right(order, cursor) if cursor is not None else 0
+                    batch = order[start:start + ITER_BATCH_SIZE]
+                if not batch:
+                    return
+                
+                page = []
+                for _, key in batch:
+                    user = self._current(self._index[key])
+                    if status is not None and user["is_active"] != (status == "active"):
+                        continue
+                    page.append(self._public_user(user))
+                    if remaining is not None and len(page) == remaining:
+                        break
+            
+            cursor = batch[-1]
+            for user in page:
+                yield user
+            if remaining is not None:
+                remaining -= len(page)
+    
+    def count_users(self, status: Optional[str] = None) -> int:
+        """Number of users, optionally only "active" or only "disabled" ones"""
+        if status is not None and status not in USER_STATUSES:
+            raise ValueError(f"status must be one of {USER_STATUSES}, not {status!r}")
+        
+        with self._lock:
+            self._load_users()
+            self._sort_orders()
+            if status == "disabled":
+                return self._disabled_count
+            if status == "active":
+                return len(self._index) - self._disabled_count
+            return len(self._index)
+    
+    def _substring_matches(self, query: str):
+        """Keys of users whose username or email contains a case-folded query"""
+        grams = self._search_grams()
+        if len(query) < NGRAM:
+            # Too short for the index: check every user (stops at the caller's limit)
+            candidates = iter(list(self._gram_texts))
+        else:
+            postings = [grams.get(query[i:i + NGRAM]) for i in range(len(query) - NGRAM + 1)]
+            if any(p is None for p in postings):
+                return
+            # Every match is in the shortest posting list; the text check does the rest
+            candidates = (self._gram_keys[number] for number in min(postings, key=len))
+        for key in candidates:
+            if key is not None and query in self._gram_texts[key]:
+                yield key
+    
+    def search_users(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Find users (without passwords) by part of their username or email
+        
+        Case-insensitive. Usernames, then emails, starting with the query
+        come first, in order; users that only contain it somewhere follow.
+        Both lookups use maintained indexes, so a search costs about the
+        same however many users there are.
+        
+        Args:
+            query: Text to look for
+            limit: Return at most this many users
+        """
+        query = (query or "").strip().casefold()
+        if not query or limit <= 0:
+            return []
+        
+        if self._progress_store is not None:
+            with self._progress_store._lock:
+                self._progress_store._load_users()
+        
+        with self._lock:
+            self._load_users()
+            orders = self._sort_orders()
+            found: Dict[str, None] = {}
+            
+            # Prefix matches straight from the sorted username and email orders
+            for field in ("username", "email"):
+                order = orders[field]
+                position = bisect.bisect_left(order, (query,))
+                while len(found) < limit and position < len(order) and order[position][0].startswith(query):
+                    found.setdefault(order[position][1])
+                    position += 1
+            
+            if len(found) < limit:
+                for key in self._substring_matches(query):
+                    found.setdefault(key)
+                    if len(found) >= limit:
+                        break
+            
+            return [self._public_user(self._index[key]) for key in found]
+    
+    def get_leaderboard(self, metric: str = "high_score", k: int = 10) -> List[Dict]:
+        """
+        Top players for one of LEADERBOARD_METRICS, best first
+        
+        Reads the maintained board only, never the users themselves.
+        
+        Returns:
+            Up to k (at most leaderboard_size) dicts with "username" and "value"
+        """
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"metric must be one of {LEADERBOARD_METRICS}, not {metric!r}")
+        if not self.leaderboard_size:
+            return []
+        
+        with self._lock:
+            board = self._load_leaderboards()[metric]
+            return [{"username": name, "value": -negated} for negated, _, name in board[:k]]
+    
+    def user_exists(self, username: str) -> bool:
+        """Check if a username exists"""
+        with self._lock:
+            return self._find_user(username) is not None or self._is_archived(username)
+    
+    def is_username_available(self, username: str) -> bool:
+        """
+        Whether a username is still free, answered from memory
+        
+        Meant for live feedback while a name is typed: after the first load
+        the check never goes to the store files, so a name another process
+        took since the last reload may still show as free. register_user
+        has the final word; a name it would reject is never available.
+        """
+        if self._validate_username(username):
+            return False
+        key = self._key(username.strip())
+        with self._lock:
+            if self._file_signature is None:
+                # Nothing loaded yet (or the last write failed)
+                self._load_users()
+                self._load_archive_index()
+            return key not in self._index and key not in self._archive_index
+    
+    def disable_user(self, username: str) -> Tuple[bool, str]:
+        """Disable a user account"""
+        user = self._cas_update(username, lambda user: {"is_active": False, "disabled_at": datetime.now().isoformat()})
+        if not user:
+            return False, f"User '{username}' not found"
+        return True, f"Account '{username}' has been disabled successfully"
+    
+    def activate_user(self, username: str) -> Tuple[bool, str]:
+        """Activate a user account"""
+        user = self._cas_update(username, lambda user: {"is_active": True, "disabled_at": _UNSET})
+        if not user:
+            return False, f"User '{username}' not found"
+        return True, f"Account '{username}' has been activated successfully"
+    
+    def delete_user(self, username: str) -> Tuple[bool, str]:
+        """Permanently delete a user account"""
+        archived = self._forget_archived([username])[0]
+        with self._write_lock(buffered=False):
+            user = self._find_user(username)
+            if not user:
+                if archived:
+                    self._forget_leaderboards([archived])
+                    return True, f"Account '{username}' has been permanently deleted"
+                return False, f"User '{username}' not found"
+            
+            entry = {"op": "delete", "username": user["username"]}
+            self._apply_entry(entry)
+            self._commit([entry], buffered=False)
+            if self._progress_store is not None:
+                self._progress_store._put_progress(user["username"], None)
+            self._forget_leaderboards([user["username"]])
+            return True, f"Account '{username}' has been permanently deleted"
+    
+    def create_user_admin(self, username: str, password: str, email: str = "") -> Tuple[bool, str]:
+        """Create a new user account (admin function)"""
+        # Reuse the register_user function
+        success, message, user_data = self.register_user(username, password, email)
+        
+        if success:
+            # Mark as active by default
+            self._cas_update(username.strip(),
+                             lambda user: {"is_active": True} if user.get("is_active") is not True else {})
+        
+        return success, message
+    
+    def get_user_status(self, username: str) -> Optional[Dict]:
+        """Get user account status"""
+        with self._lock:
+            user = self._find_user(username)
+            if not user:
+                return None
+            
+            return {
+                "username": user["username"],
+                "is_active": user["is_active"],
+                "disabled_at": user.get("disabled_at"),
+                "created_at": user.get("created_at"),
+                "last_login": user["last_login"]
+            }
     
-    def _initialize_file(self):
-        """Initialize the JSON file if it doesn't exist"""
-        if not os.path.exists(self.json_file):
-            with open(self.json_file, 'w') as f:
-                json.dump({"users": []}, f, indent=2)
+    def get_user_details(self, username: str) -> Optional[Dict]:
+        """Get complete user details for editing"""
+        self._rehydrate(username)
+        if self._progress_store is not None:
+            with self._progress_store._lock:
+                self._progress_store._load_users()
+        
+        with self._lock:
+            user = self._find_user(username)
+            if not user:
+                return None
+            
+            # Return all fields except password
+            return self._public_user(user)
     
-    def _hash_password(self, password: str) -> str:
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def update_user_email(self, username: str, new_email: str) -> Tuple[bool, str]:
+        """Update user's email address"""
+        if not self._cas_update(username, lambda user: {"email": new_email}):
+            return False, f"User '{username}' not found"
+        return True, f"Email updated successfully for '{username}'"
     
-    def _load_users(self) -> Dict:
-        """Load users from JSON file"""
-        try:
-            with open(self.json_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"users": []}
+    def update_user_password(self, username: str, new_password: str) -> Tuple[bool, str]:
+        """Update user's password"""
+        if len(new_password) < 6:
+            return False, "Password must be at least 6 characters long"
+        
+        hashed_password = self._hash_password(new_password)
+        if not self._cas_update(username, lambda user: {"password": hashed_password}):
+            return False, f"User '{username}' not found"
+        return True, f"Password updated successfully for '{username}'"
     
-    def _save_users(self, data: Dict):
-        """Save users to JSON file"""
-        with open(self.json_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    def update_user_details(self, username: str, new_email: str = None, new_password: str = None) -> Tuple[bool, str]:
+        """Update user's email and/or password"""
+        changes = {}
+        
+        # Validate before touching the cached record
+        if new_password is not None and new_password.strip():
+            if len(new_password) < 6:
+                return False, "Password must be at least 6 characters long"
+        
+        # Update email if provided
+        if new_email is not None and new_email.strip():
+            changes["email"] = new_email.strip()
+        
+        # Update password if provided
+        if new_password is not None and new_password.strip():
+            changes["password"] = self._hash_password(new_password)
+        
+        if not self._cas_update(username, lambda user: changes):
+            return False, f"User '{username}' not found"
+        
+        if changes:
+            updated_fields = " and ".join(changes)
+            return True, f"Successfully updated {updated_fields} for '{username}'"
+        else:
+            return False, "No changes provided"
     
-    def register_user(self, username: str, password: str, email: str = "") -> Tuple[bool, str, Optional[Dict]]:
+    def mark_game_completed_permanently(self, username: str) -> bool:
+        """Mark game as completed permanently to prevent replay"""
+        return self._cas_update(username, lambda user: {"game_completed_permanently": True}) is not None
+    
+    # Bulk operations apply a whole list with a single load and a single write
+    
+    def bulk_create(self, accounts: List[Dict]) -> List[Tuple[bool, str]]:
         """
-        Register a new user
+        Create many user accounts at once (admin function)
         
         Args:
-            username: User's chosen username
-            password: User's password (will be hashed)
-            email: User's email (optional)
+            accounts: Dicts with "username", "password" and optional "email"
         
         Returns:
-            Tuple of (success: bool, message: str, user_data: dict or None)
+            One (success, message) tuple per account, in input order
         """
-        # Validation
-        if not username or len(username.strip()) < 3:
-            return False, "Username must be at least 3 characters long", None
+        # Hash outside the lock; only the uniqueness checks need it
+        prepared = []
+        for account in accounts:
+            username = account.get("username") or ""
+            password = account.get("password") or ""
+            error = self._validate_new_account(username, password)
+            hashed = None if error else self._hash_password(password)
+            prepared.append((username.strip(), hashed, account.get("email") or "", error))
         
-        if not password or len(password) < 6:
-            return False, "Password must be at least 6 characters long", None
+        return self._create_accounts(prepared)
+    
+    def _create_accounts(self, prepared: List[Tuple]) -> List[Tuple[bool, str]]:
+        """Add (username, hashed_password, email, error) tuples in one write"""
+        results: List[Tuple[bool, str]] = []
+        entries = []
+        with self._write_lock(buffered=False):
+            self._load_users()
+            archived = self._load_archive_index()
+            for username, hashed, email, error in prepared:
+                if error:
+                    results.append((False, error))
+                elif self._key(username) in self._index or self._key(username) in archived:
+                    results.append((False, f"Username '{username}' already exists"))
+                else:
+                    entry = {"op": "add", "user": self._new_user_record(username, hashed, email)}
+                    # Applied right away so duplicates within the batch are caught too
+                    self._apply_entry(entry)
+                    entries.append(entry)
+                    results.append((True, f"Account created successfully for {username}!"))
+            
+            if entries:
+                self._commit(entries, buffered=False)
+        return results
+    
+    @staticmethod
+    def _read_roster(source, fmt: Optional[str] = None) -> List[Dict]:
+        """
+        Read roster rows from a CSV or JSON file
         
-        username = username.strip()
+        Args:
+            source: A path or an open (text or binary) file
+            fmt: "csv" or "json"; guessed from the file name when omitted
         
-        # Load existing users
-        data = self._load_users()
-        users = data.get("users", [])
+        Returns:
+            Dicts with "username", "password" and "email"
+        """
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                content = f.read()
+            name = source
+        else:
+            content = source.read()
+            name = getattr(source, "name", "") or ""
+        if isinstance(content, bytes):
+            content = content.decode("utf-8-sig")
         
-        # Check if username already exists
-        if any(user["username"].lower() == username.lower() for user in users):
-            return False, "Username already exists", None
+        fmt = (fmt or os.path.splitext(name)[1].lstrip(".") or "csv").lower()
+        if fmt == "json":
+            rows = json.loads(content)
+            if isinstance(rows, dict):
+                rows = rows.get("users", [])
+        elif fmt == "csv":
+            rows = list(csv.DictReader(io.StringIO(content)))
+        else:
+            raise ValueError(f"Unsupported roster format '{fmt}' (expected csv or json)")
         
-        # Create new user
-        new_user = {
-            "username": username,
-            "password": self._hash_password(password),
-            "email": email,
-            "created_at": datetime.now().isoformat(),
-            "last_login": None,
-            "total_games": 0,
-            "high_score": 0,
-            "is_active": True  # Active by default
+        return [{
+            "username": str(row.get("username") or "").strip(),
+            "password": str(row.get("password") or ""),
+            "email": str(row.get("email") or "").strip()
+        } for row in rows]
+    
+    def import_roster(self, source, fmt: Optional[str] = None, workers: Optional[int] = None) -> Dict:
+        """
+        Create accounts for an event roster (CSV or JSON)
+        
+        Usernames are checked against the index in one pass, passwords are
+        hashed across a process pool and all new users go out in a single write.
+        
+        Args:
+            source: A path or an open file with username, password and email
+                columns (CSV) or objects (JSON, a list or {"users": [...]})
+            fmt: "csv" or "json"; guessed from the file name when omitted
+            workers: Hashing processes (default: one per CPU)
+        
+        Returns:
+            Dict with total, created, failed [(username, message)], seconds
+            and users_per_sec
+        """
+        start = time.perf_counter()
+        rows = self._read_roster(source, fmt)
+        
+        # One validation pass against the index and the roster itself
+        errors: List[Optional[str]] = []
+        seen = set()
+        with self._lock:
+            self._load_users()
+            archived = self._load_archive_index()
+            for row in rows:
+                error = self._validate_new_account(row["username"], row["password"])
+                key = self._key(row["username"])
+                if not error and (key in self._index or key in archived or key in seen):
+                    error = f"Username '{row['username']}' already exists"
+                seen.add(key)
+                errors.append(error)
+        
+        passwords = [row["password"] for row, error in zip(rows, errors) if not error]
+        if len(passwords) >= PARALLEL_HASH_MIN and workers != 1:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(passwords) // (workers * 4))
+                hashes = iter(list(pool.map(_hash_password_value, passwords, chunksize=chunksize)))
+        else:
+            hashes = iter([_hash_password_value(password) for password in passwords])
+        
+        prepared = [(row["username"], None if error else next(hashes), row["email"], error)
+                    for row, error in zip(rows, errors)]
+        results = self._create_accounts(prepared)
+        
+        seconds = time.perf_counter() - start
+        created = sum(1 for success, _ in results if success)
+        return {
+            "total": len(rows),
+            "created": created,
+            "failed": [(row["username"], message)
+                       for row, (success, message) in zip(rows, results) if not success],
+            "seconds": seconds,
+            "users_per_sec": created / seconds if seconds > 0 else 0.0
         }
+    
+    def _bulk_set_active(self, usernames: List[str], active: bool) -> List[Tuple[bool, str]]:
+        """Disable or activate many accounts with one write"""
+        results: List[Tuple[bool, str]] = []
+        entries = []
+        action = "activated" if active else "disabled"
+        for username in usernames:
+            self._rehydrate(username)
+        with self._write_lock():
+            self._load_users()
+            now = datetime.now().isoformat()
+            for username in usernames:
+                user = self._current(self._index.get(self._key(username or "")))
+                if not user:
+                    results.append((False, f"User '{username}' not found"))
+                    continue
+                
+                user["is_active"] = active
+                if active:
+                    user.pop("disabled_at", None)
+                else:
+                    user["disabled_at"] = now
+                entries.append(self._update_entry(user, "is_active", "disabled_at"))
+                results.append((True, f"Account '{username}' has been {action} successfully"))
+            
+            if entries:
+                self._commit(entries)
+        return results
+    
+    def bulk_disable(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Disable many user accounts; one (success, message) per username"""
+        return self._bulk_set_active(usernames, False)
+    
+    def bulk_activate(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Activate many user accounts; one (success, message) per username"""
+        return self._bulk_set_active(usernames, True)
+    
+    def bulk_delete(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Permanently delete many user accounts; one (success, message) per username"""
+        archived = self._forget_archived(usernames)
+        deleted = [name or cold for name, cold in zip(self._delete_records(usernames, buffered=False), archived)]
+        if self._progress_store is not None:
+            self._progress_store._delete_records([name for name in deleted if name])
+        self._forget_leaderboards([name for name in deleted if name])
         
-        users.append(new_user)
-        data["users"] = users
-        self._save_users(data)
+        return [(True, f"Account '{username}' has been permanently deleted") if name
+                else (False, f"User '{username}' not found")
+                for username, name in zip(usernames, deleted)]
+    
+    def bulk_update_stats(self, results: List[Tuple[str, int]]) -> List[bool]:
+        """
+        Record many finished games at once
         
-        # Return user data without password
-        user_data = {k: v for k, v in new_user.items() if k != "password"}
+        Args:
+            results: (username, score) pairs; a user may appear more than once
         
-        return True, f"Account created successfully for {username}!", user_data
+        Returns:
+            One bool per pair, False where the user was not found
+        """
+        updated = []
+        changed: Dict[str, Dict] = {}
+        for username, _ in results:
+            self._rehydrate(username)
+        with self._write_lock(buffered=False):
+            self._load_users()
+            for username, score in results:
+                user = self._current(self._index.get(self._key(username or "")))
+                updated.append(user is not None)
+                if user is None:
+                    continue
+                
+                user["total_games"] += 1
+                if score > user["high_score"]:
+                    user["high_score"] = score
+                changed[self._key(user["username"])] = user
+            
+            if changed:
+                self._commit([self._update_entry(user, "total_games", "high_score")
+                              for user in changed.values()], buffered=False)
+                for user in changed.values():
+                    self._update_leaderboards(user["username"], {"high_score": user["high_score"]})
+        return updated
     
-    def login_user(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
+    def _iter_export_records(self):
+        """Every user with password and saved progress, as plain dicts (see _iter_snapshot)"""
+        progress = {}
+        if self._progress_store is not None:
+            # The progress store's own point-in-time view, taken just before ours
+            progress = {self._key(record["username"]): record["saved_progress"]
+                        for record in self._progress_store._iter_snapshot() if "saved_progress" in record}
+        
+        archived = self._load_archive_index()
+        hot = set()
+        for user in self._iter_snapshot():
+            saved = progress.get(self._key(user["username"]))
+            if saved is not None:
+                user["saved_progress"] = saved
+            if archived:
+                hot.add(self._key(user["username"]))
+            yield user
+        
+        # Archived accounts are users too; a backup restores them to the hot store
+        for user in self._iter_archived():
+            if self._key(user["username"]) not in hot:
+                yield user
+    
+    def export_snapshot(self, path: str, compress: Optional[bool] = None) -> Dict:
         """
-        Authenticate user login
+        Back up every user to an NDJSON file, one full record per line
+        
+        A point-in-time copy taken without holding writers up for the dump:
+        the snapshot file is opened and the log read under the lock, then
+        the records stream from the open file. Split-off progress goes back
+        into saved_progress, so a backup restores into either layout.
         
         Args:
-            username: User's username
-            password: User's password
+            path: File to write; replaced atomically once complete
+            compress: gzip the output (default: when path ends in ".gz")
         
         Returns:
-            Tuple of (success: bool, message: str, user_data: dict or None)
+            Dict with users, bytes (NDJSON before compression), file_bytes,
+            seconds and mb_per_sec
         """
-        if not username or not password:
-            return False, "Username and password are required", None
+        return _write_ndjson(path, self._iter_export_records(), compress)
+    
+    def _restore_progress(self, progress: Dict[str, Optional[Dict]]):
+        """Put backed-up saved_progress into a progress store with one write (None drops it)"""
+        entries = []
+        dropped = []
+        with self._write_lock(buffered=False):
+            self._load_users()
+            for username, saved in progress.items():
+                existing = self._index.get(self._key(username))
+                if saved is None:
+                    if existing is not None:
+                        dropped.append(username)
+                    continue
+                version = existing.get("version", 0) + 1 if existing is not None else 1
+                entry = {"op": "add", "user": {"username": username, "saved_progress": saved,
+                                               "version": version, "schema": SCHEMA_VERSION}}
+                self._apply_entry(entry)
+                entries.append(entry)
+            
+            if entries:
+                self._commit(entries, buffered=False)
+            if dropped:
+                self._delete_records(dropped, buffered=False)
+    
+    def _import_chunk(self, records: List[Dict], skip_existing: bool = False) -> Tuple[int, int, int]:
+        """Store backed-up user records with one write; returns (added, replaced, skipped)"""
+        added = replaced = skipped = 0
+        entries = []
+        progress: Dict[str, Optional[Dict]] = {}
+        with self._write_lock(buffered=False):
+            self._load_users()
+            for record in records:
+                existing = self._index.get(self._key(record["username"]))
+                if existing is not None:
+                    if skip_existing:
+                        skipped += 1
+                        continue
+                    # Past the replaced record's version, so writes based on it lose their swap
+                    record["version"] = max(record.get("version", 1), existing.get("version", 0) + 1)
+                    replaced += 1
+                else:
+                    added += 1
+                
+                # Backups from older stores come in upgraded, like any record written now
+                self._upgrade(record)
+                if self._progress_store is not None:
+                    progress[record["username"]] = record.pop("saved_progress", None)
+                entry = {"op": "add", "user": record}
+                self._apply_entry(entry)
+                entries.append(entry)
+            
+            if entries:
+                self._commit(entries, buffered=False)
         
-        username = username.strip()
+        if progress:
+            self._progress_store._restore_progress(progress)
+        return added, replaced, skipped
+    
+    def import_snapshot(self, path: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                        skip_existing: bool = False) -> Dict:
+        """
+        Load users from an NDJSON backup (gzipped or not), streaming
         
-        # Load users
-        data = self._load_users()
-        users = data.get("users", [])
+        The file is read a line at a time and committed every chunk_size
+        records, so memory stays bounded by one chunk and other processes
+        get the lock in between. A stored user with the same username is
+        replaced by the backup's record unless skip_existing is set.
         
-        # Find user
-        user = None
-        user_index = -1
-        for i, u in enumerate(users):
-            if u["username"].lower() == username.lower():
-                user = u
-                user_index = i
-                break
+        Args:
+            path: File written by export_snapshot (or other user records, one per line)
+            chunk_size: Records per write
+            skip_existing: Keep stored users instead of replacing them
         
-        if not user:
-            return False, "Invalid username or password", None
+        Returns:
+            Dict with total, added, replaced, skipped, failed [(line, message)],
+            seconds and users_per_sec
+        """
+        start = time.perf_counter()
+        counts = [0, 0, 0]
+        failed: List[Tuple[int, str]] = []
+        for chunk in _iter_backup_chunks(path, chunk_size, failed):
+            for i, count in enumerate(self._import_chunk(chunk, skip_existing)):
+                counts[i] += count
         
-        # Check if account is active
-        if not user.get("is_active", True):
-            return False, "Account has been disabled. Please contact the administrator.", None
+        if self.leaderboard_size and (counts[0] or counts[1]):
+            with self._file_lock(exclusive=True):
+                self._rebuild_leaderboards()
+        return _import_report(start, counts, failed)
+
+
+class ShardedJSONAuthManager:
+    """
+    Sharded layout for the JSON user store
+    
+    Users are spread over hash-bucketed shard files under a directory, each
+    managed by its own JSONAuthManager (with its own cache and lock), so a
+    per-user operation only reads and rewrites that user's small shard.
+    A manifest.json in the directory records the layout.
+    """
+    
+    MANIFEST_VERSION = 1
+    
+    def __init__(self, store_dir: str = "users_shards", shard_count: int = 64, **options):
+        """
+        Args:
+            store_dir: Directory holding manifest.json and the shard files
+            shard_count: Number of shards for a new store (an existing
+                store keeps the count recorded in its manifest)
+            **options: Passed on to each shard's JSONAuthManager
+                (journal, flush_interval_ms, fsync, ...)
+        """
+        self.store_dir = store_dir
+        self.manifest_file = os.path.join(store_dir, "manifest.json")
+        self.options = options
+        self._shards: Dict[int, JSONAuthManager] = {}
+        self._lock = threading.Lock()
         
-        # Verify password
-        hashed_password = self._hash_password(password)
-        if user["password"] != hashed_password:
-            return False, "Invalid username or password", None
+        os.makedirs(os.path.join(store_dir, "shards"), exist_ok=True)
+        self.manifest = self._load_manifest(shard_count)
+        self.shard_count = self.manifest["shard_count"]
+    
+    def _load_manifest(self, shard_count: int) -> Dict:
+        """Read the manifest, creating it for a new store"""
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
         
-        # Update last login
-        user["last_login"] = datetime.now().isoformat()
-        users[user_index] = user
-        data["users"] = users
-        self._save_users(data)
+        manifest = {
+            "layout": "sharded",
+            "version": self.MANIFEST_VERSION,
+            "shard_count": shard_count,
+            "shard_file": "shards/{:03d}.json",
+            "created_at": datetime.now().isoformat()
+        }
+        tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # Another process may have won the race; first manifest written wins
+        try:
+            os.link(tmp_file, self.manifest_file)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_file)
+        with open(self.manifest_file, 'r') as f:
+            return json.load(f)
+    
+    def shard_number(self, username: str) -> int:
+        """Stable shard number for a username (same in every process)"""
+        return zlib.crc32(JSONAuthManager._key(username).encode()) % self.shard_count
+    
+    def _shard_manager(self, number: int) -> JSONAuthManager:
+        """The manager for one shard file, opened on first use"""
+        with self._lock:
+            manager = self._shards.get(number)
+            if manager is None:
+                shard_file = os.path.join(self.store_dir, self.manifest["shard_file"].format(number))
+                manager = JSONAuthManager(shard_file, **self.options)
+                self._shards[number] = manager
+            return manager
+    
+    def _shard(self, username: Optional[str]) -> JSONAuthManager:
+        """The manager for the shard a username belongs to"""
+        return self._shard_manager(self.shard_number((username or "").strip()))
+    
+    def iter_all_users(self):
+        """Yield all users (without passwords), one shard at a time"""
+        for shard in self._open_shards():
+            yield from shard.iter_all_users()
+    
+    def get_all_users(self) -> list:
+        """Get all users (without passwords)"""
+        return list(self.iter_all_users())
+    
+    def _open_shards(self) -> List[JSONAuthManager]:
+        """Managers of every shard that exists on disk or is open"""
+        return [self._shard_manager(number) for number in range(self.shard_count)
+                if number in self._shards or os.path.exists(
+                    os.path.join(self.store_dir, self.manifest["shard_file"].format(number)))]
+    
+    def cursor_for(self, user: Dict, sort_by: str = "username") -> Tuple:
+        """Cursor to pass as iter_users(after=...) to continue after this user"""
+        return self._shard(user["username"]).cursor_for(user, sort_by)
+    
+    def iter_users(self, sort_by: str = "username", descending: bool = False,
+                   after: Optional[Tuple] = None, limit: Optional[int] = None,
+                   status: Optional[str] = None):
+        """Yield users (without passwords) in sort order, merged across shards"""
+        shards = self._open_shards()
+        merged = heapq.merge(
+            *(shard.iter_users(sort_by, descending, after, limit, status) for shard in shards),
+            key=lambda user: self.cursor_for(user, sort_by), reverse=descending
+        )
+        for count, user in enumerate(merged):
+            if limit is not None and count >= limit:
+                return
+            yield user
+    
+    def count_users(self, status: Optional[str] = None) -> int:
+        """Number of users, optionally only "active" or only "disabled" ones"""
+        return sum(shard.count_users(status) for shard in self._open_shards())
+    
+    def search_users(self, query: str, limit: int = 50) -> List[Dict]:
+        """Find users by part of their username or email, merged across shards"""
+        folded = (query or "").strip().casefold()
+        found = [user for shard in self._open_shards() for user in shard.search_users(query, limit)]
+        # Same ranking as within a shard: username prefixes, email prefixes, the rest
+        found.sort(key=lambda user: (not user["username"].casefold().startswith(folded),
+                                     not (user.get("email") or "").casefold().startswith(folded),
+                                     user["username"].casefold()))
+        return found[:limit]
+    
+    def get_leaderboard(self, metric: str = "high_score", k: int = 10) -> List[Dict]:
+        """Top players for one of LEADERBOARD_METRICS, merged from every shard's board"""
+        entries = [entry for shard in self._open_shards() for entry in shard.get_leaderboard(metric, k)]
+        return heapq.nsmallest(k, entries, key=lambda entry: (-entry["value"], entry["username"].casefold()))
+    
+    def flush(self):
+        """Write buffered changes of every open shard"""
+        for manager in list(self._shards.values()):
+            manager.flush()
+    
+    def close(self):
+        """Close every open shard (see JSONAuthManager.close)"""
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), {}
+        for manager in shards:
+            manager.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def compact(self):
+        """Fold every open shard's mutation log into its snapshot"""
+        for manager in list(self._shards.values()):
+            manager.compact()
+    
+    def upgrade_schema(self) -> Dict:
+        """Upgrade every shard's records to SCHEMA_VERSION; totals over the shards"""
+        reports = [manager.upgrade_schema() for manager in self._open_shards()]
+        return {key: sum(report[key] for report in reports)
+                for key in ("users", "upgraded", "progress_upgraded", "seconds")}
+    
+    def archive_accounts(self, inactive_days: int = ARCHIVE_INACTIVE_DAYS) -> Dict:
+        """Move every shard's disabled and long-inactive accounts to its archive; totals over the shards"""
+        reports = [manager.archive_accounts(inactive_days) for manager in self._open_shards()]
+        return {key: sum(report[key] for report in reports)
+                for key in ("archived", "hot_bytes_before", "hot_bytes_after", "archive_bytes", "seconds")}
+    
+    def archive_status(self) -> Dict:
+        """Archived accounts and file sizes, totals over the shards"""
+        reports = [manager.archive_status() for manager in self._open_shards()]
+        return {key: sum(report[key] for report in reports) for key in ("archived", "hot_bytes", "archive_bytes")}
+    
+    def search_archived(self, query: str = "", limit: int = 50) -> List[str]:
+        """Usernames of archived accounts containing a query, merged from every shard"""
+        names = [name for shard in self._open_shards() for name in shard.search_archived(query, limit)]
+        return sorted(names, key=str.casefold)[:limit]
+    
+    def restore_users(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Bring archived accounts back into their shards' hot stores"""
+        return self._bulk("restore_users", usernames, lambda username: username)
+    
+    def migrate_from(self, json_file: str = "users.json") -> int:
+        """
+        Copy all users from a single users.json into the shards
+        
+        Users already present in their shard are replaced by the copy
+        from the file. Returns the number of users migrated.
+        """
+        users = load_store_file(json_file).get("users", [])
+        
+        by_shard: Dict[int, List[Dict]] = {}
+        for user in users:
+            by_shard.setdefault(self.shard_number(user["username"]), []).append(user)
         
-        # Return user data without password
-        user_data = {k: v for k, v in user.items() if k != "password"}
+        for number, shard_users in by_shard.items():
+            manager = self._shard_manager(number)
+            with manager._file_lock(exclusive=True):
+                manager._load_users()
+                for user in shard_users:
+                    manager._apply_entry({"op": "add", "user": user})
+                # One rewrite per shard instead of one per user
+                manager._save_users(manager._data)
         
-        return True, f"Welcome back, {username}!", user_data
+        return len(users)
     
-    def update_user_stats(self, username: str, score: int):
-        """Update user statistics after game completion"""
-        data = self._load_users()
-        users = data.get("users", [])
+    def export_snapshot(self, path: str, compress: Optional[bool] = None) -> Dict:
+        """
+        Back up every shard's users to one NDJSON file
         
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["total_games"] += 1
-                if score > user.get("high_score", 0):
-                    user["high_score"] = score
-                users[i] = user
-                break
+        Each shard is copied as of the moment the export reaches it.
+        """
+        records = (record for manager in self._open_shards() for record in manager._iter_export_records())
+        return _write_ndjson(path, records, compress)
+    
+    def import_snapshot(self, path: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                        skip_existing: bool = False) -> Dict:
+        """Load users from an NDJSON backup into their shards, one write per shard per chunk"""
+        start = time.perf_counter()
+        counts = [0, 0, 0]
+        failed: List[Tuple[int, str]] = []
+        touched = set()
+        for chunk in _iter_backup_chunks(path, chunk_size, failed):
+            by_shard: Dict[int, List[Dict]] = {}
+            for record in chunk:
+                by_shard.setdefault(self.shard_number(record["username"]), []).append(record)
+            for number, records in by_shard.items():
+                for i, count in enumerate(self._shard_manager(number)._import_chunk(records, skip_existing)):
+                    counts[i] += count
+                touched.add(number)
         
-        data["users"] = users
-        self._save_users(data)
+        for number in touched:
+            manager = self._shard_manager(number)
+            if manager.leaderboard_size:
+                with manager._file_lock(exclusive=True):
+                    manager._rebuild_leaderboards()
+        return _import_report(start, counts, failed)
     
-    def save_progress(self, username: str, level: int, score: int, hints_used: int = 0, 
-                     achievements: list = None, streak: int = 0, max_streak: int = 0,
-                     combo_multiplier: float = 1.0, perfect_levels: int = 0,
-                     wrong_attempts: int = 0) -> bool:
+    def _bulk(self, method: str, items: list, username_of) -> list:
+        """Run a bulk method once per shard and return results in input order"""
+        by_shard: Dict[int, List[int]] = {}
+        for position, item in enumerate(items):
+            number = self.shard_number((username_of(item) or "").strip())
+            by_shard.setdefault(number, []).append(position)
+        
+        results = [None] * len(items)
+        for number, positions in by_shard.items():
+            shard_results = getattr(self._shard_manager(number), method)([items[p] for p in positions])
+            for position, result in zip(positions, shard_results):
+                results[position] = result
+        return results
+    
+    def bulk_create(self, accounts: List[Dict]) -> List[Tuple[bool, str]]:
+        """Create many user accounts at once (admin function)"""
+        return self._bulk("bulk_create", accounts, lambda account: account.get("username"))
+    
+    def bulk_disable(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Disable many user accounts"""
+        return self._bulk("bulk_disable", usernames, lambda username: username)
+    
+    def bulk_activate(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Activate many user accounts"""
+        return self._bulk("bulk_activate", usernames, lambda username: username)
+    
+    def bulk_delete(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Permanently delete many user accounts"""
+        return self._bulk("bulk_delete", usernames, lambda username: username)
+    
+    def bulk_update_stats(self, results: List[Tuple[str, int]]) -> List[bool]:
+        """Record many finished games at once"""
+        return self._bulk("bulk_update_stats", results, lambda result: result[0])
+    
+    # Per-user operations only touch the user's own shard
+    
+    def register_user(self, username: str, password: str, email: str = "") -> Tuple[bool, str, Optional[Dict]]:
+        """Register a new user"""
+        return self._shard(username).register_user(username, password, email)
+    
+    def login_user(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
+        """Authenticate user login"""
+        return self._shard(username).login_user(username, password)
+    
+    def update_user_stats(self, username: str, score: int):
+        """Update user statistics after game completion"""
+        return self._shard(username).update_user_stats(username, score)
+    
+    def save_progress(self, username: str, *args, **kwargs) -> bool:
         """Save user's game progress with all stats"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["saved_progress"] = {
-                    "level": level,
-                    "score": score,
-                    "hints_used": hints_used,
-                    "achievements": achievements or [],
-                    "streak": streak,
-                    "max_streak": max_streak,
-                    "combo_multiplier": combo_multiplier,
-                    "perfect_levels": perfect_levels,
-                    "wrong_attempts": wrong_attempts,
-                    "saved_at": datetime.now().isoformat()
-                }
-                users[i] = user
-                data["users"] = users
-                self._save_users(data)
-                return True
-        return False
+        return self._shard(username).save_progress(username, *args, **kwargs)
     
     def load_progress(self, username: str) -> Optional[Dict]:
         """Load user's saved game progress"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for user in users:
-            if user["username"].lower() == username.lower():
-                return user.get("saved_progress")
-        return None
+        return self._shard(username).load_progress(username)
     
     def clear_progress(self, username: str) -> bool:
         """Clear user's saved game progress"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                if "saved_progress" in user:
-                    del user["saved_progress"]
-                    users[i] = user
-                    data["users"] = users
-                    self._save_users(data)
-                return True
-        return False
-    
-    def get_all_users(self) -> list:
-        """Get all users (without passwords)"""
-        data = self._load_users()
-        users = data.get("users", [])
-        return [{k: v for k, v in user.items() if k != "password"} for user in users]
+        return self._shard(username).clear_progress(username)
     
     def user_exists(self, username: str) -> bool:
         """Check if a username exists"""
-        data = self._load_users()
-        users = data.get("users", [])
-        return any(user["username"].lower() == username.lower() for user in users)
+        return self._shard(username).user_exists(username)
+    
+    def is_username_available(self, username: str) -> bool:
+        """Whether a username is still free, answered from the shard's memory"""
+        return self._shard(username).is_username_available(username)
     
     def disable_user(self, username: str) -> Tuple[bool, str]:
         """Disable a user account"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["is_active"] = False
-                user["disabled_at"] = datetime.now().isoformat()
-                users[i] = user
-                data["users"] = users
-                self._save_users(data)
-                return True, f"Account '{username}' has been disabled successfully"
-        
-        return False, f"User '{username}' not found"
+        return self._shard(username).disable_user(username)
     
     def activate_user(self, username: str) -> Tuple[bool, str]:
         """Activate a user account"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["is_active"] = True
-                if "disabled_at" in user:
-                    del user["disabled_at"]
-                users[i] = user
-                data["users"] = users
-                self._save_users(data)
-                return True, f"Account '{username}' has been activated successfully"
-        
-        return False, f"User '{username}' not found"
+        return self._shard(username).activate_user(username)
     
     def delete_user(self, username: str) -> Tuple[bool, str]:
         """Permanently delete a user account"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        initial_count = len(users)
-        users = [user for user in users if user["username"].lower() != username.lower()]
-        
-        if len(users) < initial_count:
-            data["users"] = users
-            self._save_users(data)
-            return True, f"Account '{username}' has been permanently deleted"
-        
-        return False, f"User '{username}' not found"
+        return self._shard(username).delete_user(username)
     
     def create_user_admin(self, username: str, password: str, email: str = "") -> Tuple[bool, str]:
         """Create a new user account (admin function)"""
-        # Reuse the register_user function
-        success, message, user_data = self.register_user(username, password, email)
-        
-        if success:
-            # Mark as active by default
-            data = self._load_users()
-            users = data.get("users", [])
-            for i, user in enumerate(users):
-                if user["username"].lower() == username.lower():
-                    user["is_active"] = True
-                    users[i] = user
-                    break
-            data["users"] = users
-            self._save_users(data)
-        
-        return success, message
+        return self._shard(username).create_user_admin(username, password, email)
     
     def get_user_status(self, username: str) -> Optional[Dict]:
         """Get user account status"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for user in users:
-            if user["username"].lower() == username.lower():
-                return {
-                    "username": user["username"],
-                    "is_active": user.get("is_active", True),
-                    "disabled_at": user.get("disabled_at"),
-                    "created_at": user.get("created_at"),
-                    "last_login": user.get("last_login")
-                }
-        return None
+        return self._shard(username).get_user_status(username)
     
     def get_user_details(self, username: str) -> Optional[Dict]:
         """Get complete user details for editing"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for user in users:
-            if user["username"].lower() == username.lower():
-                # Return all fields except password
-                return {k: v for k, v in user.items() if k != "password"}
-        return None
+        return self._shard(username).get_user_details(username)
     
     def update_user_email(self, username: str, new_email: str) -> Tuple[bool, str]:
         """Update user's email address"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["email"] = new_email
-                users[i] = user
-                data["users"] = users
-                self._save_users(data)
-                return True, f"Email updated successfully for '{username}'"
-        
-        return False, f"User '{username}' not found"
+        return self._shard(username).update_user_email(username, new_email)
     
     def update_user_password(self, username: str, new_password: str) -> Tuple[bool, str]:
         """Update user's password"""
-        if len(new_password) < 6:
-            return False, "Password must be at least 6 characters long"
-        
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["password"] = self._hash_password(new_password)
-                users[i] = user
-                data["users"] = users
-                self._save_users(data)
-                return True, f"Password updated successfully for '{username}'"
-        
-        return False, f"User '{username}' not found"
+        return self._shard(username).update_user_password(username, new_password)
     
     def update_user_details(self, username: str, new_email: str = None, new_password: str = None) -> Tuple[bool, str]:
         """Update user's email and/or password"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        user_found = False
-        updates = []
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user_found = True
-                
-                # Update email if provided
-                if new_email is not None and new_email.strip():
-                    user["email"] = new_email.strip()
-                    updates.append("email")
-                
-                # Update password if provided
-                if new_password is not None and new_password.strip():
-                    if len(new_password) < 6:
-                        return False, "Password must be at least 6 characters long"
-                    user["password"] = self._hash_password(new_password)
-                    updates.append("password")
-                
-                if updates:
-                    users[i] = user
-                    data["users"] = users
-                    self._save_users(data)
-                    updated_fields = " and ".join(updates)
-                    return True, f"Successfully updated {updated_fields} for '{username}'"
-                else:
-                    return False, "No changes provided"
-        
-        if not user_found:
-            return False, f"User '{username}' not found"
-        
-        return False, "Update failed"
+        return self._shard(username).update_user_details(username, new_email, new_password)
     
     def mark_game_completed_permanently(self, username: str) -> bool:
         """Mark game as completed permanently to prevent replay"""
-        data = self._load_users()
-        users = data.get("users", [])
-        
-        for i, user in enumerate(users):
-            if user["username"].lower() == username.lower():
-                user["game_completed_permanently"] = True
-                users[i] = user
-                data["users"] = users
-                self._save_users(data)
-                return True
-        return False
+        return self._shard(username).mark_game_completed_permanently(username)
+
+
+def _import_roster_cli(args: List[str]):
+    """python auth_manager.py import-roster ROSTER [--users-file F] [--workers N]"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="auth_manager.py import-roster",
+                                     description="Create accounts from a CSV or JSON roster")
+    parser.add_argument("roster", help="CSV (username,password,email) or JSON roster file")
+    parser.add_argument("--users-file", default="users.json", help="User store to import into")
+    parser.add_argument("--format", choices=["csv", "json"], help="Roster format (default: from extension)")
+    parser.add_argument("--workers", type=int, help="Password hashing processes (default: CPU count)")
+    options = parser.parse_args(args)
+    
+    print(f"Importing {options.roster} into {options.users_file}...")
+    report = JSONAuthManager(options.users_file).import_roster(options.roster, options.format, options.workers)
+    print(f"   Created: {report['created']} of {report['total']} users")
+    for username, message in report["failed"]:
+        print(f"   ❌ {username or '(blank)'}: {message}")
+    print(f"   Throughput: {report['users_per_sec']:,.0f} users/sec ({report['seconds']:.2f}s)")
+    print("\n✅ Import complete!")
+
+
+def _snapshot_store(users_file: str, split_progress: Optional[bool]) -> JSONAuthManager:
+    """The store a snapshot command works on, split like the files on disk unless told"""
+    if split_progress is None:
+        split_progress = os.path.exists(os.path.splitext(users_file)[0] + "_progress.json")
+    return JSONAuthManager(users_file, journal=True, split_progress=split_progress)
+
+
+def _upgrade_schema_cli(args: List[str]):
+    """python auth_manager.py upgrade-schema [--users-file F] [--split-progress]"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="auth_manager.py upgrade-schema",
+                                     description=f"Upgrade every record to schema {SCHEMA_VERSION} (stop the apps first)")
+    parser.add_argument("--users-file", default="users.json", help="User store to upgrade")
+    parser.add_argument("--split-progress", action="store_true", default=None,
+                        help="The store keeps progress apart (default: if its progress file exists)")
+    options = parser.parse_args(args)
+    
+    print(f"Upgrading {options.users_file} to schema {SCHEMA_VERSION}...")
+    report = _snapshot_store(options.users_file, options.split_progress).upgrade_schema()
+    print(f"   Users upgraded: {report['upgraded']:,} of {report['users']:,}")
+    if report["progress_upgraded"]:
+        print(f"   Progress records upgraded: {report['progress_upgraded']:,}")
+    print(f"   Took {report['seconds']:.2f}s")
+    print("\n✅ Upgrade complete!")
+
+
+def _archive_accounts_cli(args: List[str]):
+    """python auth_manager.py archive-accounts [--users-file F] [--inactive-days N]"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="auth_manager.py archive-accounts",
+                                     description="Move disabled and long-inactive accounts to the archive")
+    parser.add_argument("--users-file", default="users.json", help="User store to archive from")
+    parser.add_argument("--inactive-days", type=int, default=ARCHIVE_INACTIVE_DAYS,
+                        help="Days without a login before an account is archived")
+    parser.add_argument("--split-progress", action="store_true", default=None,
+                        help="The store keeps progress apart (default: if its progress file exists)")
+    options = parser.parse_args(args)
+    
+    print(f"Archiving accounts of {options.users_file} inactive for {options.inactive_days} days...")
+    report = _snapshot_store(options.users_file, options.split_progress).archive_accounts(options.inactive_days)
+    print(f"   Accounts archived: {report['archived']:,}")
+    print(f"   Hot files: {report['hot_bytes_before'] / 1e6:,.2f} MB -> {report['hot_bytes_after'] / 1e6:,.2f} MB")
+    print(f"   Archive: {report['archive_bytes'] / 1e6:,.2f} MB ({report['seconds']:.2f}s)")
+    print("\n✅ Archival complete!")
+
+
+def _export_snapshot_cli(args: List[str]):
+    """python auth_manager.py export-snapshot BACKUP [--users-file F] [--gzip]"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="auth_manager.py export-snapshot",
+                                     description="Back up the user store to an NDJSON file")
+    parser.add_argument("backup", help="NDJSON file to write (gzipped when it ends in .gz)")
+    parser.add_argument("--users-file", default="users.json", help="User store to back up")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Compress whatever the file name")
+    parser.add_argument("--split-progress", action="store_true", default=None,
+                        help="The store keeps progress apart (default: if its progress file exists)")
+    options = parser.parse_args(args)
+    
+    print(f"Exporting {options.users_file} to {options.backup}...")
+    report = _snapshot_store(options.users_file, options.split_progress).export_snapshot(options.backup, options.gzip)
+    print(f"   Users: {report['users']:,}")
+    print(f"   Size: {report['bytes'] / 1e6:,.1f} MB NDJSON, {report['file_bytes'] / 1e6:,.1f} MB on disk")
+    print(f"   Throughput: {report['mb_per_sec']:,.1f} MB/s ({report['seconds']:.2f}s)")
+    print("\n✅ Export complete!")
+
+
+def _import_snapshot_cli(args: List[str]):
+    """python auth_manager.py import-snapshot BACKUP [--users-file F] [--chunk-size N] [--skip-existing]"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="auth_manager.py import-snapshot",
+                                     description="Load users from an NDJSON backup (gzipped or not)")
+    parser.add_argument("backup", help="NDJSON file written by export-snapshot")
+    parser.add_argument("--users-file", default="users.json", help="User store to load into")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Users per write")
+    parser.add_argument("--skip-existing", action="store_true", help="Keep stored users instead of replacing them")
+    parser.add_argument("--split-progress", action="store_true", default=None,
+                        help="The store keeps progress apart (default: if its progress file exists)")
+    options = parser.parse_args(args)
+    
+    print(f"Importing {options.backup} into {options.users_file}...")
+    store = _snapshot_store(options.users_file, options.split_progress)
+    report = store.import_snapshot(options.backup, options.chunk_size, options.skip_existing)
+    print(f"   Added: {report['added']:,}  Replaced: {report['replaced']:,}  Skipped: {report['skipped']:,}")
+    for line, message in report["failed"]:
+        print(f"   ❌ Line {line}: {message}")
+    print(f"   Throughput: {report['users_per_sec']:,.0f} users/sec ({report['seconds']:.2f}s)")
+    print("\n✅ Import complete!")
 
 
-# Test the module if run directly
+# Test the module if run directly (or run a maintenance command)
 if __name__ == "__main__":
+    import sys
+    
+    commands = {
+        "import-roster": _import_roster_cli,
+        "export-snapshot": _export_snapshot_cli,
+        "import-snapshot": _import_snapshot_cli,
+        "upgrade-schema": _upgrade_schema_cli,
+        "archive-accounts": _archive_accounts_cli
+    }
+    if len(sys.argv) > 1:
+        if sys.argv[1] not in commands:
+            sys.exit(f"Unknown command '{sys.argv[1]}' (available: {', '.join(commands)})")
+        commands[sys.argv[1]](sys.argv[2:])
+        sys.exit(0)
+    
     print("Testing JSON Auth Manager...")
     
     auth = JSONAuthManager()
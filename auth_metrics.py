@@ -0,0 +1,327 @@
+"""
+Operation metrics for the auth store
+A small in-process registry of latency histograms, counters and gauges,
+exposed as a snapshot dict or as Prometheus text written to a file.
+
+Stores only report into a registry they were given, so with metrics off
+the cost is one attribute check on the file paths and nothing at all on
+the public methods, which are wrapped per instance by instrument().
+"""
+
+import atexit
+import bisect
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Environment variable naming the file the apps dump their metrics to
+METRICS_ENV = "AUTH_METRICS_FILE"
+DEFAULT_METRICS_FILE = "auth_metrics.prom"
+
+# Seconds between dumps of a registry started with start_dumping()
+DUMP_INTERVAL = 15.0
+
+# Histogram bucket upper bounds in seconds: 1 µs to ~95 s, two per doubling
+LATENCY_BUCKETS = tuple(round(1e-6 * 2 ** (i / 2), 9) for i in range(54))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metric families: name -> (type, label name, help text)
+FAMILIES = {
+    "auth_store_operation_seconds": ("histogram", "operation", "Latency of public store methods"),
+    "auth_store_parse_seconds": ("histogram", "file", "Time spent parsing store files"),
+    "auth_store_serialize_seconds": ("histogram", "file", "Time spent serializing store files"),
+    "auth_store_lock_wait_seconds": ("histogram", "mode", "Time spent waiting for the cross-process file lock"),
+    "auth_store_bytes_read_total": ("counter", "file", "Bytes read from store files"),
+    "auth_store_bytes_written_total": ("counter", "file", "Bytes written to store files"),
+    "auth_store_records_read_total": ("counter", "file", "Records parsed from store files"),
+    "auth_store_records_written_total": ("counter", "file", "Records written to store files"),
+    "auth_store_records": ("gauge", "file", "Records held by a store after its last load"),
+}
+
+
+class Histogram:
+    """Counts of observations per LATENCY_BUCKETS bucket, plus their sum"""
+    
+    __slots__ = ("counts", "total", "count")
+    
+    def __init__(self):
+        # One count per bucket plus the +Inf overflow
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """Record one observation"""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations at or below it) per bucket, +Inf last"""
+        result = []
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+def quantile(q: float, buckets: List[Tuple[float, int]]) -> float:
+    """
+    Estimate a quantile from cumulative (upper bound, count) buckets
+    
+    Interpolates linearly inside the bucket the quantile falls in, as
+    Prometheus' histogram_quantile() does.
+    """
+    if not buckets or buckets[-1][1] == 0:
+        return 0.0
+    rank = q * buckets[-1][1]
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                # Past the last finite bucket: its bound is the best estimate
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def _summary(buckets: List[Tuple[float, int]], total: float) -> Dict:
+    """Snapshot entry for one histogram"""
+    count = buckets[-1][1] if buckets else 0
+    entry = {"count": count, "sum": total, "mean": total / count if count else 0.0}
+    for q in QUANTILES:
+        entry[f"p{round(q * 100)}"] = quantile(q, buckets)
+    entry["buckets"] = [[bound, running] for bound, running in buckets]
+    return entry
+
+
+class MetricsRegistry:
+    """Thread-safe in-process metrics, keyed by (family, label value)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._values: Dict[Tuple[str, str], float] = {}
+        self._dump_timer = None
+    
+    def observe(self, family: str, label: str, seconds: float):
+        """Add one observation to a histogram family"""
+        with self._lock:
+            histogram = self._histograms.get((family, label))
+            if histogram is None:
+                histogram = self._histograms[(family, label)] = Histogram()
+            histogram.observe(seconds)
+    
+    def inc(self, family: str, label: str, amount: float = 1):
+        """Add to a counter family"""
+        with self._lock:
+            self._values[(family, label)] = self._values.get((family, label), 0) + amount
+    
+    def set(self, family: str, label: str, value: float):
+        """Set a gauge family"""
+        with self._lock:
+            self._values[(family, label)] = value
+    
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._histograms = {}
+            self._values = {}
+    
+    def snapshot(self) -> Dict:
+        """
+        Everything recorded so far as plain data
+        
+        Returns:
+            {family: {label: value}} for counters and gauges, and
+            {family: {label: {count, sum, mean, p50, p95, p99, buckets}}}
+            for histograms, where buckets are cumulative [bound, count] pairs
+        """
+        with self._lock:
+            histograms = [(key, histogram.cumulative(), histogram.total)
+                          for key, histogram in self._histograms.items()]
+            values = dict(self._values)
+        
+        result: Dict[str, Dict] = {}
+        for (family, label), buckets, total in histograms:
+            result.setdefault(family, {})[label] = _summary(buckets, total)
+        for (family, label), value in values.items():
+            result.setdefault(family, {})[label] = value
+        return result
+    
+    def to_prometheus(self) -> str:
+        """Everything recorded so far in the Prometheus text exposition format"""
+        return snapshot_to_prometheus(self.snapshot())
+    
+    def write_prometheus(self, path: str):
+        """Write the Prometheus text to a file, replacing it atomically"""
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_file, path)
+    
+    def start_dumping(self, path: str, interval: float = DUMP_INTERVAL):
+        """Write the Prometheus text to path every interval seconds, and at exit"""
+        def dump():
+            try:
+                self.write_prometheus(path)
+            except OSError:
+                pass
+            self._dump_timer = threading.Timer(interval, dump)
+            self._dump_timer.daemon = True
+            self._dump_timer.start()
+        
+        if self._dump_timer is None:
+            atexit.register(self.write_prometheus, path)
+            dump()
+
+
+def _label(value: str) -> str:
+    """A label value escaped for Prometheus text"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def snapshot_to_prometheus(snapshot: Dict) -> str:
+    """Prometheus text exposition for a snapshot() dict"""
+    lines = []
+    for family, series in sorted(snapshot.items()):
+        kind, label_name, help_text = FAMILIES.get(family, ("untyped", "label", family))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for label, value in sorted(series.items()):
+            label_text = f'{label_name}="{_label(label)}"'
+            if kind != "histogram":
+                lines.append(f"{family}{{{label_text}}} {value}")
+                continue
+            for bound, running in value["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{family}_bucket{{{label_text},le="{le}"}} {running}')
+            lines.append(f"{family}_sum{{{label_text}}} {value['sum']}")
+            lines.append(f"{family}_count{{{label_text}}} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+_SAMPLE = re.compile(r'^(\w+?)(_bucket|_sum|_count)?\{(\w+)="((?:[^"\\]|\\.)*)"(?:,le="([^"]+)")?\} (\S+)$')
+
+
+def load_prometheus(path: str) -> Dict:
+    """
+    Read a file written by write_prometheus back into a snapshot() dict
+    
+    For showing the metrics another process dumped (the game's, the
+    daemon's) in this one.
+    """
+    histograms: Dict[Tuple[str, str], Dict] = {}
+    result: Dict[str, Dict] = {}
+    with open(path, 'r') as f:
+        for line in f:
+            match = _SAMPLE.match(line.strip())
+            if not match:
+                continue
+            family, suffix, _, label, le, value = match.groups()
+            label = re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), label)
+            if suffix and FAMILIES.get(family, ("",))[0] == "histogram":
+                series = histograms.setdefault((family, label), {"buckets": [], "sum": 0.0})
+                if suffix == "_bucket":
+                    series["buckets"].append((float(le), int(float(value))))
+                elif suffix == "_sum":
+                    series["sum"] = float(value)
+            elif not suffix:
+                result.setdefault(family, {})[label] = float(value)
+    
+    for (family, label), series in histograms.items():
+        result.setdefault(family, {})[label] = _summary(sorted(series["buckets"]), series["sum"])
+    return result
+
+
+_env_registries: Dict[str, MetricsRegistry] = {}
+_env_lock = threading.Lock()
+
+
+def metrics_from_env() -> Optional[MetricsRegistry]:
+    """
+    The process' registry dumping to $AUTH_METRICS_FILE, or None (metrics off)
+    
+    Every store opened in the process shares it, so the file holds them all.
+    """
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return None
+    with _env_lock:
+        if path not in _env_registries:
+            _env_registries[path] = MetricsRegistry()
+            _env_registries[path].start_dumping(path)
+        return _env_registries[path]
+
+
+class _CallDepth(threading.local):
+    """How many timed calls the current thread is inside of"""
+    depth = 0
+
+
+_calls = _CallDepth()
+
+
+def instrument(obj, registry: MetricsRegistry, family: str = "auth_store_operation_seconds"):
+    """
+    Time every public method of obj into a histogram labelled with its name
+    
+    The wrappers are set on the instance, so other instances of the class
+    (and this one, without a registry) keep calling the plain methods.
+    Generator methods are timed over the whole iteration. Only the
+    outermost public call of a thread is timed: one made from inside
+    another (create_user_admin calling register_user, a bulk operation
+    calling single-user ones) is part of the caller's time, not its own.
+    """
+    for name, method in inspect.getmembers(type(obj), callable):
+        if name.startswith("_") or inspect.isclass(method):
+            continue
+        setattr(obj, name, _timed(getattr(obj, name), registry, family, name,
+                                  inspect.isgeneratorfunction(method)))
+
+
+def _timed(method, registry: MetricsRegistry, family: str, name: str, generator: bool):
+    """A bound method wrapped to record its latency (when not called from another timed call)"""
+    if generator:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _calls.depth:
+                return (yield from method(*args, **kwargs))
+            start = time.perf_counter()
+            iterator = method(*args, **kwargs)
+            try:
+                while True:
+                    # Nested only while the generator runs, not between items
+                    _calls.depth += 1
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        _calls.depth -= 1
+                    yield item
+            finally:
+                iterator.close()
+                registry.observe(family, name, time.perf_counter() - start)
+    else:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _calls.depth:
+                return method(*args, **kwargs)
+            start = time.perf_counter()
+            _calls.depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _calls.depth -= 1
+                registry.observe(family, name, time.perf_counter() - start)
+    return wrapper
@@ -0,0 +1,184 @@
+"""
+In-memory record types for the auth store
+Users and their saved progress are held as __slots__ objects instead of
+dicts, and handed out as read-only views instead of per-call copies.
+Plain dicts only exist at the JSON boundary (files, log entries) and
+for callers that ask for a copy of their own (RecordView.to_dict).
+"""
+
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterable, Optional
+
+
+class SlotRecord(MutableMapping):
+    """
+    A dict-like record whose known fields live in __slots__
+    
+    A field that was never set (or was deleted) is absent, like a missing
+    dict key. Fields outside FIELDS go to a small overflow dict, so records
+    read from older or newer files round-trip unchanged.
+    """
+    
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    _field_set = frozenset()
+    # Field -> record type used for nested dicts stored in that field
+    NESTED: Dict[str, type] = {}
+    
+    def __init__(self, data: Optional[Mapping] = None):
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+    
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            nested = self.NESTED.get(key)
+            if nested is not None and isinstance(value, Mapping) and not isinstance(value, nested):
+                value = nested(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+        else:
+            raise KeyError(key)
+    
+    def __contains__(self, key) -> bool:
+        if key in self._field_set:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+    
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self._extra is not None:
+            yield from list(self._extra)
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __bool__(self) -> bool:
+        # Stops at the first field instead of counting them all
+        for _ in self:
+            return True
+        return False
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+    
+    def clear(self):
+        """Remove every field"""
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                delattr(self, field)
+        self._extra = None
+    
+    def to_dict(self) -> Dict:
+        """Plain dict copy for the JSON boundary (nested records included)"""
+        return {key: to_plain(value) for key, value in self.items()}
+    
+    def view(self, hidden: Iterable[str] = (), overrides: Optional[Dict] = None) -> "RecordView":
+        """Read-only view of this record"""
+        return RecordView(self, hidden, overrides)
+
+
+class ProgressRecord(SlotRecord):
+    """A user's saved game progress"""
+    
+    FIELDS = ("level", "score", "hints_used", "achievements", "streak", "max_streak",
+              "combo_multiplier", "perfect_levels", "wrong_attempts", "saved_at")
+    __slots__ = FIELDS
+    _field_set = frozenset(FIELDS)
+
+
+class UserRecord(SlotRecord):
+    """A user account as stored in users.json"""
+    
+    FIELDS = ("username", "password", "email", "created_at", "last_login",
+              "total_games", "high_score", "is_active", "game_completed_permanently",
+              "saved_progress", "version", "schema")
+    NESTED = {"saved_progress": ProgressRecord}
+    __slots__ = FIELDS
+    _field_set = frozenset(FIELDS)
+
+
+class RecordView(Mapping):
+    """
+    Live, read-only view of a record
+    
+    Hidden fields (the password) are left out and overrides take the place
+    of the record's own value for a field. Nested records come back as
+    views too; lists inside a record are the record's own, not copies.
+    """
+    
+    __slots__ = ("_record", "_hidden", "_overrides")
+    
+    def __init__(self, record: SlotRecord, hidden: Iterable[str] = (), overrides: Optional[Dict] = None):
+        self._record = record
+        self._hidden = hidden
+        self._overrides = overrides
+    
+    def __getitem__(self, key):
+        if key in self._hidden:
+            raise KeyError(key)
+        if self._overrides is not None and key in self._overrides:
+            value = self._overrides[key]
+        else:
+            value = self._record[key]
+        return value.view() if isinstance(value, SlotRecord) else value
+    
+    def __iter__(self):
+        for key in self._record:
+            if key not in self._hidden and (self._overrides is None or key not in self._overrides):
+                yield key
+        if self._overrides is not None:
+            yield from self._overrides
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __bool__(self) -> bool:
+        # Stops at the first field instead of counting them all
+        for _ in self:
+            return True
+        return False
+    
+    def __repr__(self) -> str:
+        return f"RecordView({self.to_dict()!r})"
+    
+    def to_dict(self) -> Dict:
+        """Plain dict copy of what the view shows"""
+        return {key: to_plain(value) for key, value in self.items()}
+
+
+def to_plain(value):
+    """A plain dict for a record or view, a copy of a list; any other value as it is"""
+    if isinstance(value, (SlotRecord, RecordView)):
+        return value.to_dict()
+    if isinstance(value, list):
+        # Lists stay with the record; the copy must not share them
+        return [to_plain(item) for item in value]
+    return value
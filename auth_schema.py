@@ -0,0 +1,93 @@
+"""
+Record schema versions for the auth store
+Each record carries the schema version it was written with ("schema",
+missing on records from before versions existed, which count as 1).
+Older records are brought up to SCHEMA_VERSION by the upgrade functions
+below, one step per version, so readers can rely on every field being set.
+"""
+
+from collections.abc import Mapping
+from typing import Callable, Dict, List
+
+SCHEMA_VERSION = 2
+
+# Fields every user record has from schema 2 on, with the value an older
+# record is given
+USER_DEFAULTS = {
+    "email": "",
+    "last_login": None,
+    "total_games": 0,
+    "high_score": 0,
+    "is_active": True,
+    "game_completed_permanently": False,
+}
+
+# Keys every saved_progress has from schema 2 on
+PROGRESS_DEFAULTS = {
+    "level": 0,
+    "score": 0,
+    "hints_used": 0,
+    "achievements": [],
+    "streak": 0,
+    "max_streak": 0,
+    "combo_multiplier": 1.0,
+    "perfect_levels": 0,
+    "wrong_attempts": 0,
+}
+
+
+def _fill(record, defaults: Dict) -> bool:
+    """Set the missing fields of a record to (copies of) their defaults; True if any was"""
+    changed = False
+    for field, value in defaults.items():
+        if field not in record:
+            record[field] = list(value) if isinstance(value, list) else value
+            changed = True
+    return changed
+
+
+def _progress_v1(record) -> List[str]:
+    """Schema 1 -> 2 for saved_progress: fill in the keys added over time"""
+    progress = record.get("saved_progress")
+    if isinstance(progress, Mapping) and progress and _fill(progress, PROGRESS_DEFAULTS):
+        return ["saved_progress"]
+    return []
+
+
+def _user_v1(record) -> List[str]:
+    """Schema 1 -> 2 for a user: account fields plus its saved_progress"""
+    changed = [field for field in USER_DEFAULTS if field not in record]
+    _fill(record, USER_DEFAULTS)
+    return changed + _progress_v1(record)
+
+
+# Upgrade steps by the version they upgrade from; each changes the record
+# in place and returns the fields it changed
+USER_UPGRADES: Dict[int, Callable] = {1: _user_v1}
+
+# Records of a split-off progress store hold only a username and saved_progress
+PROGRESS_UPGRADES: Dict[int, Callable] = {1: _progress_v1}
+
+
+def _upgrade(record, steps: Dict[int, Callable]) -> List[str]:
+    """Run the upgrade steps a record is missing; the fields changed (none if current)"""
+    schema = record.get("schema", 1)
+    if schema >= SCHEMA_VERSION:
+        return []
+    changed = set()
+    while schema < SCHEMA_VERSION:
+        changed.update(steps[schema](record))
+        schema += 1
+    record["schema"] = SCHEMA_VERSION
+    changed.add("schema")
+    return sorted(changed)
+
+
+def upgrade_user(record) -> List[str]:
+    """Bring a user record up to SCHEMA_VERSION in place; returns the fields changed"""
+    return _upgrade(record, USER_UPGRADES)
+
+
+def upgrade_progress_record(record) -> List[str]:
+    """Bring a progress store record up to SCHEMA_VERSION in place; returns the fields changed"""
+    return _upgrade(record, PROGRESS_UPGRADES)
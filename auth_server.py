@@ -0,0 +1,467 @@
+"""
+Auth store daemon
+A single process owns the user store in memory and serves the
+JSONAuthManager operations over a Unix domain socket, so the game and the
+admin dashboard (however many Streamlit processes they run in) no longer
+open users.json themselves.
+
+Run the daemon:  python auth_server.py [--socket auth_store.sock] [--users-file users.json]
+Point the apps at it by setting AUTH_STORE_SOCKET to the socket path.
+
+Protocol: every message is a 4-byte big-endian length and a compact JSON
+array. A request is [operation number, args, kwargs]; a reply is
+[0, result] or [1, error type, message].
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from auth_manager import (ARCHIVE_INACTIVE_DAYS, IMPORT_CHUNK_SIZE, ITER_BATCH_SIZE, LOGIN_STALENESS_MS,
+                          JSONAuthManager)
+from auth_metrics import METRICS_ENV, MetricsRegistry, metrics_from_env
+from auth_records import RecordView, SlotRecord
+
+# orjson when installed: the same bytes on the wire, encoded a lot faster
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Windows builds of Python have no AF_UNIX: there the apps open the files directly
+try:
+    _UnixStreamServer = socketserver.UnixStreamServer
+    UNIX_SOCKETS_AVAILABLE = True
+except AttributeError:
+    _UnixStreamServer = socketserver.TCPServer
+    UNIX_SOCKETS_AVAILABLE = False
+
+# Environment variable that switches the apps over to the daemon
+SOCKET_ENV = "AUTH_STORE_SOCKET"
+DEFAULT_SOCKET = "auth_store.sock"
+
+# Operations by wire number; new ones go at the end to keep the numbers stable
+OPERATIONS = (
+    "register_user", "login_user", "update_user_stats", "save_progress",
+    "load_progress", "clear_progress", "get_all_users", "cursor_for",
+    "iter_page", "count_users", "get_leaderboard", "user_exists",
+    "disable_user", "activate_user", "delete_user", "create_user_admin",
+    "get_user_status", "get_user_details", "update_user_email",
+    "update_user_password", "update_user_details", "mark_game_completed_permanently",
+    "bulk_create", "bulk_disable", "bulk_activate", "bulk_delete",
+    "bulk_update_stats", "import_roster", "flush", "compact",
+    "is_username_available", "search_users", "export_snapshot", "import_snapshot",
+    "archive_accounts", "archive_status", "search_archived", "restore_users",
+)
+OPERATION_NUMBERS = {name: number for number, name in enumerate(OPERATIONS)}
+
+_HEADER = struct.Struct(">I")
+
+# Error types re-raised as themselves by the client
+_ERRORS = {"ValueError": ValueError, "KeyError": KeyError, "TypeError": TypeError}
+
+
+class AuthStoreError(RuntimeError):
+    """The store daemon failed a request or could not be reached"""
+
+
+def _plain(value):
+    """JSON fallback for records and views handed out by the store"""
+    if isinstance(value, (SlotRecord, RecordView)):
+        return value.to_dict()
+    raise TypeError(f"Cannot send {type(value).__name__} to the store daemon")
+
+
+def _encode(message) -> bytes:
+    """One framed message"""
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(message, default=_plain)
+    else:
+        payload = json.dumps(message, separators=(",", ":"), default=_plain).encode()
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _read_message(f):
+    """Next framed message from a buffered socket file (None once it is closed)"""
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    payload = f.read(_HEADER.unpack(header)[0])
+    return orjson.loads(payload) if ORJSON_AVAILABLE else json.loads(payload)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection until it closes"""
+    
+    def handle(self):
+        while True:
+            request = _read_message(self.rfile)
+            if request is None:
+                return
+            self.wfile.write(_encode(self.server.dispatch(*request)))
+            self.wfile.flush()
+
+
+class AuthStoreServer(socketserver.ThreadingMixIn, _UnixStreamServer):
+    """Owns one JSONAuthManager and serves its operations over a Unix socket"""
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str, store: JSONAuthManager):
+        """
+        Args:
+            socket_path: Where to listen; a stale socket file is replaced
+            store: The store to serve, opened with single_writer=True
+        """
+        self.socket_path = socket_path
+        self.store = store
+        if os.path.exists(socket_path):
+            _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+    
+    def dispatch(self, number: int, args: list, kwargs: Dict) -> list:
+        """Run one operation and build its reply"""
+        try:
+            name = OPERATIONS[number]
+            handler = getattr(self, "_op_" + name, None) or getattr(self.store, name)
+            return [0, handler(*args, **kwargs)]
+        except Exception as e:
+            return [1, type(e).__name__, str(e)]
+    
+    def _op_iter_page(self, sort_by: str, descending: bool, after: Optional[list],
+                      limit: int, status: Optional[str]) -> list:
+        """One page of iter_users plus the cursor to continue after it"""
+        page = list(self.store.iter_users(sort_by, descending, after, limit, status))
+        return [page, self.store.cursor_for(page[-1], sort_by) if page else None]
+    
+    def _op_import_roster(self, rows: List[Dict], workers: Optional[int] = None) -> Dict:
+        """import_roster for rows the client already read from its file"""
+        return self.store.import_roster(io.StringIO(json.dumps(rows)), "json", workers)
+    
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str):
+    """Remove a socket file left behind by a daemon that is no longer running"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+    else:
+        raise AuthStoreError(f"A store daemon is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+
+class AuthStoreClient:
+    """
+    The JSONAuthManager interface, served by the store daemon
+    
+    Records come back as plain dicts. Connections are pooled, so threads
+    (Streamlit sessions) share a few sockets instead of opening one per call.
+    """
+    
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 30.0):
+        """
+        Args:
+            socket_path: The daemon's Unix socket
+            timeout: Seconds to wait for a reply
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: List[Tuple[socket.socket, io.BufferedReader]] = []
+        self._pool_lock = threading.Lock()
+    
+    def _connect(self) -> Tuple[socket.socket, io.BufferedReader]:
+        """A pooled connection, or a new one"""
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise AuthStoreError(f"Cannot reach the store daemon at {self.socket_path}: {e}") from e
+        return sock, sock.makefile('rb')
+    
+    def _call(self, name: str, *args, **kwargs):
+        """Send one request and return its result"""
+        connection = self._connect()
+        sock, reader = connection
+        try:
+            sock.sendall(_encode([OPERATION_NUMBERS[name], args, kwargs]))
+            reply = _read_message(reader)
+        except OSError as e:
+            sock.close()
+            # The other pooled connections most likely went with it
+            self.close()
+            raise AuthStoreError(f"Lost the connection to the store daemon: {e}") from e
+        if reply is None:
+            sock.close()
+            self.close()
+            raise AuthStoreError("The store daemon closed the connection")
+        
+        with self._pool_lock:
+            self._pool.append(connection)
+        if reply[0] != 0:
+            raise _ERRORS.get(reply[1], AuthStoreError)(reply[2])
+        return reply[1]
+    
+    def close(self):
+        """Close the pooled connections"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for sock, reader in pool:
+            reader.close()
+            sock.close()
+    
+    def register_user(self, username: str, password: str, email: str = "") -> Tuple[bool, str, Optional[Dict]]:
+        """Register a new user"""
+        return tuple(self._call("register_user", username, password, email))
+    
+    def login_user(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
+        """Authenticate user login"""
+        return tuple(self._call("login_user", username, password))
+    
+    def update_user_stats(self, username: str, score: int):
+        """Update user statistics after game completion"""
+        return self._call("update_user_stats", username, score)
+    
+    def save_progress(self, username: str, *args, **kwargs) -> bool:
+        """Save user's game progress with all stats"""
+        return self._call("save_progress", username, *args, **kwargs)
+    
+    def load_progress(self, username: str) -> Optional[Dict]:
+        """Load user's saved game progress"""
+        return self._call("load_progress", username)
+    
+    def clear_progress(self, username: str) -> bool:
+        """Clear user's saved game progress"""
+        return self._call("clear_progress", username)
+    
+    def iter_all_users(self):
+        """Yield all users (without passwords), a page at a time"""
+        return self.iter_users()
+    
+    def get_all_users(self) -> list:
+        """Get all users (without passwords)"""
+        return self._call("get_all_users")
+    
+    def cursor_for(self, user: Dict, sort_by: str = "username") -> Tuple:
+        """Cursor to pass as iter_users(after=...) to continue after this user"""
+        return tuple(self._call("cursor_for", user, sort_by))
+    
+    def iter_users(self, sort_by: str = "username", descending: bool = False,
+                   after: Optional[Tuple] = None, limit: Optional[int] = None,
+                   status: Optional[str] = None):
+        """Yield users (without passwords) in a maintained sort order"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = ITER_BATCH_SIZE if remaining is None else min(remaining, ITER_BATCH_SIZE)
+            page, after = self._call("iter_page", sort_by, descending, after, size, status)
+            yield from page
+            if len(page) < size:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+    
+    def count_users(self, status: Optional[str] = None) -> int:
+        """Number of users, optionally only "active" or only "disabled" ones"""
+        return self._call("count_users", status)
+    
+    def search_users(self, query: str, limit: int = 50) -> List[Dict]:
+        """Find users (without passwords) by part of their username or email"""
+        return self._call("search_users", query, limit)
+    
+    def get_leaderboard(self, metric: str = "high_score", k: int = 10) -> List[Dict]:
+        """Top k players by one of LEADERBOARD_METRICS"""
+        return self._call("get_leaderboard", metric, k)
+    
+    def user_exists(self, username: str) -> bool:
+        """Check if a user exists"""
+        return self._call("user_exists", username)
+    
+    def is_username_available(self, username: str) -> bool:
+        """Whether a username is still free, answered from the daemon's memory"""
+        return self._call("is_username_available", username)
+    
+    def disable_user(self, username: str) -> Tuple[bool, str]:
+        """Disable a user account"""
+        return tuple(self._call("disable_user", username))
+    
+    def activate_user(self, username: str) -> Tuple[bool, str]:
+        """Activate a user account"""
+        return tuple(self._call("activate_user", username))
+    
+    def delete_user(self, username: str) -> Tuple[bool, str]:
+        """Permanently delete a user account"""
+        return tuple(self._call("delete_user", username))
+    
+    def create_user_admin(self, username: str, password: str, email: str = "") -> Tuple[bool, str]:
+        """Create a new user account (admin function)"""
+        return tuple(self._call("create_user_admin", username, password, email))
+    
+    def get_user_status(self, username: str) -> Optional[Dict]:
+        """Get user account status"""
+        return self._call("get_user_status", username)
+    
+    def get_user_details(self, username: str) -> Optional[Dict]:
+        """Get complete user details for editing"""
+        return self._call("get_user_details", username)
+    
+    def update_user_email(self, username: str, new_email: str) -> Tuple[bool, str]:
+        """Update user's email address"""
+        return tuple(self._call("update_user_email", username, new_email))
+    
+    def update_user_password(self, username: str, new_password: str) -> Tuple[bool, str]:
+        """Update user's password"""
+        return tuple(self._call("update_user_password", username, new_password))
+    
+    def update_user_details(self, username: str, new_email: str = None, new_password: str = None) -> Tuple[bool, str]:
+        """Update user's email and/or password"""
+        return tuple(self._call("update_user_details", username, new_email, new_password))
+    
+    def mark_game_completed_permanently(self, username: str) -> bool:
+        """Mark game as completed permanently to prevent replay"""
+        return self._call("mark_game_completed_permanently", username)
+    
+    def bulk_create(self, accounts: List[Dict]) -> List[Tuple[bool, str]]:
+        """Create many user accounts at once (admin function)"""
+        return [tuple(result) for result in self._call("bulk_create", accounts)]
+    
+    def bulk_disable(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Disable many user accounts"""
+        return [tuple(result) for result in self._call("bulk_disable", usernames)]
+    
+    def bulk_activate(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Activate many user accounts"""
+        return [tuple(result) for result in self._call("bulk_activate", usernames)]
+    
+    def bulk_delete(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Permanently delete many user accounts"""
+        return [tuple(result) for result in self._call("bulk_delete", usernames)]
+    
+    def bulk_update_stats(self, results: List[Tuple[str, int]]) -> List[bool]:
+        """Record many finished games at once"""
+        return self._call("bulk_update_stats", results)
+    
+    def import_roster(self, source, fmt: Optional[str] = None, workers: Optional[int] = None) -> Dict:
+        """Create accounts for an event roster (read here, created by the daemon)"""
+        report = self._call("import_roster", JSONAuthManager._read_roster(source, fmt), workers)
+        report["failed"] = [tuple(failure) for failure in report["failed"]]
+        return report
+    
+    def export_snapshot(self, path: str, compress: Optional[bool] = None) -> Dict:
+        """Have the daemon back up the store to an NDJSON file (path as seen from here)"""
+        return self._call("export_snapshot", os.path.abspath(path), compress)
+    
+    def import_snapshot(self, path: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                        skip_existing: bool = False) -> Dict:
+        """Have the daemon load users from an NDJSON backup (path as seen from here)"""
+        report = self._call("import_snapshot", os.path.abspath(path), chunk_size, skip_existing)
+        report["failed"] = [tuple(failure) for failure in report["failed"]]
+        return report
+    
+    def archive_accounts(self, inactive_days: int = ARCHIVE_INACTIVE_DAYS) -> Dict:
+        """Have the daemon move disabled and long-inactive accounts to the archive"""
+        return self._call("archive_accounts", inactive_days)
+    
+    def archive_status(self) -> Dict:
+        """Archived account count and file sizes, from the daemon"""
+        return self._call("archive_status")
+    
+    def search_archived(self, query: str = "", limit: int = 50) -> List[str]:
+        """Usernames of archived accounts containing a query"""
+        return self._call("search_archived", query, limit)
+    
+    def restore_users(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Have the daemon bring archived accounts back into the hot store"""
+        return [tuple(result) for result in self._call("restore_users", usernames)]
+    
+    def flush(self):
+        """Have the daemon write its buffered changes now"""
+        return self._call("flush")
+    
+    def compact(self):
+        """Have the daemon fold its mutation log into the snapshot"""
+        return self._call("compact")
+
+
+def open_auth_store(json_file: str = "users.json", **options):
+    """
+    The user store an app should use
+    
+    A client of the store daemon when AUTH_STORE_SOCKET is set (the daemon
+    has its own options), else a JSONAuthManager opened on the file directly,
+    reporting metrics when AUTH_METRICS_FILE is set (unless metrics is given).
+    """
+    socket_path = os.environ.get(SOCKET_ENV)
+    if socket_path:
+        if not UNIX_SOCKETS_AVAILABLE:
+            raise AuthStoreError(f"{SOCKET_ENV} is set, but this Python has no Unix domain sockets")
+        return AuthStoreClient(socket_path)
+    options.setdefault("metrics", metrics_from_env())
+    return JSONAuthManager(json_file, **options)
+
+
+def serve(socket_path: str = DEFAULT_SOCKET, json_file: str = "users.json",
+          flush_interval_ms: int = 50, split_progress: bool = True,
+          metrics_file: Optional[str] = None):
+    """Run the store daemon until SIGINT/SIGTERM, then write everything out"""
+    metrics = None
+    if metrics_file:
+        metrics = MetricsRegistry()
+        metrics.start_dumping(metrics_file)
+    store = JSONAuthManager(json_file, journal=True, flush_interval_ms=flush_interval_ms,
+                            flush_max_records=1000, split_progress=split_progress,
+                            login_staleness_ms=LOGIN_STALENESS_MS, single_writer=True, metrics=metrics)
+    store._load_users()
+    server = AuthStoreServer(socket_path, store)
+    
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever(), so it cannot run in this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    print(f"Serving {json_file} on {socket_path} (flush every {flush_interval_ms} ms)...")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        # Writes out everything buffered and releases the store's lock files
+        store.close()
+    print("✅ Store daemon stopped, all changes written")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serve the user store over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Socket path to listen on")
+    parser.add_argument("--users-file", default="users.json", help="User store to serve")
+    parser.add_argument("--flush-ms", type=int, default=50, help="Write-behind interval in milliseconds")
+    parser.add_argument("--no-split-progress", action="store_true",
+                        help="Keep saved progress inside users.json (as in older setups)")
+    parser.add_argument("--metrics-file", default=os.environ.get(METRICS_ENV),
+                        help=f"Dump store metrics as Prometheus text here (default: ${METRICS_ENV}, else off)")
+    options = parser.parse_args()
+    serve(options.socket, options.users_file, options.flush_ms, not options.no_split_progress,
+          options.metrics_file)
@@ -0,0 +1,93 @@
+"""
+Benchmark: JSONAuthManager vs SQLiteAuthManager
+Times the hot auth-store operations at different user counts
+
+Usage: python benchmark_auth_backends.py [sizes...]   (default: 1000 10000 100000)
+"""
+
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from auth_manager import JSONAuthManager
+from sqlite_auth_manager import SQLiteAuthManager
+
+PASSWORD = "benchmark123"
+
+
+def write_users_file(path: str, count: int):
+    """Write a users.json with `count` users, bypassing register_user for speed"""
+    hashed = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    now = datetime.now().isoformat()
+    users = [{
+        "username": f"player{i:06d}",
+        "password": hashed,
+        "email": f"player{i}@example.com",
+        "created_at": now,
+        "last_login": None,
+        "total_games": 0,
+        "high_score": 0,
+        "is_active": True
+    } for i in range(count)]
+    with open(path, 'w') as f:
+        json.dump({"users": users}, f, indent=2)
+
+
+def time_ops(func, names: list) -> float:
+    """Run func for each name and return the mean latency in milliseconds"""
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - start) * 1000 / len(names)
+
+
+def run(count: int, workdir: str):
+    """Benchmark both backends at one user count"""
+    json_file = os.path.join(workdir, f"users_{count}.json")
+    db_file = os.path.join(workdir, f"users_{count}.db")
+    write_users_file(json_file, count)
+    
+    sqlite_auth = SQLiteAuthManager(db_file)
+    start = time.perf_counter()
+    sqlite_auth.import_from_json(json_file)
+    import_secs = time.perf_counter() - start
+    
+    json_auth = JSONAuthManager(json_file)
+    
+    # Whole-file rewrites get slow quickly, so scale the sample down with size
+    ops = max(10, min(500, 2_000_000 // count))
+    names = [f"player{random.randrange(count):06d}" for _ in range(ops)]
+    
+    results = {}
+    for backend, auth in (("json", json_auth), ("sqlite", sqlite_auth)):
+        results[backend] = {
+            "user_exists": time_ops(auth.user_exists, names),
+            "login_user": time_ops(lambda n: auth.login_user(n, PASSWORD), names),
+            "save_progress": time_ops(lambda n: auth.save_progress(n, 3, 45, streak=2), names),
+            "update_user_stats": time_ops(lambda n: auth.update_user_stats(n, 50), names),
+        }
+    
+    print(f"\n{count:,} users  ({ops} ops per measurement, SQLite import {import_secs:.2f}s, "
+          f"users.json {os.path.getsize(json_file) / 1e6:.1f} MB)")
+    print(f"   {'operation':<20}{'json ms/op':>14}{'sqlite ms/op':>16}{'speedup':>10}")
+    for op in results["json"]:
+        json_ms, sqlite_ms = results["json"][op], results["sqlite"][op]
+        print(f"   {op:<20}{json_ms:>14.3f}{sqlite_ms:>16.3f}{json_ms / max(sqlite_ms, 1e-9):>9.1f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    workdir = tempfile.mkdtemp(prefix="auth_bench_")
+    try:
+        print("Benchmarking auth store backends...")
+        for size in sizes:
+            run(size, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("\n✅ Benchmark complete!")
@@ -0,0 +1,72 @@
+"""
+Benchmark: snapshot codecs of the JSON auth store
+Times a cold load and a full save of users.json per codec, and its size
+
+Usage: python benchmark_codecs.py [sizes...]   (default: 10000 100000)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import auth_codecs
+from auth_manager import JSONAuthManager
+from benchmark_auth_backends import write_users_file
+
+ROUNDS = 3
+
+
+def best_of(func) -> float:
+    """Best wall time of a few runs, in milliseconds"""
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def cold_load(json_file: str, codec: str):
+    """Parse the snapshot from scratch, as a freshly started process would"""
+    JSONAuthManager(json_file, codec=codec, leaderboard_size=0)._load_users()
+
+
+def run(count: int, workdir: str):
+    """Benchmark every codec at one user count"""
+    source = os.path.join(workdir, f"source_{count}.json")
+    write_users_file(source, count)
+    data = auth_codecs.load_store_file(source)
+    # Give every user some saved progress, as real stores have
+    for user in data["users"]:
+        user["saved_progress"] = {"level": 3, "score": 45, "hints_used": 1, "achievements": ["first_blood"],
+                                  "streak": 2, "max_streak": 4, "combo_multiplier": 1.5,
+                                  "perfect_levels": 1, "wrong_attempts": 3, "saved_at": "2024-01-01T00:00:00"}
+    
+    print(f"\n{count:,} users")
+    print(f"   {'codec':<14}{'load ms':>10}{'save ms':>10}{'size MB':>10}")
+    for name in auth_codecs.CODECS:
+        if not auth_codecs.available(name):
+            fallback = auth_codecs.get_codec(name).name
+            print(f"   {name:<14}{'not installed (falls back to ' + fallback + ')':>30}")
+            continue
+        
+        json_file = os.path.join(workdir, f"users_{count}_{name}.json")
+        auth = JSONAuthManager(json_file, codec=name, leaderboard_size=0)
+        save_ms = best_of(lambda: auth._save_users(data))
+        load_ms = best_of(lambda: cold_load(json_file, name))
+        size_mb = os.path.getsize(json_file) / 1e6
+        print(f"   {name:<14}{load_ms:>10.1f}{save_ms:>10.1f}{size_mb:>10.2f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    workdir = tempfile.mkdtemp(prefix="codec_bench_")
+    try:
+        print("Benchmarking auth store snapshot codecs...")
+        for size in sizes:
+            run(size, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("\n✅ Benchmark complete!")
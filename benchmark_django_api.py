@@ -0,0 +1,124 @@
+"""
+Benchmark: DjangoAPI calls with and without the pooled session
+Runs a local stand-in for the Django backend (keep-alive HTTP/1.1, the
+game's endpoints) and times the game's call pattern (load progress with
+two GETs, save progress with a POST) through plain requests.get/post,
+which open a new connection per call, and through new_http_session()
+
+Usage: python benchmark_django_api.py [calls] [threads]
+       (default: 500 8)
+"""
+
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_session import new_http_session
+
+# Backend work per request, so the numbers are not pure loopback
+SERVER_DELAY = 0.0005
+
+
+class StandInBackend(BaseHTTPRequestHandler):
+    """Answers the game's endpoints with canned JSON"""
+    
+    protocol_version = "HTTP/1.1"
+    # Each reply goes out in one write with no Nagle delay, as from a real server
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    flaky_calls = 0
+    
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def do_GET(self):
+        time.sleep(SERVER_DELAY)
+        if self.path.endswith("/game/session/"):
+            self._reply(200, {"session": {"id": 1}})
+        elif self.path.endswith("/progress/"):
+            self._reply(200, {"progress": [{"level_number": 2, "level": 2, "score": 250}]})
+        elif self.path.endswith("/flaky/"):
+            # Every other call is a 503, as from a backend restarting behind a proxy
+            StandInBackend.flaky_calls += 1
+            self._reply(503 if StandInBackend.flaky_calls % 2 else 200, {})
+        else:
+            self._reply(404, {})
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SERVER_DELAY)
+        self._reply(200, {"success": True})
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(ports):
+    """Run the stand-in backend on a free port (in its own process, off the client's GIL)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInBackend)
+    server.daemon_threads = True
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def game_calls(client, base_url: str):
+    """DjangoAPI.load_progress then save_progress: two GETs and a POST"""
+    session_id = client.get(f"{base_url}/game/session/", timeout=5).json()["session"]["id"]
+    client.get(f"{base_url}/game/session/{session_id}/progress/", timeout=5).json()
+    client.post(f"{base_url}/game/level/", json={"username": "player", "level": 2, "score": 250}, timeout=5)
+
+
+def timed_calls(client, base_url: str, calls: int, threads: int) -> list:
+    """Latency of each game_calls() in milliseconds, with threads players at once"""
+    def one(_):
+        start = time.perf_counter()
+        game_calls(client, base_url)
+        return (time.perf_counter() - start) * 1000
+    
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(one, range(calls)))
+
+
+def report(name: str, latencies: list, baseline: float = None):
+    """Print per-call latency (a call being one HTTP request)"""
+    per_call = [latency / 3 for latency in latencies]
+    median = statistics.median(per_call)
+    p95 = sorted(per_call)[int(len(per_call) * 0.95)]
+    speedup = f"   ({baseline / median:.1f}x)" if baseline else ""
+    print(f"   {name:<28} p50 {median:6.2f} ms   p95 {p95:6.2f} ms per call{speedup}")
+    return median
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    
+    ports = multiprocessing.Queue()
+    backend = multiprocessing.Process(target=serve, args=(ports,), daemon=True)
+    backend.start()
+    base_url = f"http://127.0.0.1:{ports.get()}/api/auth"
+    
+    try:
+        session = new_http_session()
+        for workers in (1, threads):
+            print(f"Benchmarking {calls} load + save progress rounds, {workers} player(s) at once...")
+            baseline = report("requests.get/post", timed_calls(requests, base_url, calls, workers))
+            report("pooled keep-alive session", timed_calls(session, base_url, calls, workers), baseline)
+        
+        flaky = session.get(f"{base_url}/flaky/", timeout=5)
+        print(f"\nGET against a backend answering 503 every other call: {flaky.status_code} after retry")
+    finally:
+        backend.terminate()
+        backend.join()
+    print("\n✅ Benchmark complete!")
@@ -0,0 +1,92 @@
+"""
+Benchmark: game event log write and replay
+Plays whole games for many players at once into a GameEventLog (wrong
+answers, hints, security keys, time per level), then rebuilds every
+player's state from the segments and checks it against the state the
+game itself kept while playing
+
+Usage: python benchmark_game_events.py [players] [levels]
+       (default: 10000 6)
+"""
+
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from game_events import GameEventLog, list_segments, replay_directory
+
+
+def play_turn(log: GameEventLog, username: str, game: dict, rng: random.Random, levels: int) -> bool:
+    """One action of a player's game, as final2.py emits it; False once the game is over"""
+    level = game["level"]
+    if not game["riddle_solved"]:
+        if rng.random() < 0.4:
+            log.emit(username, "wrong_answer", level=level, answer=f"guess{rng.randrange(100)}")
+            game["wrong_answers"] += 1
+        else:
+            points = 100 + rng.randrange(50)
+            log.emit(username, "riddle_solved", level=level, points=points)
+            game["score"] += points
+            game["riddle_solved"] = True
+        return True
+    
+    roll = rng.random()
+    if roll < 0.1 and not game["hinted"]:
+        log.emit(username, "hint", level=level, phase="security")
+        game["hints_used"] += 1
+        game["hinted"] = True
+    elif roll < 0.35:
+        log.emit(username, "security_key", level=level, correct=False)
+        game["security_failures"] += 1
+    else:
+        log.emit(username, "security_key", level=level, correct=True, seconds=round(rng.uniform(20, 600), 3))
+        game.update(level=level + 1, riddle_solved=False, hinted=False)
+        if game["level"] >= levels:
+            log.emit(username, "game_completed", score=game["score"])
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    levels = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    
+    workdir = tempfile.mkdtemp(prefix="events_bench_")
+    try:
+        print(f"Benchmarking the event log with {players:,} players x {levels} levels...")
+        rng = random.Random(42)
+        log = GameEventLog(workdir)
+        games = {}
+        start = time.perf_counter()
+        for number in range(players):
+            username = f"player{number:06d}"
+            games[username] = {"level": 0, "score": 0, "riddle_solved": False, "hinted": False,
+                               "wrong_answers": 0, "hints_used": 0, "security_failures": 0}
+            log.emit(username, "session_start", level=0, score=0)
+        
+        # Everyone plays at once, so each player's events are spread over the segments
+        playing = list(games)
+        while playing:
+            playing = [username for username in playing
+                       if play_turn(log, username, games[username], rng, levels)]
+        log.close()
+        elapsed = time.perf_counter() - start
+        
+        report = replay_directory(workdir)
+        print(f"   emit + write         {report['events'] / elapsed:>11,.0f} events/sec "
+              f"({len(list_segments(workdir))} segments)")
+        print(f"   replay               {report['events_per_sec']:>11,.0f} events/sec "
+              f"({report['events']:,} events, {len(report['players']):,} players in {report['seconds']:.2f}s)")
+        
+        mismatched = [username for username, game in games.items()
+                      if any(report["players"][username][field] != game[field]
+                             for field in ("level", "score", "wrong_answers", "hints_used", "security_failures"))
+                      or not report["players"][username]["finished"]]
+        if mismatched or report["errors"]:
+            sys.exit(f"❌ Replay disagrees with the game for {len(mismatched)} players")
+        print("   replayed state matches the game for every player")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("\n✅ Benchmark complete!")
@@ -0,0 +1,106 @@
+"""
+Benchmark: store daemon vs direct file access
+Several processes play the game's store traffic (login, save/load
+progress, finished games) against one users.json, either opening it
+directly as the apps do by default or through the auth_server daemon
+
+Usage: python benchmark_store_daemon.py [processes] [games_per_process] [users]
+       (default: 4 200 10000)
+"""
+
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from auth_manager import LOGIN_STALENESS_MS, JSONAuthManager
+from auth_server import AuthStoreClient
+from benchmark_auth_backends import PASSWORD, write_users_file
+
+# Store calls per simulated game
+OPS_PER_GAME = 5
+
+# The game's own direct-access options (final2.py)
+DIRECT_OPTIONS = {"journal": True, "flush_interval_ms": 250, "split_progress": True,
+                  "login_staleness_ms": LOGIN_STALENESS_MS}
+
+
+def play(auth, worker_id: int, games: int, users: int):
+    """One player session per game: log in, load, save twice, record the result"""
+    for i in range(games):
+        username = f"player{(worker_id * 7919 + i * 104729) % users:06d}"
+        auth.login_user(username, PASSWORD)
+        auth.load_progress(username)
+        auth.save_progress(username, level=1, score=10)
+        auth.save_progress(username, level=2, score=25, max_streak=2)
+        auth.update_user_stats(username, 25)
+    auth.flush()
+
+
+def direct_worker(json_file: str, worker_id: int, games: int, users: int):
+    play(JSONAuthManager(json_file, **DIRECT_OPTIONS), worker_id, games, users)
+
+
+def daemon_worker(socket_path: str, worker_id: int, games: int, users: int):
+    play(AuthStoreClient(socket_path), worker_id, games, users)
+
+
+def run(target, address: str, processes: int, games: int, users: int) -> float:
+    """Run the workers against one store and return total store ops per second"""
+    procs = [multiprocessing.Process(target=target, args=(address, w, games, users))
+             for w in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    if any(p.exitcode != 0 for p in procs):
+        raise RuntimeError("A benchmark worker failed")
+    return processes * games * OPS_PER_GAME / elapsed
+
+
+def start_daemon(json_file: str, socket_path: str) -> subprocess.Popen:
+    """Start auth_server.py on a store and wait until it listens"""
+    daemon = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth_server.py"),
+         "--socket", socket_path, "--users-file", json_file],
+        stdout=subprocess.DEVNULL
+    )
+    while not os.path.exists(socket_path):
+        if daemon.poll() is not None:
+            raise RuntimeError("The store daemon did not start")
+        time.sleep(0.05)
+    return daemon
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+    
+    workdir = tempfile.mkdtemp(prefix="daemon_bench_")
+    try:
+        print(f"Benchmarking {processes} processes x {games} games on {users:,} users...")
+        
+        direct_file = os.path.join(workdir, "direct.json")
+        write_users_file(direct_file, users)
+        direct = run(direct_worker, direct_file, processes, games, users)
+        print(f"   direct file access   {direct:>9,.0f} ops/sec")
+        
+        daemon_file = os.path.join(workdir, "daemon.json")
+        write_users_file(daemon_file, users)
+        socket_path = os.path.join(workdir, "auth_store.sock")
+        daemon = start_daemon(daemon_file, socket_path)
+        try:
+            served = run(daemon_worker, socket_path, processes, games, users)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+        print(f"   store daemon         {served:>9,.0f} ops/sec   ({served / direct:.1f}x)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("\n✅ Benchmark complete!")
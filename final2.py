@@ -6,7 +6,11 @@ import time
 import requests
 import json
 import toml
-from auth_manager import JSONAuthManager
+from auth_manager import LOGIN_STALENESS_MS
+from auth_schema import PROGRESS_DEFAULTS
+from auth_server import open_auth_store
+from game_events import GameEventLog
+from http_session import new_http_session
 import os
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -93,8 +97,28 @@ QUESTIONS: List[Dict] = [
 # ═══════════════════════════════════════════════════════════════════════════════
 API_BASE_URL = "http://localhost:8000/api/auth"
 
-# Initialize JSON Auth Manager for offline mode
-json_auth = JSONAuthManager("users.json")
+@st.cache_resource
+def get_json_auth():
+    """One auth store per server process, so its in-memory cache outlives reruns"""
+    # JSON Auth Manager for offline mode (or the store daemon, with AUTH_STORE_SOCKET set)
+    return open_auth_store("users.json", journal=True, flush_interval_ms=250, split_progress=True,
+                           login_staleness_ms=LOGIN_STALENESS_MS)
+
+json_auth = get_json_auth()
+
+@st.cache_resource
+def get_event_log():
+    """One game event log per server process; every session buffers into it"""
+    return GameEventLog()
+
+event_log = get_event_log()
+
+@st.cache_resource
+def get_api_session():
+    """One pooled keep-alive HTTP session per server process, shared by every player"""
+    return new_http_session()
+
+api_session = get_api_session()
 
 class DjangoAPI:
     """Helper class for Django backend API integration"""
@@ -103,7 +127,7 @@ class DjangoAPI:
     def register_user(username: str, email: str, password: str) -> Tuple[bool, str, Optional[dict]]:
         """Register a new user in Django database or JSON fallback"""
         try:
-            response = requests.post(
+            response = api_session.post(
                 f"{API_BASE_URL}/register/",
                 json={
                     "username": username,
@@ -135,7 +159,7 @@ class DjangoAPI:
     def login_user(username: str, password: str) -> Tuple[bool, str, Optional[dict]]:
         """Login user via Django backend or JSON fallback"""
         try:
-            response = requests.post(
+            response = api_session.post(
                 f"{API_BASE_URL}/login/",
                 json={"username": username, "password": password},
                 timeout=5
@@ -158,7 +182,7 @@ class DjangoAPI:
     def check_backend_status() -> bool:
         """Check if Django backend is running"""
         try:
-            response = requests.get(f"{API_BASE_URL}/achievements/all/", timeout=2)
+            response = api_session.get(f"{API_BASE_URL}/achievements/all/", timeout=2)
             return response.status_code in [200, 401, 403]  # Backend is up
         except:
             return False
@@ -167,7 +191,7 @@ class DjangoAPI:
     def get_questions() -> Optional[List[Dict]]:
         """Fetch questions from Django backend"""
         try:
-            response = requests.get(f"{API_BASE_URL}/questions/", timeout=5)
+            response = api_session.get(f"{API_BASE_URL}/questions/", timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('questions', [])
@@ -192,7 +216,7 @@ class DjangoAPI:
         """Save user's game progress with all stats to backend or JSON"""
         try:
             # Try Django backend first
-            response = requests.post(
+            response = api_session.post(
                 f"{API_BASE_URL}/game/level/",
                 json={
                     "username": username,
@@ -222,7 +246,7 @@ class DjangoAPI:
         """Mark game as completed permanently to prevent replay"""
         try:
             # Try Django backend first
-            response = requests.post(
+            response = api_session.post(
                 f"{API_BASE_URL}/game/mark_completed/",
                 json={
                     "username": username
@@ -240,7 +264,7 @@ class DjangoAPI:
         try:
             # Try Django backend first
             # Get active session first
-            session_response = requests.get(
+            session_response = api_session.get(
                 f"{API_BASE_URL}/game/session/",
                 headers={'Authorization': f'Token {st.session_state.auth_token}'} if st.session_state.get('auth_token') else {},
                 timeout=5
@@ -250,7 +274,7 @@ class DjangoAPI:
                 session_id = session_data.get('session', {}).get('id')
                 if session_id:
                     # Get progress for this session
-                    response = requests.get(
+                    response = api_session.get(
                         f"{API_BASE_URL}/game/session/{session_id}/progress/",
                         headers={'Authorization': f'Token {st.session_state.auth_token}'} if st.session_state.get('auth_token') else {},
                         timeout=5
@@ -276,7 +300,7 @@ class DjangoAPI:
         try:
             # Try Django backend first
             # Get active session first
-            session_response = requests.get(
+            session_response = api_session.get(
                 f"{API_BASE_URL}/game/session/",
                 headers={'Authorization': f'Token {st.session_state.auth_token}'} if st.session_state.get('auth_token') else {},
                 timeout=5
@@ -286,7 +310,7 @@ class DjangoAPI:
                 session_id = session_data.get('session', {}).get('id')
                 if session_id:
                     # Clear all level progress for this session
-                    response = requests.delete(
+                    response = api_session.delete(
                         f"{API_BASE_URL}/game/session/{session_id}/progress/clear/",
                         headers={'Authorization': f'Token {st.session_state.auth_token}'} if st.session_state.get('auth_token') else {},
                         timeout=5
@@ -1440,6 +1464,7 @@ def render_login_page():
                                 st.session_state.game_completed_permanently = True
                                 st.info("🏆 Game already completed! No replay allowed.")
                             
+                            log_session_start()
                             st.success(f"✅ {message}")
                             time.sleep(1)
                             st.rerun()
@@ -1489,18 +1514,25 @@ def render_login_page():
             </div>
             ''', unsafe_allow_html=True)
             
+            # Username Input (outside the form, so availability shows as soon as it is entered)
+            st.markdown('<p style="font-weight: 600; margin-bottom: 8px; color: var(--secondary-glow);">👤 Username</p>', unsafe_allow_html=True)
+            reg_username = st.text_input(
+                "Choose Username",
+                placeholder="Pick a unique username (min 3 characters)",
+                key="reg_username",
+                label_visibility="collapsed"
+            )
+            
+            # Username Availability Indicator (answered from memory, no file access)
+            if reg_username.strip():
+                if len(reg_username.strip()) < 3:
+                    st.caption("🔴 At least 3 characters")
+                elif json_auth.is_username_available(reg_username):
+                    st.caption("🟢 Username available")
+                else:
+                    st.caption("🔴 Username already taken")
+            
             with st.form("register_form", clear_on_submit=False):
-                # Username Input
-                st.markdown('<p style="font-weight: 600; margin-bottom: 8px; color: var(--secondary-glow);">👤 Username</p>', unsafe_allow_html=True)
-                reg_username = st.text_input(
-                    "Choose Username",
-                    placeholder="Pick a unique username (min 3 characters)",
-                    key="reg_username",
-                    label_visibility="collapsed"
-                )
-                
-                st.markdown('<div style="height: 15px;"></div>', unsafe_allow_html=True)
-                
                 # Email Input
                 st.markdown('<p style="font-weight: 600; margin-bottom: 8px; color: var(--secondary-glow);">📧 Email <span style="color: rgba(255,255,255,0.5); font-size: 0.9rem;">(Optional)</span></p>', unsafe_allow_html=True)
                 reg_email = st.text_input(
@@ -1584,6 +1616,7 @@ def render_login_page():
                             st.session_state.auth_token = data.get('token') if data else None
                             st.session_state.user_id = data.get('user', {}).get('id') if data else None
                             st.session_state.start_time = datetime.now()
+                            log_session_start()
                             
                             st.success(f"✅ {message} Welcome, {reg_username}!")
                             st.info("🎮 Starting your FOSS adventure...")
@@ -1641,6 +1674,18 @@ def auto_save_progress():
         )
 
 
+def log_game_event(event_type: str, **fields):
+    """Record a player action in the game event log (logged-in players only)"""
+    if st.session_state.get('logged_in') and st.session_state.get('username'):
+        event_log.emit(st.session_state.username, event_type, **fields)
+
+
+def log_session_start():
+    """Record the progress a session starts from, which the events that follow build on"""
+    log_game_event("session_start", finished=st.session_state.finished,
+                   **{field: st.session_state[field] for field in PROGRESS_DEFAULTS})
+
+
 def get_rank() -> Tuple[str, str]:
     """Calculate player rank and icon based on comprehensive performance"""
     score = st.session_state.score
@@ -1818,6 +1863,7 @@ def add_achievement(achievement: str):
     """Add achievement to player's collection"""
     if achievement not in st.session_state.achievements:
         st.session_state.achievements.append(achievement)
+        log_game_event("achievement", name=achievement)
 
 
 def reset_game():
@@ -2012,6 +2058,19 @@ def render_sidebar():
 
         st.markdown("---")
 
+        # Live Leaderboard (top-K board kept by the auth store, no user scan)
+        st.markdown("### 🏆 LEADERBOARD")
+        leaders = json_auth.get_leaderboard("high_score", 5)
+        if leaders:
+            medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
+            for rank, leader in enumerate(leaders):
+                is_me = leader["username"] == st.session_state.get("username")
+                st.markdown(f"{medals[rank]} {'**' if is_me else ''}{leader['username']}{'**' if is_me else ''} — {leader['value']} pts")
+        else:
+            st.caption("No scores yet. Be the first!")
+
+        st.markdown("---")
+
         # Quick Actions
         if st.button("🔄 Restart Game", use_container_width=True):
             reset_game()
@@ -2045,6 +2104,7 @@ def render_sidebar():
             with col2:
                 if st.button("🗑️ Clear", use_container_width=True, help="Delete saved progress"):
                     if DjangoAPI.clear_progress(st.session_state.username):
+                        log_game_event("progress_cleared")
                         st.warning("🛡️ Progress cleared!")
                         reset_game()
                         st.rerun()
@@ -2253,6 +2313,7 @@ else:
                     bonus = calculate_bonus_points(is_riddle=True)
 
                     st.session_state.score += points + bonus
+                    log_game_event("riddle_solved", level=st.session_state.level, points=points + bonus)
                     st.session_state.riddle_solved = True
                     st.session_state.show_hint = False
 
@@ -2272,6 +2333,7 @@ else:
                     # Wrong Answer
                     st.session_state.wrong_attempts += 1
                     st.session_state.combo_multiplier = 1.0
+                    log_game_event("wrong_answer", level=st.session_state.level, answer=user_answer)
                     st.error(f"❌ Incorrect! Attempt {st.session_state.wrong_attempts}/∞")
 
                     # Show disappointed GIF on wrong answer
@@ -2338,6 +2400,7 @@ else:
                     st.session_state.hints_used += 1
                     st.session_state.streak = 0
                     st.session_state.combo_multiplier = 1.0
+                    log_game_event("hint", level=st.session_state.level, phase="security")
                     st.info("⚠ Streak and combo reset!")
                     
                     # AUTO-SAVE after using security hint
@@ -2359,6 +2422,9 @@ else:
 
                 if user_security == correct_security:
                     # Correct Security Key
+                    level_seconds = (datetime.now() - st.session_state.level_start_time).total_seconds()
+                    log_game_event("security_key", level=st.session_state.level, correct=True,
+                                   seconds=round(level_seconds, 3))
                     st.session_state.level += 1
                     st.session_state.riddle_solved = False
                     st.session_state.show_security_hint = False
@@ -2370,7 +2436,11 @@ else:
                     # Check if game is finished (all 6 levels completed)
                     if st.session_state.level >= len(st.session_state.QUESTIONS):
                         st.session_state.finished = True
+                        log_game_event("game_completed", score=st.session_state.score)
                         # Mark game as completed permanently to prevent replay
+                else:
+                    # Wrong Security Key: recorded for analytics only
+                    log_game_event("security_key", level=st.session_state.level, correct=False)
         # Preview Upcoming Levels
         st.markdown("---")
         st.markdown("### 🔮 UPCOMING MISSIONS")
@@ -0,0 +1,333 @@
+"""
+Game event log
+An append-only record of every player action (wrong answers, hints,
+security-key attempts, time per level), kept apart from the user store,
+which only holds each player's latest progress.
+
+Events are buffered in memory and appended as NDJSON lines to segment
+files in one directory, a new segment once the current one reaches
+SEGMENT_BYTES. Each process writes its own segments, so writers never
+share a file. replay() folds the events back into per-player state.
+"""
+
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from auth_codecs import encode_record_line, iter_ndjson_records
+from auth_schema import PROGRESS_DEFAULTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENTS_DIR = "game_events"
+
+SEGMENT_SUFFIX = ".ndjson"
+
+# A segment is closed and a new one started past this size
+SEGMENT_BYTES = 16 * 1024 * 1024
+
+# Buffered events are written after this many seconds, or once there are this many
+FLUSH_INTERVAL = 1.0
+FLUSH_MAX_EVENTS = 512
+
+
+class GameEventLog:
+    """Buffered writer of one process' event segments"""
+    
+    def __init__(self, directory: str = DEFAULT_EVENTS_DIR, segment_bytes: int = SEGMENT_BYTES,
+                 flush_interval: float = FLUSH_INTERVAL, flush_max_events: int = FLUSH_MAX_EVENTS):
+        """
+        Args:
+            directory: Where the segments go (created if missing)
+            segment_bytes: Size at which a segment is closed and the next one started
+            flush_interval: Longest an event waits in the buffer, in seconds
+            flush_max_events: Buffered events that trigger a write right away
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.flush_max_events = flush_max_events
+        
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._timer = None
+        self._fd = None
+        self._segment_size = 0
+        self._segment_number = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+    
+    def emit(self, username: str, event_type: str, **fields):
+        """
+        Record one event
+        
+        Only encodes it into the buffer; the write happens on the next
+        flush, at the latest flush_interval seconds later.
+        """
+        event = {"ts": time.time(), "user": username, "type": event_type}
+        event.update(fields)
+        line = encode_record_line(event)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_max_events:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self):
+        """Write the buffered events now"""
+        with self._lock:
+            self._flush_locked()
+    
+    def close(self):
+        """Write the buffered events and close the current segment"""
+        with self._lock:
+            self._flush_locked()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+    
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        """Append the buffer to the current segment in one write (caller holds the lock)"""
+        if not self._buffer:
+            return
+        payload = b"".join(self._buffer)
+        try:
+            if self._fd is None or self._segment_size >= self.segment_bytes:
+                self._open_segment()
+            os.write(self._fd, payload)
+        except OSError as e:
+            # Analytics must not take the game down: keep the events for the next try
+            logger.warning("Could not write game events to %s: %s", self.directory, e)
+            return
+        self._segment_size += len(payload)
+        self._buffer = []
+    
+    def _open_segment(self):
+        """Close the current segment, if any, and start the next one"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._segment_number += 1
+        # Names sort by creation time; the pid keeps processes to their own files
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._segment_number:04d}{SEGMENT_SUFFIX}"
+        self._fd = os.open(os.path.join(self.directory, name), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment_size = 0
+
+
+def list_segments(directory: str = DEFAULT_EVENTS_DIR) -> List[str]:
+    """Paths of the event segments in a directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.endswith(SEGMENT_SUFFIX)]
+
+
+def _iter_segment(path: str, errors: List) -> Iterator[Dict]:
+    """The events of one segment; lines that do not parse go to errors"""
+    with open(path, 'rb') as f:
+        for number, event in iter_ndjson_records(f):
+            if isinstance(event, ValueError):
+                # Most likely the tail of a write cut short by a crash
+                errors.append((path, number, str(event)))
+            else:
+                yield event
+
+
+def iter_events(directory: str = DEFAULT_EVENTS_DIR, errors: Optional[List] = None) -> Iterator[Dict]:
+    """
+    Every event in the directory, in timestamp order
+    
+    A process' segments follow on from each other, so they are simply
+    chained; only the streams of different processes are merged, as they
+    are read rather than read in whole and sorted. Lines that do not parse
+    are skipped and, if errors is given, listed there as (path, line, message).
+    """
+    errors = errors if errors is not None else []
+    by_process: Dict[str, List[str]] = {}
+    for path in list_segments(directory):
+        # "<opened>-<pid>-<number>.ndjson"
+        by_process.setdefault(os.path.basename(path).split("-")[1], []).append(path)
+    streams = [itertools.chain.from_iterable(_iter_segment(path, errors) for path in paths)
+               for paths in by_process.values()]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda event: event["ts"])
+
+
+def new_player_state() -> Dict:
+    """State of a player with no events: saved_progress fields plus the log's own"""
+    state = {field: list(value) if isinstance(value, list) else value for field, value in PROGRESS_DEFAULTS.items()}
+    state.update({
+        "security_wrong_attempts": 0,
+        "finished": False,
+        # Totals the saved progress never kept
+        "wrong_answers": 0,
+        "security_failures": 0,
+        "level_seconds": {},
+        "events": 0,
+        "last_seen": None,
+    })
+    return state
+
+
+def _session_start(state: Dict, event: Dict):
+    """Progress loaded at login: the state the events that follow build on"""
+    for field in PROGRESS_DEFAULTS:
+        if field in event:
+            state[field] = list(event[field]) if isinstance(event[field], list) else event[field]
+    state["finished"] = event.get("finished", False)
+    state["security_wrong_attempts"] = 0
+
+
+def _wrong_answer(state: Dict, event: Dict):
+    state["wrong_attempts"] += 1
+    state["wrong_answers"] += 1
+    state["combo_multiplier"] = 1.0
+
+
+def _riddle_solved(state: Dict, event: Dict):
+    state["score"] += event.get("points", 0)
+    if state["wrong_attempts"] == 0:
+        state["perfect_levels"] += 1
+    state["wrong_attempts"] = 0
+    state["combo_multiplier"] = min(3.0, state["combo_multiplier"] + 0.2)
+
+
+def _hint(state: Dict, event: Dict):
+    state["hints_used"] += 1
+    state["streak"] = 0
+    state["combo_multiplier"] = 1.0
+
+
+def _security_key(state: Dict, event: Dict):
+    if not event.get("correct"):
+        state["security_wrong_attempts"] += 1
+        state["security_failures"] += 1
+        return
+    if "seconds" in event:
+        state["level_seconds"][str(event.get("level", state["level"]))] = event["seconds"]
+    state["level"] += 1
+    state["streak"] += 1
+    state["max_streak"] = max(state["max_streak"], state["streak"])
+    state["security_wrong_attempts"] = 0
+
+
+def _achievement(state: Dict, event: Dict):
+    if event.get("name") not in state["achievements"]:
+        state["achievements"].append(event.get("name"))
+
+
+def _game_completed(state: Dict, event: Dict):
+    state["finished"] = True
+
+
+def _progress_cleared(state: Dict, event: Dict):
+    """Saved progress deleted: the game starts over, the totals stay"""
+    fresh = new_player_state()
+    for field in list(PROGRESS_DEFAULTS) + ["security_wrong_attempts", "finished"]:
+        state[field] = fresh[field]
+
+
+# How each event type changes a player's state, mirroring the game's own
+# rules; types not listed here are kept in the log but change nothing
+REPLAYERS: Dict[str, Callable] = {
+    "session_start": _session_start,
+    "wrong_answer": _wrong_answer,
+    "riddle_solved": _riddle_solved,
+    "hint": _hint,
+    "security_key": _security_key,
+    "achievement": _achievement,
+    "game_completed": _game_completed,
+    "progress_cleared": _progress_cleared,
+}
+
+
+def replay(events: Iterable[Dict], usernames: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """
+    Rebuild player state from events
+    
+    Args:
+        events: Events in timestamp order, e.g. iter_events(directory)
+        usernames: Only rebuild these players (default: everyone in the log)
+    
+    Returns:
+        {username: state}, each state as from new_player_state()
+    """
+    wanted = set(usernames) if usernames is not None else None
+    states: Dict[str, Dict] = {}
+    replayers = REPLAYERS
+    for event in events:
+        username = event.get("user")
+        if wanted is not None and username not in wanted:
+            continue
+        state = states.get(username)
+        if state is None:
+            state = states[username] = new_player_state()
+        step = replayers.get(event.get("type"))
+        if step is not None:
+            step(state, event)
+        state["events"] += 1
+        state["last_seen"] = event["ts"]
+    return states
+
+
+def replay_directory(directory: str = DEFAULT_EVENTS_DIR, usernames: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Rebuild player state from every segment in a directory
+    
+    Returns:
+        Dict with players ({username: state}), events (replayed for
+        them), errors (lines that did not parse, as (path, line,
+        message)), seconds and events_per_sec
+    """
+    start = time.perf_counter()
+    errors: List = []
+    players = replay(iter_events(directory, errors), usernames)
+    seconds = time.perf_counter() - start
+    events = sum(state["events"] for state in players.values())
+    return {
+        "players": players,
+        "events": events,
+        "errors": errors,
+        "seconds": seconds,
+        "events_per_sec": events / seconds if seconds > 0 else 0.0
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Rebuild player state from the game event log")
+    parser.add_argument("--dir", default=DEFAULT_EVENTS_DIR, help="Event segment directory")
+    parser.add_argument("usernames", nargs="*", help="Players to show (default: a summary of everyone)")
+    options = parser.parse_args()
+    
+    report = replay_directory(options.dir, options.usernames or None)
+    print(f"Replayed {report['events']:,} events of {len(report['players']):,} players "
+          f"in {report['seconds']:.2f}s ({report['events_per_sec']:,.0f} events/sec)")
+    for path, line, message in report["errors"]:
+        print(f"   ❌ {path}:{line}: {message}")
+    for username in options.usernames:
+        state = report["players"].get(username)
+        if state is None:
+            print(f"   {username}: no events")
+            continue
+        print(f"   {username}: level {state['level'] + 1}, {state['score']} pts, "
+              f"{state['wrong_answers']} wrong answers, {state['hints_used']} hints, "
+              f"{state['security_failures']} failed security keys")
+        for level, seconds in sorted(state["level_seconds"].items(), key=lambda item: int(item[0])):
+            print(f"      level {int(level) + 1}: {seconds:.1f}s")
@@ -0,0 +1,51 @@
+"""
+Pooled HTTP session for the Django backend
+One requests.Session keeps connections to the backend open between calls
+(keep-alive), so a call costs a round trip instead of a new TCP
+connection. The game shares one per server process across all players
+(final2.py caches it with st.cache_resource), so the pool is sized for
+concurrent players and the session never keeps cookies.
+"""
+
+from http import cookiejar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connections kept open to the backend: about as many as calls in flight at once
+HTTP_POOL_SIZE = 16
+
+# Retries of idempotent GETs, waiting backoff * 2 ** (retry - 1) seconds in between
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.1
+
+# Responses that mean "try again shortly" rather than "no"
+RETRY_STATUSES = (502, 503, 504)
+
+
+def new_http_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                     backoff: float = HTTP_BACKOFF) -> requests.Session:
+    """
+    A keep-alive session with a connection pool and retries on GETs
+    
+    Only GETs are retried, on read errors and RETRY_STATUSES; a POST or
+    DELETE may have been applied before its connection broke. Refused
+    connections are not retried at all: the backend is down and the
+    caller falls back to the JSON store, which should not wait for it.
+    
+    Args:
+        pool_size: Connections kept open per backend host
+        retries: Retries of a failed GET
+        backoff: Backoff factor between retries, in seconds
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, connect=0, read=retries, status=retries,
+                  backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset({"GET"}), raise_on_status=False)
+    adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Shared by every player: one player's cookies must never go out with another's requests
+    session.cookies.set_policy(cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
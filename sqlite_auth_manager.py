@@ -0,0 +1,910 @@
+"""
+SQLite-based Authentication Manager
+Drop-in replacement for JSONAuthManager that stores users in a SQLite
+database (WAL mode), so every update is a single-row UPDATE instead of a
+rewrite of the whole users file. Sort orders, search and leaderboards come
+from indexes; dormant accounts move to an archived_users table as
+compressed records and come back on first use, as in the JSON store.
+"""
+
+import json
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, Dict, List
+from datetime import datetime, timedelta
+
+from auth_codecs import load_store_file
+from auth_manager import (ARCHIVE_INACTIVE_DAYS, IMPORT_CHUNK_SIZE, LEADERBOARD_METRICS, PARALLEL_HASH_MIN,
+                          SORT_FIELDS, USER_STATUSES, JSONAuthManager, _hash_password_value, _import_report,
+                          _iter_backup_chunks, _write_ndjson)
+
+
+# Columns with a fixed place in the table; anything else found in an
+# imported record is kept in the "extra" JSON column
+USER_COLUMNS = (
+    "username", "password", "email", "created_at", "last_login",
+    "total_games", "high_score", "is_active", "disabled_at",
+    "game_completed_permanently", "saved_progress",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    username_key TEXT NOT NULL,
+    password TEXT NOT NULL,
+    email TEXT NOT NULL DEFAULT '',
+    created_at TEXT,
+    last_login TEXT,
+    total_games INTEGER NOT NULL DEFAULT 0,
+    high_score INTEGER NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    disabled_at TEXT,
+    game_completed_permanently INTEGER NOT NULL DEFAULT 0,
+    saved_progress TEXT,
+    extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username_key ON users(username_key);
+CREATE INDEX IF NOT EXISTS idx_users_high_score ON users(high_score, username_key);
+CREATE INDEX IF NOT EXISTS idx_users_last_login ON users(COALESCE(last_login, ''), username_key);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(COALESCE(created_at, ''), username_key);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(lower(email), username_key);
+CREATE TABLE IF NOT EXISTS archived_users (
+    username_key TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    archived_at TEXT NOT NULL,
+    record BLOB NOT NULL
+);
+"""
+
+INSERT_USER = (
+    "INSERT OR IGNORE INTO users (username, username_key, password, email, created_at, "
+    "last_login, total_games, high_score, is_active, disabled_at, "
+    "game_completed_permanently, saved_progress, extra) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# SQL sort value for each of SORT_FIELDS, matching the JSON store's order
+# (each has an index on (value, username_key))
+SORT_EXPRESSIONS = {
+    "username": "username_key",
+    "high_score": "high_score",
+    "last_login": "COALESCE(last_login, '')",
+    "created_at": "COALESCE(created_at, '')",
+    "email": "lower(email)",
+}
+
+LEADERBOARD_EXPRESSIONS = {
+    "high_score": "high_score",
+    "max_streak": "COALESCE(json_extract(saved_progress, '$.max_streak'), 0)",
+    "perfect_levels": "COALESCE(json_extract(saved_progress, '$.perfect_levels'), 0)",
+}
+
+# Sorts after every other character, to turn a prefix into a range
+PREFIX_END = "\U0010ffff"
+
+
+class SQLiteAuthManager:
+    """Manages user authentication with SQLite storage (same API as JSONAuthManager)"""
+    
+    def __init__(self, db_file: str = "users.db"):
+        self.db_file = db_file
+        # One connection per thread; Streamlit serves each session from its own thread
+        self._local = threading.local()
+        self._initialize_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _initialize_db(self):
+        """Create the users table and index if they don't exist"""
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+    
+    def _hash_password(self, password: str) -> str:
+        """Hash password using SHA-256"""
+        return hashlib.sha256(password.encode()).hexdigest()
+    
+    @staticmethod
+    def _key(username: str) -> str:
+        """Index key for a username (usernames are case-insensitive)"""
+        return username.casefold()
+    
+    @staticmethod
+    def _row_to_user(row: sqlite3.Row, include_password: bool = False) -> Dict:
+        """Convert a row into the same dict shape JSONAuthManager returns"""
+        user = {
+            "username": row["username"],
+            "email": row["email"],
+            "created_at": row["created_at"],
+            "last_login": row["last_login"],
+            "total_games": row["total_games"],
+            "high_score": row["high_score"],
+            "is_active": bool(row["is_active"]),
+        }
+        if include_password:
+            user["password"] = row["password"]
+        # Optional fields are only present in the JSON records once set
+        if row["disabled_at"] is not None:
+            user["disabled_at"] = row["disabled_at"]
+        if row["game_completed_permanently"]:
+            user["game_completed_permanently"] = True
+        if row["saved_progress"] is not None:
+            user["saved_progress"] = json.loads(row["saved_progress"])
+        if row["extra"]:
+            user.update(json.loads(row["extra"]))
+        return user
+    
+    @classmethod
+    def _user_to_row(cls, user: Dict) -> tuple:
+        """Parameters of INSERT_USER for a full user record (as in users.json)"""
+        progress = user.get("saved_progress")
+        extra = {k: v for k, v in user.items() if k not in USER_COLUMNS}
+        return (
+            user["username"],
+            cls._key(user["username"]),
+            user["password"],
+            user.get("email") or "",
+            user.get("created_at"),
+            user.get("last_login"),
+            user.get("total_games", 0),
+            user.get("high_score", 0),
+            1 if user.get("is_active", True) else 0,
+            user.get("disabled_at"),
+            1 if user.get("game_completed_permanently") else 0,
+            json.dumps(progress) if progress is not None else None,
+            json.dumps(extra) if extra else None,
+        )
+    
+    def _name_taken(self, key: str) -> bool:
+        """Whether a username key belongs to a user, hot or archived"""
+        return self._connect().execute(
+            "SELECT 1 FROM users WHERE username_key = ? UNION ALL "
+            "SELECT 1 FROM archived_users WHERE username_key = ?", (key, key)
+        ).fetchone() is not None
+    
+    def _get_row(self, username: str) -> Optional[sqlite3.Row]:
+        """Fetch a user row by username (case-insensitive)"""
+        return self._connect().execute(
+            "SELECT * FROM users WHERE username_key = ?", (self._key(username),)
+        ).fetchone()
+    
+    def _update(self, username: str, assignments: str, params: tuple = ()) -> bool:
+        """Run a single-row UPDATE; returns True if the user exists"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE users SET {assignments} WHERE username_key = ?",
+                params + (self._key(username),)
+            )
+        if cursor.rowcount == 0 and self._rehydrate(username):
+            # An archived account: back in the table, so try again
+            return self._update(username, assignments, params)
+        return cursor.rowcount > 0
+    
+    def register_user(self, username: str, password: str, email: str = "") -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Register a new user
+        
+        Args:
+            username: User's chosen username
+            password: User's password (will be hashed)
+            email: User's email (optional)
+        
+        Returns:
+            Tuple of (success: bool, message: str, user_data: dict or None)
+        """
+        # Validation
+        if not username or len(username.strip()) < 3:
+            return False, "Username must be at least 3 characters long", None
+        
+        if not password or len(password) < 6:
+            return False, "Password must be at least 6 characters long", None
+        
+        username = username.strip()
+        created_at = datetime.now().isoformat()
+        
+        conn = self._connect()
+        with conn:
+            # Archived accounts keep their username
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, username_key, password, email, created_at) "
+                "SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM archived_users WHERE username_key = ?)",
+                (username, self._key(username), self._hash_password(password), email, created_at, self._key(username))
+            )
+        if cursor.rowcount == 0:
+            return False, "Username already exists", None
+        
+        user_data = {
+            "username": username,
+            "email": email,
+            "created_at": created_at,
+            "last_login": None,
+            "total_games": 0,
+            "high_score": 0,
+            "is_active": True
+        }
+        
+        return True, f"Account created successfully for {username}!", user_data
+    
+    def login_user(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Authenticate user login
+        
+        Args:
+            username: User's username
+            password: User's password
+        
+        Returns:
+            Tuple of (success: bool, message: str, user_data: dict or None)
+        """
+        if not username or not password:
+            return False, "Username and password are required", None
+        
+        username = username.strip()
+        self._rehydrate(username)
+        
+        row = self._get_row(username)
+        if row is None:
+            return False, "Invalid username or password", None
+        
+        if not row["is_active"]:
+            return False, "Account has been disabled. Please contact the administrator.", None
+        
+        if row["password"] != self._hash_password(password):
+            return False, "Invalid username or password", None
+        
+        last_login = datetime.now().isoformat()
+        self._update(username, "last_login = ?", (last_login,))
+        
+        user_data = self._row_to_user(row)
+        user_data["last_login"] = last_login
+        
+        return True, f"Welcome back, {username}!", user_data
+    
+    def update_user_stats(self, username: str, score: int):
+        """Update user statistics after game completion"""
+        self._update(
+            username,
+            "total_games = total_games + 1, high_score = MAX(high_score, ?)",
+            (score,)
+        )
+    
+    def save_progress(self, username: str, level: int, score: int, hints_used: int = 0,
+                     achievements: list = None, streak: int = 0, max_streak: int = 0,
+                     combo_multiplier: float = 1.0, perfect_levels: int = 0,
+                     wrong_attempts: int = 0) -> bool:
+        """Save user's game progress with all stats"""
+        progress = {
+            "level": level,
+            "score": score,
+            "hints_used": hints_used,
+            "achievements": achievements or [],
+            "streak": streak,
+            "max_streak": max_streak,
+            "combo_multiplier": combo_multiplier,
+            "perfect_levels": perfect_levels,
+            "wrong_attempts": wrong_attempts,
+            "saved_at": datetime.now().isoformat()
+        }
+        return self._update(username, "saved_progress = ?", (json.dumps(progress),))
+    
+    def load_progress(self, username: str) -> Optional[Dict]:
+        """Load user's saved game progress"""
+        self._rehydrate(username)
+        row = self._connect().execute(
+            "SELECT saved_progress FROM users WHERE username_key = ?", (self._key(username),)
+        ).fetchone()
+        if row is None or row["saved_progress"] is None:
+            return None
+        return json.loads(row["saved_progress"])
+    
+    def clear_progress(self, username: str) -> bool:
+        """Clear user's saved game progress"""
+        return self._update(username, "saved_progress = NULL")
+    
+    def get_all_users(self) -> list:
+        """Get all users (without passwords)"""
+        rows = self._connect().execute("SELECT * FROM users ORDER BY id").fetchall()
+        return [self._row_to_user(row) for row in rows]
+    
+    def iter_all_users(self):
+        """Yield all users (without passwords), one row at a time"""
+        for row in self._connect().execute("SELECT * FROM users ORDER BY id"):
+            yield self._row_to_user(row)
+    
+    def cursor_for(self, user: Dict, sort_by: str = "username") -> Tuple:
+        """Cursor to pass as iter_users(after=...) to continue after this user"""
+        key = self._key(user["username"])
+        values = {
+            "username": key,
+            "high_score": user.get("high_score") or 0,
+            "last_login": user.get("last_login") or "",
+            "created_at": user.get("created_at") or "",
+            "email": (user.get("email") or "").lower(),
+        }
+        return values[sort_by], key
+    
+    def iter_users(self, sort_by: str = "username", descending: bool = False,
+                   after: Optional[Tuple] = None, limit: Optional[int] = None,
+                   status: Optional[str] = None):
+        """
+        Yield users (without passwords) in a sort order, as JSONAuthManager.iter_users
+        
+        Each order has an index, so a page is a range scan of limit rows.
+        
+        Args:
+            sort_by: One of SORT_FIELDS; ties are broken by username
+            descending: Highest values first
+            after: Cursor of the last user of the previous page (cursor_for)
+            limit: Stop after this many users
+            status: Only "active" or only "disabled" users
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of {SORT_FIELDS}, not {sort_by!r}")
+        if status is not None and status not in USER_STATUSES:
+            raise ValueError(f"status must be one of {USER_STATUSES}, not {status!r}")
+        
+        expression = SORT_EXPRESSIONS[sort_by]
+        conditions = []
+        params: list = []
+        if after is not None:
+            conditions.append(f"({expression}, username_key) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        if status is not None:
+            conditions.append("is_active = ?")
+            params.append(1 if status == "active" else 0)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        params.append(limit if limit is not None else -1)
+        
+        rows = self._connect().execute(
+            f"SELECT * FROM users {where} ORDER BY {expression} {direction}, username_key {direction} LIMIT ?",
+            params
+        )
+        for row in rows:
+            yield self._row_to_user(row)
+    
+    def count_users(self, status: Optional[str] = None) -> int:
+        """Number of users, optionally only "active" or only "disabled" ones"""
+        if status is not None and status not in USER_STATUSES:
+            raise ValueError(f"status must be one of {USER_STATUSES}, not {status!r}")
+        
+        if status is None:
+            sql, params = "SELECT COUNT(*) FROM users", ()
+        else:
+            sql, params = "SELECT COUNT(*) FROM users WHERE is_active = ?", (1 if status == "active" else 0,)
+        return self._connect().execute(sql, params).fetchone()[0]
+    
+    def search_users(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Find users (without passwords) by part of their username or email
+        
+        Case-insensitive. Usernames, then emails, starting with the query
+        come first (range scans of their indexes); users that only contain
+        it somewhere follow.
+        
+        Args:
+            query: Text to look for
+            limit: Return at most this many users
+        """
+        query = (query or "").strip().casefold()
+        if not query or limit <= 0:
+            return []
+        
+        conn = self._connect()
+        found: Dict[str, Dict] = {}
+        searches = (
+            ("SELECT * FROM users WHERE username_key >= ? AND username_key < ? "
+             "ORDER BY username_key LIMIT ?", (query, query + PREFIX_END)),
+            ("SELECT * FROM users WHERE lower(email) >= ? AND lower(email) < ? "
+             "ORDER BY lower(email), username_key LIMIT ?", (query, query + PREFIX_END)),
+            ("SELECT * FROM users WHERE instr(username_key, ?) OR instr(lower(email), ?) "
+             "ORDER BY id LIMIT ?", (query, query)),
+        )
+        for sql, params in searches:
+            # Asks for limit more than found so far, in case they overlap
+            for row in conn.execute(sql, params + (limit,)):
+                found.setdefault(row["username_key"], self._row_to_user(row))
+                if len(found) >= limit:
+                    return list(found.values())
+        return list(found.values())
+    
+    def get_leaderboard(self, metric: str = "high_score", k: int = 10) -> List[Dict]:
+        """
+        Top players for one of LEADERBOARD_METRICS, best first
+        
+        Ranks current values: unlike the JSON store's boards, a player's
+        best streak leaves the board once their saved progress is cleared.
+        
+        Returns:
+            Up to k dicts with "username" and "value"
+        """
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"metric must be one of {LEADERBOARD_METRICS}, not {metric!r}")
+        
+        expression = LEADERBOARD_EXPRESSIONS[metric]
+        rows = self._connect().execute(
+            f"SELECT username, {expression} AS value FROM users WHERE {expression} > 0 "
+            "ORDER BY value DESC, username_key LIMIT ?", (k,)
+        )
+        return [{"username": row["username"], "value": row["value"]} for row in rows]
+    
+    def user_exists(self, username: str) -> bool:
+        """Check if a username exists"""
+        return self._name_taken(self._key(username))
+    
+    def is_username_available(self, username: str) -> bool:
+        """Whether a username is still free (register_user has the final word)"""
+        if JSONAuthManager._validate_username(username):
+            return False
+        return not self._name_taken(self._key(username.strip()))
+    
+    def disable_user(self, username: str) -> Tuple[bool, str]:
+        """Disable a user account"""
+        if self._update(username, "is_active = 0, disabled_at = ?", (datetime.now().isoformat(),)):
+            return True, f"Account '{username}' has been disabled successfully"
+        return False, f"User '{username}' not found"
+    
+    def activate_user(self, username: str) -> Tuple[bool, str]:
+        """Activate a user account"""
+        if self._update(username, "is_active = 1, disabled_at = NULL"):
+            return True, f"Account '{username}' has been activated successfully"
+        return False, f"User '{username}' not found"
+    
+    def delete_user(self, username: str) -> Tuple[bool, str]:
+        """Permanently delete a user account"""
+        return self.bulk_delete([username])[0]
+    
+    def create_user_admin(self, username: str, password: str, email: str = "") -> Tuple[bool, str]:
+        """Create a new user account (admin function)"""
+        # New accounts are already active, so a single insert is enough
+        success, message, user_data = self.register_user(username, password, email)
+        return success, message
+    
+    def get_user_status(self, username: str) -> Optional[Dict]:
+        """Get user account status"""
+        row = self._get_row(username)
+        if row is None:
+            return None
+        
+        return {
+            "username": row["username"],
+            "is_active": bool(row["is_active"]),
+            "disabled_at": row["disabled_at"],
+            "created_at": row["created_at"],
+            "last_login": row["last_login"]
+        }
+    
+    def get_user_details(self, username: str) -> Optional[Dict]:
+        """Get complete user details for editing"""
+        self._rehydrate(username)
+        row = self._get_row(username)
+        return self._row_to_user(row) if row is not None else None
+    
+    def update_user_email(self, username: str, new_email: str) -> Tuple[bool, str]:
+        """Update user's email address"""
+        if self._update(username, "email = ?", (new_email,)):
+            return True, f"Email updated successfully for '{username}'"
+        return False, f"User '{username}' not found"
+    
+    def update_user_password(self, username: str, new_password: str) -> Tuple[bool, str]:
+        """Update user's password"""
+        if len(new_password) < 6:
+            return False, "Password must be at least 6 characters long"
+        
+        if self._update(username, "password = ?", (self._hash_password(new_password),)):
+            return True, f"Password updated successfully for '{username}'"
+        return False, f"User '{username}' not found"
+    
+    def update_user_details(self, username: str, new_email: str = None, new_password: str = None) -> Tuple[bool, str]:
+        """Update user's email and/or password"""
+        if not self.user_exists(username):
+            return False, f"User '{username}' not found"
+        
+        assignments = []
+        params = []
+        updates = []
+        
+        if new_password is not None and new_password.strip():
+            if len(new_password) < 6:
+                return False, "Password must be at least 6 characters long"
+        
+        if new_email is not None and new_email.strip():
+            assignments.append("email = ?")
+            params.append(new_email.strip())
+            updates.append("email")
+        
+        if new_password is not None and new_password.strip():
+            assignments.append("password = ?")
+            params.append(self._hash_password(new_password))
+            updates.append("password")
+        
+        if not updates:
+            return False, "No changes provided"
+        
+        if not self._update(username, ", ".join(assignments), tuple(params)):
+            return False, f"User '{username}' not found"
+        
+        updated_fields = " and ".join(updates)
+        return True, f"Successfully updated {updated_fields} for '{username}'"
+    
+    def mark_game_completed_permanently(self, username: str) -> bool:
+        """Mark game as completed permanently to prevent replay"""
+        return self._update(username, "game_completed_permanently = 1")
+    
+    def import_from_json(self, json_file: str = "users.json") -> Tuple[int, int]:
+        """
+        One-shot import of an existing users.json file
+        
+        Users that already exist in the database are skipped, so the
+        import can safely be re-run.
+        
+        Returns:
+            Tuple of (imported: int, skipped: int)
+        """
+        # Any snapshot codec the JSON store may have written
+        users = load_store_file(json_file).get("users", [])
+        rows = [self._user_to_row(user) for user in users]
+        
+        conn = self._connect()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(INSERT_USER, rows)
+            imported = conn.total_changes - before
+        
+        return imported, len(rows) - imported
+    
+    # Bulk operations apply a whole list in a single transaction
+    
+    def bulk_create(self, accounts: List[Dict]) -> List[Tuple[bool, str]]:
+        """
+        Create many user accounts at once (admin function)
+        
+        Args:
+            accounts: Dicts with "username", "password" and optional "email"
+        
+        Returns:
+            One (success, message) tuple per account, in input order
+        """
+        prepared = []
+        for account in accounts:
+            username = account.get("username") or ""
+            password = account.get("password") or ""
+            error = JSONAuthManager._validate_new_account(username, password)
+            hashed = None if error else self._hash_password(password)
+            prepared.append((username.strip(), hashed, account.get("email") or "", error))
+        
+        return self._create_accounts(prepared)
+    
+    def _create_accounts(self, prepared: List[Tuple]) -> List[Tuple[bool, str]]:
+        """Insert (username, hashed_password, email, error) tuples in one transaction"""
+        results: List[Tuple[bool, str]] = []
+        created_at = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            for username, hashed, email, error in prepared:
+                if error:
+                    results.append((False, error))
+                    continue
+                
+                key = self._key(username)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO users (username, username_key, password, email, created_at) "
+                    "SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM archived_users WHERE username_key = ?)",
+                    (username, key, hashed, email, created_at, key)
+                )
+                if cursor.rowcount:
+                    results.append((True, f"Account created successfully for {username}!"))
+                else:
+                    results.append((False, f"Username '{username}' already exists"))
+        return results
+    
+    def import_roster(self, source, fmt: Optional[str] = None, workers: Optional[int] = None) -> Dict:
+        """
+        Create accounts for an event roster (CSV or JSON), as JSONAuthManager.import_roster
+        
+        Taken usernames are weeded out before passwords are hashed across a
+        process pool; all new users go in with one transaction.
+        
+        Returns:
+            Dict with total, created, failed [(username, message)], seconds
+            and users_per_sec
+        """
+        start = time.perf_counter()
+        rows = JSONAuthManager._read_roster(source, fmt)
+        
+        errors: List[Optional[str]] = []
+        seen = set()
+        for row in rows:
+            error = JSONAuthManager._validate_new_account(row["username"], row["password"])
+            key = self._key(row["username"])
+            if not error and (key in seen or self._name_taken(key)):
+                error = f"Username '{row['username']}' already exists"
+            seen.add(key)
+            errors.append(error)
+        
+        passwords = [row["password"] for row, error in zip(rows, errors) if not error]
+        if len(passwords) >= PARALLEL_HASH_MIN and workers != 1:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(passwords) // (workers * 4))
+                hashes = iter(list(pool.map(_hash_password_value, passwords, chunksize=chunksize)))
+        else:
+            hashes = iter([_hash_password_value(password) for password in passwords])
+        
+        prepared = [(row["username"], None if error else next(hashes), row["email"], error)
+                    for row, error in zip(rows, errors)]
+        results = self._create_accounts(prepared)
+        
+        seconds = time.perf_counter() - start
+        created = sum(1 for success, _ in results if success)
+        return {
+            "total": len(rows),
+            "created": created,
+            "failed": [(row["username"], message)
+                       for row, (success, message) in zip(rows, results) if not success],
+            "seconds": seconds,
+            "users_per_sec": created / seconds if seconds > 0 else 0.0
+        }
+    
+    def _bulk_set_active(self, usernames: List[str], active: bool) -> List[Tuple[bool, str]]:
+        """Disable or activate many accounts in one transaction"""
+        results: List[Tuple[bool, str]] = []
+        action = "activated" if active else "disabled"
+        for username in usernames:
+            self._rehydrate(username)
+        
+        disabled_at = None if active else datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            for username in usernames:
+                cursor = conn.execute(
+                    "UPDATE users SET is_active = ?, disabled_at = ? WHERE username_key = ?",
+                    (1 if active else 0, disabled_at, self._key(username or ""))
+                )
+                if cursor.rowcount:
+                    results.append((True, f"Account '{username}' has been {action} successfully"))
+                else:
+                    results.append((False, f"User '{username}' not found"))
+        return results
+    
+    def bulk_disable(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Disable many user accounts; one (success, message) per username"""
+        return self._bulk_set_active(usernames, False)
+    
+    def bulk_activate(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Activate many user accounts; one (success, message) per username"""
+        return self._bulk_set_active(usernames, True)
+    
+    def bulk_delete(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Permanently delete many user accounts (archived ones too); one (success, message) per username"""
+        results: List[Tuple[bool, str]] = []
+        conn = self._connect()
+        with conn:
+            for username in usernames:
+                key = self._key(username or "")
+                deleted = conn.execute("DELETE FROM users WHERE username_key = ?", (key,)).rowcount
+                deleted += conn.execute("DELETE FROM archived_users WHERE username_key = ?", (key,)).rowcount
+                if deleted:
+                    results.append((True, f"Account '{username}' has been permanently deleted"))
+                else:
+                    results.append((False, f"User '{username}' not found"))
+        return results
+    
+    def bulk_update_stats(self, results: List[Tuple[str, int]]) -> List[bool]:
+        """
+        Record many finished games at once
+        
+        Args:
+            results: (username, score) pairs; a user may appear more than once
+        
+        Returns:
+            One bool per pair, False where the user was not found
+        """
+        for username, _ in results:
+            self._rehydrate(username)
+        
+        updated = []
+        conn = self._connect()
+        with conn:
+            for username, score in results:
+                cursor = conn.execute(
+                    "UPDATE users SET total_games = total_games + 1, high_score = MAX(high_score, ?) "
+                    "WHERE username_key = ?", (score, self._key(username or ""))
+                )
+                updated.append(cursor.rowcount > 0)
+        return updated
+    
+    def _iter_export_records(self):
+        """Every user with password, hot then archived, from one read transaction"""
+        # A connection of its own, so the transaction spans the whole (lazy) dump
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN")
+            for row in conn.execute("SELECT * FROM users ORDER BY id"):
+                yield self._row_to_user(row, include_password=True)
+            for row in conn.execute("SELECT record FROM archived_users ORDER BY username_key"):
+                yield json.loads(zlib.decompress(row["record"]))
+        finally:
+            conn.close()
+    
+    def export_snapshot(self, path: str, compress: Optional[bool] = None) -> Dict:
+        """
+        Back up every user to an NDJSON file, one full record per line
+        
+        The same format as JSONAuthManager.export_snapshot, so a backup
+        restores into either store. Readers and writers carry on meanwhile
+        (WAL): the dump sees the database as it was when it started.
+        
+        Args:
+            path: File to write; replaced atomically once complete
+            compress: gzip the output (default: when path ends in ".gz")
+        
+        Returns:
+            Dict with users, bytes (NDJSON before compression), file_bytes,
+            seconds and mb_per_sec
+        """
+        return _write_ndjson(path, self._iter_export_records(), compress)
+    
+    def import_snapshot(self, path: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                        skip_existing: bool = False) -> Dict:
+        """
+        Load users from an NDJSON backup (gzipped or not), streaming
+        
+        Committed every chunk_size records. A stored user with the same
+        username (archived or not) is replaced by the backup's record unless
+        skip_existing is set.
+        
+        Returns:
+            Dict with total, added, replaced, skipped, failed [(line, message)],
+            seconds and users_per_sec
+        """
+        start = time.perf_counter()
+        counts = [0, 0, 0]
+        failed: List[Tuple[int, str]] = []
+        conn = self._connect()
+        for chunk in _iter_backup_chunks(path, chunk_size, failed):
+            with conn:
+                for record in chunk:
+                    key = self._key(record["username"])
+                    if self._name_taken(key):
+                        if skip_existing:
+                            counts[2] += 1
+                            continue
+                        conn.execute("DELETE FROM users WHERE username_key = ?", (key,))
+                        conn.execute("DELETE FROM archived_users WHERE username_key = ?", (key,))
+                        counts[1] += 1
+                    else:
+                        counts[0] += 1
+                    conn.execute(INSERT_USER, self._user_to_row(record))
+        return _import_report(start, counts, failed)
+    
+    # Archive: dormant accounts live compressed in archived_users, out of
+    # the users table and its indexes, until something touches them
+    
+    def _rehydrate(self, username: str) -> bool:
+        """Move an archived account back into the users table; True if it was archived"""
+        key = self._key((username or "").strip())
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM archived_users WHERE username_key = ?", (key,)).fetchone() is None:
+            return False
+        
+        with conn:
+            # Takes the write lock before reading, so two processes can't both move it
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT record FROM archived_users WHERE username_key = ?", (key,)).fetchone()
+            if row is None:
+                # Another process got there first
+                return False
+            conn.execute("DELETE FROM archived_users WHERE username_key = ?", (key,))
+            conn.execute(INSERT_USER, self._user_to_row(json.loads(zlib.decompress(row["record"]))))
+        return True
+    
+    def _archive_sizes(self) -> Tuple[int, int]:
+        """Approximate bytes in use by hot users (table and indexes) and by the archive"""
+        conn = self._connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        used = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        archive_bytes = conn.execute("SELECT COALESCE(SUM(length(record)), 0) FROM archived_users").fetchone()[0]
+        return max(0, used * page_size - archive_bytes), archive_bytes
+    
+    def archive_accounts(self, inactive_days: int = ARCHIVE_INACTIVE_DAYS) -> Dict:
+        """
+        Move disabled and long-inactive accounts to archived_users
+        
+        The same rule as JSONAuthManager.archive_accounts: disabled, or no
+        login (creation, if never logged in) for inactive_days. Each record
+        is stored zlib-compressed and comes back on login, get_user_details,
+        activate_user or any other change to it.
+        
+        Returns:
+            Dict with archived, hot_bytes_before, hot_bytes_after,
+            archive_bytes and seconds
+        """
+        start = time.perf_counter()
+        cutoff = (datetime.now() - timedelta(days=inactive_days)).isoformat()
+        archived_at = datetime.now().isoformat()
+        hot_before, _ = self._archive_sizes()
+        
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM users WHERE is_active = 0 OR disabled_at IS NOT NULL "
+                "OR COALESCE(last_login, created_at, '') < ?", (cutoff,)
+            ).fetchall()
+            conn.executemany(
+                "INSERT OR REPLACE INTO archived_users (username_key, username, archived_at, record) "
+                "VALUES (?, ?, ?, ?)",
+                [(row["username_key"], row["username"], archived_at,
+                  zlib.compress(json.dumps(self._row_to_user(row, include_password=True)).encode()))
+                 for row in rows]
+            )
+            conn.executemany("DELETE FROM users WHERE id = ?", [(row["id"],) for row in rows])
+        
+        hot_after, archive_bytes = self._archive_sizes()
+        return {
+            "archived": len(rows),
+            "hot_bytes_before": hot_before,
+            "hot_bytes_after": hot_after,
+            "archive_bytes": archive_bytes,
+            "seconds": time.perf_counter() - start
+        }
+    
+    def archive_status(self) -> Dict:
+        """Archived account count and the approximate sizes of the hot users and the archive"""
+        archived = self._connect().execute("SELECT COUNT(*) FROM archived_users").fetchone()[0]
+        hot_bytes, archive_bytes = self._archive_sizes()
+        return {"archived": archived, "hot_bytes": hot_bytes, "archive_bytes": archive_bytes}
+    
+    def search_archived(self, query: str = "", limit: int = 50) -> List[str]:
+        """Usernames of archived accounts containing a case-insensitive query, sorted"""
+        query = (query or "").strip().casefold()
+        rows = self._connect().execute(
+            "SELECT username FROM archived_users WHERE instr(username_key, ?) ORDER BY username_key LIMIT ?",
+            (query, limit)
+        )
+        return [row["username"] for row in rows]
+    
+    def restore_users(self, usernames: List[str]) -> List[Tuple[bool, str]]:
+        """Bring archived accounts back into the users table; one (success, message) per username"""
+        results = []
+        for username in usernames:
+            if self._rehydrate(username):
+                results.append((True, f"Account '{username}' has been restored from the archive"))
+            elif self.user_exists(username):
+                results.append((False, f"Account '{username}' is not archived"))
+            else:
+                results.append((False, f"User '{username}' not found"))
+        return results
+
+
+# Import users.json into users.db if run directly
+if __name__ == "__main__":
+    import sys
+    
+    json_file = sys.argv[1] if len(sys.argv) > 1 else "users.json"
+    db_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(json_file)[0] + ".db"
+    
+    print(f"Importing {json_file} into {db_file}...")
+    manager = SQLiteAuthManager(db_file)
+    imported, skipped = manager.import_from_json(json_file)
+    print(f"   Imported: {imported} users")
+    print(f"   Skipped (already present): {skipped} users")
+    print("\n✅ Import complete!")
@@ -0,0 +1,112 @@
+"""
+Regression test for account archival
+Archives accounts from another process (as the admin dashboard does) while
+a game process holds a warm cache, then checks that the first call of each
+kind brings the account back: login, details, writes, progress and bulk
+actions
+
+Usage: python test_archive.py
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+from auth_manager import LOGIN_STALENESS_MS, JSONAuthManager
+
+PASSWORD = "password123"
+
+# The game's own options (final2.py) and the plain defaults
+CASES = [
+    ("game options", {"journal": True, "flush_interval_ms": 250, "split_progress": True,
+                      "login_staleness_ms": LOGIN_STALENESS_MS}),
+    ("defaults", {}),
+]
+
+
+def archive_everything(json_file: str, options: dict):
+    """Archive every account, from a process of its own"""
+    report = JSONAuthManager(json_file, **options).archive_accounts(inactive_days=0)
+    sys.exit(0 if report["archived"] else 1)
+
+
+def check(results: list, name: str, ok: bool):
+    """Record one check, printing it if it failed"""
+    if not ok:
+        print(f"      ❌ {name}")
+    results.append(ok)
+
+
+def run_case(name: str, options: dict) -> bool:
+    """Archive behind a warm game cache and use every way back in"""
+    workdir = tempfile.mkdtemp(prefix="auth_archive_")
+    json_file = os.path.join(workdir, "users.json")
+    try:
+        game = JSONAuthManager(json_file, **options)
+        players = ["login", "details", "activate", "progress", "clear", "bulk", "stats", "restore"]
+        for player in players:
+            game.register_user(player, PASSWORD)
+        game.save_progress("progress", level=3, score=300)
+        game.save_progress("clear", level=1, score=50)
+        game.bulk_disable(["activate", "bulk"])
+        game.flush()
+        # Warm cache: every player is known to be hot in this process
+        game.count_users()
+        
+        archiver = multiprocessing.Process(target=archive_everything, args=(json_file, options))
+        archiver.start()
+        archiver.join()
+        
+        results = []
+        check(results, "archived in another process", archiver.exitcode == 0)
+        check(results, "name stays taken", not game.register_user("LOGIN", PASSWORD)[0])
+        check(results, "listed as archived", game.search_archived("") == sorted(players))
+        
+        check(results, "first login", game.login_user("login", PASSWORD)[0])
+        details = game.get_user_details("details")
+        check(results, "first get_user_details", details is not None and details["username"] == "details")
+        check(results, "first activate_user", game.activate_user("activate")[0])
+        check(results, "activated", game.get_user_status("activate")["is_active"])
+        
+        progress = game.load_progress("progress")
+        check(results, "first load_progress", progress is not None and progress["score"] == 300)
+        check(results, "save_progress", game.save_progress("progress", level=4, score=420))
+        check(results, "saved", game.load_progress("progress")["score"] == 420)
+        check(results, "first clear_progress", game.clear_progress("clear"))
+        check(results, "cleared", not game.load_progress("clear"))
+        
+        check(results, "bulk_activate", game.bulk_activate(["bulk"]) == [
+            (True, "Account 'bulk' has been activated successfully")])
+        check(results, "bulk activated", game.get_user_status("bulk")["is_active"])
+        check(results, "bulk_update_stats", game.bulk_update_stats([("stats", 77)]) == [True])
+        check(results, "stats recorded", game.get_user_details("stats")["high_score"] == 77)
+        check(results, "restore_users", game.restore_users(["restore", "restore", "nobody"]) == [
+            (True, "Account 'restore' has been restored from the archive"),
+            (False, "Account 'restore' is not archived"),
+            (False, "User 'nobody' not found")])
+        
+        game.flush()
+        check(results, "all hot again", game.count_users() == len(players) and not game.search_archived(""))
+        # A fresh process sees the same: every account hot, none archived
+        fresh = JSONAuthManager(json_file, **options)
+        check(results, "visible to a new process", fresh.count_users() == len(players)
+              and fresh.archive_status()["archived"] == 0)
+        
+        ok = all(results)
+        print(f"   {'✅' if ok else '❌'} {name:<14} {sum(results)}/{len(results)} checks passed")
+        return ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("Testing account archival across processes...")
+    results = [run_case(name, options) for name, options in CASES]
+    
+    if all(results):
+        print("\n✅ Archived accounts come back on first use!")
+    else:
+        print("\n❌ Archived accounts were missed")
+        sys.exit(1)
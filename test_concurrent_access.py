@@ -0,0 +1,94 @@
+"""
+Multi-process stress test for the JSON auth store
+Several processes update one users.json at the same time (like the game and
+the admin dashboard do); afterwards no update may be missing
+
+Usage: python test_concurrent_access.py [processes] [ops_per_process]
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from auth_manager import JSONAuthManager
+
+SHARED_USERS = 10
+
+CASES = [
+    ("snapshot, fsync=batched", {}),
+    ("snapshot, fsync=always", {"fsync": "always"}),
+    ("snapshot, fsync=never", {"fsync": "never"}),
+    ("journal", {"journal": True}),
+    ("journal + write-behind", {"journal": True, "flush_interval_ms": 20}),
+    ("journal + split progress", {"journal": True, "split_progress": True}),
+]
+
+
+def worker(json_file: str, worker_id: int, ops: int, options: dict):
+    """Bump shared players' game counters and save this worker's own progress"""
+    auth = JSONAuthManager(json_file, **options)
+    for i in range(ops):
+        auth.update_user_stats(f"shared{i % SHARED_USERS}", worker_id * 1000 + i)
+        auth.save_progress(f"worker{worker_id}", level=i, score=i)
+    auth.flush()
+
+
+def run_case(name: str, options: dict, processes: int, ops: int) -> bool:
+    """Run one configuration and check that no update was lost"""
+    workdir = tempfile.mkdtemp(prefix="auth_stress_")
+    json_file = os.path.join(workdir, "users.json")
+    try:
+        setup = JSONAuthManager(json_file)
+        for i in range(SHARED_USERS):
+            setup.register_user(f"shared{i}", "password123")
+        for w in range(processes):
+            setup.register_user(f"worker{w}", "password123")
+        
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=worker, args=(json_file, w, ops, options))
+                 for w in range(processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+        
+        check = JSONAuthManager(json_file, **options)
+        shared = [check.get_user_details(f"shared{i}") for i in range(SHARED_USERS)]
+        total_games = sum(user["total_games"] for user in shared)
+        # Each committed change moves a record one version on, from 1 at registration
+        # (versions are internal, so read from the store's own records)
+        versions_ok = all(check._find_user(user["username"]).get("version") == 1 + user["total_games"]
+                          for user in shared)
+        progress_ok = all(
+            (check.load_progress(f"worker{w}") or {}).get("level") == ops - 1
+            for w in range(processes)
+        )
+        expected = processes * ops
+        ok = total_games == expected and progress_ok and versions_ok and all(p.exitcode == 0 for p in procs)
+        
+        throughput = 2 * expected / elapsed
+        status = "✅" if ok else "❌"
+        print(f"   {status} {name:<26} {throughput:>9,.0f} ops/sec   "
+              f"games counted {total_games}/{expected}, progress {'ok' if progress_ok else 'LOST'}, "
+              f"versions {'ok' if versions_ok else 'WRONG'}")
+        return ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    
+    print(f"Stress testing the auth store with {processes} processes x {ops} ops...")
+    results = [run_case(name, options, processes, ops) for name, options in CASES]
+    
+    if all(results):
+        print("\n✅ No lost updates!")
+    else:
+        print("\n❌ Lost updates detected")
+        sys.exit(1)
@@ -0,0 +1,97 @@
+"""
+Regression test for the leaderboards
+Plays random rounds of score updates, progress saves (higher and lower),
+progress resets, archiving and restores with small boards, and after each
+round checks the incrementally kept boards against a rebuild from a full
+scan of the users
+
+Usage: python test_leaderboard.py
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from auth_manager import LEADERBOARD_METRICS, JSONAuthManager
+
+PASSWORD = "password123"
+PLAYERS = 40
+ROUNDS = 30
+BOARD_SIZE = 5
+
+# The game's own options (final2.py) and the plain defaults
+CASES = [
+    ("game options", {"journal": True, "flush_interval_ms": 250, "split_progress": True}),
+    ("defaults", {}),
+]
+
+
+def rebuilt_boards(json_file: str, options: dict) -> dict:
+    """The boards as a full scan ranks them (what a store without a board file gets)"""
+    os.remove(os.path.splitext(json_file)[0] + "_leaderboard.json")
+    scan = JSONAuthManager(json_file, leaderboard_size=BOARD_SIZE, **options)
+    return {metric: scan.get_leaderboard(metric, BOARD_SIZE) for metric in LEADERBOARD_METRICS}
+
+
+def play_round(game: JSONAuthManager, rng: random.Random, players: list):
+    """A burst of the changes that move players on the boards"""
+    for _ in range(15):
+        player = rng.choice(players)
+        action = rng.random()
+        if action < 0.35:
+            game.update_user_stats(player, rng.randrange(1000))
+        elif action < 0.8:
+            # Progress goes down as well as up: a new game starts from scratch
+            game.save_progress(player, level=rng.randrange(6), score=rng.randrange(500),
+                               max_streak=rng.randrange(12), perfect_levels=rng.randrange(6))
+        else:
+            game.clear_progress(player)
+    
+    if rng.random() < 0.3:
+        # Disabled accounts are archived, then some come back
+        dormant = rng.sample(players, 4)
+        game.bulk_disable(dormant)
+        game.archive_accounts(inactive_days=365)
+        game.restore_users(dormant[:2])
+        game.bulk_activate(dormant[:2])
+
+
+def run_case(name: str, options: dict) -> bool:
+    """Incremental boards match a rebuild after every round"""
+    workdir = tempfile.mkdtemp(prefix="auth_leaderboard_")
+    json_file = os.path.join(workdir, "users.json")
+    try:
+        game = JSONAuthManager(json_file, leaderboard_size=BOARD_SIZE, **options)
+        players = [f"player{i:02d}" for i in range(PLAYERS)]
+        game.bulk_create([{"username": player, "password": PASSWORD} for player in players])
+        rng = random.Random(11)
+        
+        mismatches = 0
+        for round_number in range(ROUNDS):
+            play_round(game, rng, players)
+            game.flush()
+            incremental = {metric: game.get_leaderboard(metric, BOARD_SIZE) for metric in LEADERBOARD_METRICS}
+            rebuilt = rebuilt_boards(json_file, options)
+            for metric in LEADERBOARD_METRICS:
+                if incremental[metric] != rebuilt[metric]:
+                    mismatches += 1
+                    print(f"      ❌ round {round_number} {metric}: {incremental[metric]} != {rebuilt[metric]}")
+        
+        ok = mismatches == 0
+        print(f"   {'✅' if ok else '❌'} {name:<14} {ROUNDS} rounds, {mismatches} board mismatches")
+        return ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("Testing incremental leaderboards against rebuilds...")
+    results = [run_case(name, options) for name, options in CASES]
+    
+    if all(results):
+        print("\n✅ Incremental boards match full rebuilds!")
+    else:
+        print("\n❌ Incremental boards drifted from full rebuilds")
+        sys.exit(1)